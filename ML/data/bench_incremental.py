@@ -0,0 +1,87 @@
+"""Compare a full TF-IDF retrain with an incremental update on the same new data.
+
+The dataset is split into a held-out test set, a "base" part the current
+model was trained on and a "delta" of new labeled complaints. The full
+retrain path refits train_tfidf.py's pipelines on base + delta; the
+incremental path starts from a model already trained on base (as
+incremental_train.py leaves it) and only streams the delta through
+``partial_fit``. Both are scored on the same test set.
+
+--scale N replicates the training rows N times (with a row-id token so the
+copies are not identical) to show how the two paths grow with data volume.
+
+Usage:
+    python bench_incremental.py [--data urban_issues_dataset.csv] [--delta-fraction 0.1] [--scale 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from incremental_train import evaluate, init_model_data, update
+from train_tfidf import CATEGORY_MAX_FEATURES, SEVERITY_MAX_FEATURES, build_pipeline
+
+
+def scale_rows(df, factor):
+    if factor <= 1:
+        return df
+    copies = [df.assign(text=df['text'] + f' ref{i}') for i in range(factor)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def full_retrain(train, test):
+    start = time.perf_counter()
+    scores = {}
+    for field, max_features in (('label', CATEGORY_MAX_FEATURES), ('severity', SEVERITY_MAX_FEATURES)):
+        pipeline = build_pipeline(max_features).fit(train['text'], train[field])
+        scores[field] = accuracy_score(test[field], pipeline.predict(test['text']))
+    return time.perf_counter() - start, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       'urban_issues_dataset.csv'))
+    parser.add_argument('--delta-fraction', type=float, default=0.1,
+                        help="share of the training rows treated as newly arrived")
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--init-epochs', type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    train, test = train_test_split(df, test_size=0.2, random_state=42, stratify=df['label'])
+    base, delta = train_test_split(train, test_size=args.delta_fraction, random_state=42)
+    base, delta = scale_rows(base, args.scale), scale_rows(delta, args.scale)
+    print(f"base={len(base)} delta={len(delta)} test={len(test)} rows")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for name, frame in (('base', base), ('delta', delta), ('test', test)):
+            paths[name] = os.path.join(tmp, f'{name}.csv')
+            frame.to_csv(paths[name], index=False)
+
+        # Existing incremental model, trained on base only (not timed)
+        model_data = init_model_data(paths['base'])
+        update(model_data, paths['base'], 1000, args.init_epochs)
+
+        start = time.perf_counter()
+        update(model_data, paths['delta'], 1000, 1)
+        incremental_seconds = time.perf_counter() - start
+        incremental_scores = evaluate(model_data, paths['test'])
+
+    full_seconds, full_scores = full_retrain(pd.concat([base, delta]), test)
+
+    print(f"\n{'':<22}{'seconds':>10}{'category acc':>15}{'severity acc':>15}")
+    print(f"{'full TF-IDF retrain':<22}{full_seconds:>10.3f}"
+          f"{full_scores['label']:>15.3f}{full_scores['severity']:>15.3f}")
+    print(f"{'incremental update':<22}{incremental_seconds:>10.3f}"
+          f"{incremental_scores['label']:>15.3f}{incremental_scores['severity']:>15.3f}")
+    print(f"\nspeedup: {full_seconds / incremental_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Sweep the cascade threshold: accuracy against average latency per text.
+
+Trains the full TF-IDF pipelines and the hashed unigram first stage
+(train_tfidf.py's ``build_pipeline`` / ``build_fast_pipeline``) on the same
+split train_tfidf.py uses, then times every held-out text on its own through
+each stage, the way a single /predict request pays for it. For each threshold
+a text is answered by the first stage when both of its confidences reach the
+threshold and by the full pipelines otherwise, so
+
+    average latency = mean(fast time) + mean(full time over the uncertain texts) * share uncertain
+
+Thresholds 0 and above 1 are the fast-only and full-only baselines. Pick one
+and pass it to smart_server.py --cascade-threshold.
+
+Usage:
+    python cascade_sweep.py [--data urban_issues_dataset.csv] [--thresholds 0.3 0.4 0.5 ...] [--repeat 5]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from train_tfidf import (CATEGORY_MAX_FEATURES, SEVERITY_MAX_FEATURES, SPLIT_SEED, TEST_SIZE,
+                         build_fast_pipeline, build_pipeline)
+
+TARGETS = (('category', 'label', CATEGORY_MAX_FEATURES), ('severity', 'severity', SEVERITY_MAX_FEATURES))
+
+
+def fit_stages(train):
+    fast, full = {}, {}
+    for name, field, max_features in TARGETS:
+        fast[name] = build_fast_pipeline().fit(train['text'], train[field])
+        full[name] = build_pipeline(max_features).fit(train['text'], train[field])
+    return fast, full
+
+
+def fast_stage(fast, texts):
+    """Both first-stage classifiers on one hashing pass, as CompiledModel runs them"""
+    features = fast['category'][:-1].transform(texts)
+    return {name: fast[name][-1].predict_proba(features) for name in fast}
+
+
+def full_stage(full, texts):
+    return {name: full[name].predict_proba(texts) for name in full}
+
+
+def time_per_text(stage, models, texts, repeat):
+    """Best-of-`repeat` seconds for each text scored on its own"""
+    seconds = np.full(len(texts), np.inf)
+    for _ in range(repeat):
+        for i, text in enumerate(texts):
+            start = time.perf_counter()
+            stage(models, [text])
+            seconds[i] = min(seconds[i], time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       'urban_issues_dataset.csv'))
+    parser.add_argument('--thresholds', type=float, nargs='+',
+                        default=[0.0, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.01])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    train, test = train_test_split(df, test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=df['label'])
+    texts = test['text'].tolist()
+    print(f"train={len(train)} test={len(test)} rows, best of {args.repeat} runs per text\n")
+
+    fast, full = fit_stages(train)
+    fast_proba, full_proba = fast_stage(fast, texts), full_stage(full, texts)
+    fast_seconds = time_per_text(fast_stage, fast, texts, args.repeat)
+    full_seconds = time_per_text(full_stage, full, texts, args.repeat)
+
+    truth = {'category': test['label'].to_numpy(), 'severity': test['severity'].to_numpy()}
+    predicted = {}
+    for name in truth:
+        classes = full[name][-1].classes_
+        predicted[name] = (classes[fast_proba[name].argmax(axis=1)], classes[full_proba[name].argmax(axis=1)])
+    confident_score = np.minimum(fast_proba['category'].max(axis=1), fast_proba['severity'].max(axis=1))
+
+    print(f"{'threshold':>10}{'fast share':>12}{'category acc':>14}{'severity acc':>14}{'avg ms':>9}{'speedup':>9}")
+    for threshold in args.thresholds:
+        confident = confident_score >= threshold
+        accuracy = {name: np.mean(np.where(confident, fast_labels, full_labels) == truth[name])
+                    for name, (fast_labels, full_labels) in predicted.items()}
+        # Texts the first stage answers never run the full pipelines
+        seconds = np.where(confident, fast_seconds, fast_seconds + full_seconds)
+        if threshold <= 0:
+            seconds = fast_seconds
+        elif threshold > 1:
+            seconds = full_seconds
+        print(f"{threshold:>10.2f}{confident.mean():>12.1%}{accuracy['category']:>14.3f}"
+              f"{accuracy['severity']:>14.3f}{seconds.mean() * 1000:>9.3f}"
+              f"{full_seconds.mean() / seconds.mean():>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
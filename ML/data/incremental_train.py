@@ -0,0 +1,268 @@
+"""Incremental (online) training for the category and severity classifiers.
+
+Instead of refitting TF-IDF + LogisticRegression from scratch, this keeps a
+stateless HashingVectorizer (no vocabulary to refit) in front of
+SGDClassifier(loss='log_loss') models that support ``partial_fit``. New
+labeled complaints - e.g. staff corrections exported from the dashboard -
+are streamed in from a delta file and folded into the existing weights
+without touching the old data.
+
+Each run publishes a new versioned artifact in the same ``model_data`` dict
+layout the servers load. ``--publish`` additionally swaps it into the
+server's model path atomically, where smart_server's --watch-model or
+/admin/reload picks it up.
+
+Usage:
+    python incremental_train.py init --data urban_issues_dataset.csv --model-dir models
+    python incremental_train.py update --delta corrections.jsonl --model-dir models \\
+        --publish ../../ml-server/ml-server/text_model.joblib
+
+Delta files are CSV (text,label,severity) or JSON Lines, optionally gzipped;
+JSONL records may use "description"/"category" in place of "text"/"label".
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+# The complaint-file readers are shared with the ML server
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ml-server', 'ml-server'))
+from export_reader import iter_records  # noqa: E402
+
+HASHING_PARAMS = {
+    'ngram_range': (1, 2),
+    'stop_words': 'english',
+    'alternate_sign': False,
+    'n_features': 2 ** 18,
+    'norm': 'l2'
+}
+
+SGD_PARAMS = {
+    'loss': 'log_loss',
+    'alpha': 1e-5,
+    'random_state': 42
+}
+
+TARGETS = (
+    ('category_pipeline', 'label_encoder', 'label'),
+    ('severity_pipeline', 'severity_encoder', 'severity'),
+)
+
+
+def build_incremental_pipeline():
+    return Pipeline([
+        ('hash', HashingVectorizer(**HASHING_PARAMS)),
+        ('clf', SGDClassifier(**SGD_PARAMS))
+    ])
+
+
+def iter_labeled_rows(path):
+    """Yield {'text', 'label', 'severity'} dicts from a CSV or JSONL file, one at a time"""
+    for record in iter_records(path):
+        yield {
+            'text': record.get('text') or record.get('description') or '',
+            'label': record.get('label') or record.get('category'),
+            'severity': record.get('severity'),
+        }
+
+
+def shuffle_buffer(rows, buffer_size, rng):
+    """Approximately shuffle a stream by sampling from a bounded buffer.
+
+    Exports are usually grouped by label, and SGD fed one class at a time
+    forgets the others; this mixes them without loading the whole file.
+    """
+    buffer = []
+    for row in rows:
+        if len(buffer) < buffer_size:
+            buffer.append(row)
+            continue
+        i = rng.integers(buffer_size)
+        yield buffer[i]
+        buffer[i] = row
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def partial_fit_batch(model_data, batch, stats):
+    """Fold one batch into both classifiers; rows with unknown labels are skipped per target"""
+    texts = [row['text'] for row in batch]
+
+    # The hashing step is stateless, so identical vectorizers can share one transform
+    features = {}
+    for pipeline_key, encoder_key, field in TARGETS:
+        pipeline = model_data[pipeline_key]
+        encoder = model_data[encoder_key]
+        params_key = repr(sorted(pipeline[0].get_params().items()))
+        if params_key not in features:
+            features[params_key] = pipeline[0].transform(texts)
+        X = features[params_key]
+
+        known = set(encoder.classes_)
+        rows = [i for i, row in enumerate(batch) if row[field] in known]
+        stats[field]['skipped'] += len(batch) - len(rows)
+        if not rows:
+            continue
+
+        y = encoder.transform([batch[i][field] for i in rows])
+        pipeline[-1].partial_fit(X[rows], y, classes=np.arange(len(encoder.classes_)))
+        stats[field]['rows'] += len(rows)
+
+
+def update(model_data, path, batch_size, epochs, buffer_size=10000, seed=42):
+    """Stream a labeled file through partial_fit; returns per-target row counts"""
+    rng = np.random.default_rng(seed)
+    stats = {field: {'rows': 0, 'skipped': 0} for _, _, field in TARGETS}
+    for _ in range(epochs):
+        rows = shuffle_buffer(iter_labeled_rows(path), buffer_size, rng)
+        for batch in iter_batches(rows, batch_size):
+            partial_fit_batch(model_data, batch, stats)
+    return stats
+
+
+def init_model_data(path):
+    """Fresh incremental model_data with encoders over the labels seen in `path`"""
+    labels, severities = set(), set()
+    for row in iter_labeled_rows(path):
+        labels.add(row['label'])
+        severities.add(row['severity'])
+
+    return {
+        'category_pipeline': build_incremental_pipeline(),
+        'severity_pipeline': build_incremental_pipeline(),
+        'label_encoder': LabelEncoder().fit(sorted(labels)),
+        'severity_encoder': LabelEncoder().fit(sorted(severities)),
+        'metadata': {'version': 0, 'trained_rows': 0, 'updates': []}
+    }
+
+
+def evaluate(model_data, path):
+    """Accuracy of both classifiers on a labeled file"""
+    rows = list(iter_labeled_rows(path))
+    texts = [row['text'] for row in rows]
+    scores = {}
+    for pipeline_key, encoder_key, field in TARGETS:
+        encoder = model_data[encoder_key]
+        predicted = encoder.inverse_transform(model_data[pipeline_key].predict(texts))
+        scores[field] = accuracy_score([row[field] for row in rows], predicted)
+    return scores
+
+
+def latest_path(model_dir):
+    pointer = os.path.join(model_dir, 'LATEST')
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        return os.path.join(model_dir, f.read().strip())
+
+
+def atomic_write(path, write):
+    """Write via a temp file and os.replace, so readers never see a partial file"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def publish(model_data, model_dir, publish_path=None):
+    """Save the next versioned artifact, advance LATEST and optionally swap it into publish_path"""
+    os.makedirs(model_dir, exist_ok=True)
+    metadata = model_data['metadata']
+    metadata['version'] += 1
+    name = f"text_model-v{metadata['version']:04d}.joblib"
+    path = os.path.join(model_dir, name)
+
+    atomic_write(path, lambda tmp: joblib.dump(model_data, tmp))
+
+    def write_pointer(tmp):
+        with open(tmp, 'w') as f:
+            f.write(name + '\n')
+    atomic_write(os.path.join(model_dir, 'LATEST'), write_pointer)
+
+    if publish_path:
+        atomic_write(publish_path, lambda tmp: shutil.copyfile(path, tmp))
+    return path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Incremental training for the complaint classifiers")
+    parser.add_argument('command', choices=('init', 'update'))
+    parser.add_argument('--data', default='urban_issues_dataset.csv', help="bootstrap data for init")
+    parser.add_argument('--delta', help="new labeled complaints for update (CSV or JSONL, optionally .gz)")
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--publish', metavar='PATH', help="also atomically replace this model file")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--shuffle-buffer', type=int, default=10000,
+                        help="rows held in memory to shuffle the input stream")
+    parser.add_argument('--epochs', type=int, default=None,
+                        help="passes over the input (default: 5 for init, 1 for update)")
+    parser.add_argument('--eval', metavar='CSV', help="report accuracy on this labeled file afterwards")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == 'init':
+        source = args.data
+        model_data = init_model_data(source)
+        epochs = args.epochs or 5
+    else:
+        if not args.delta:
+            raise SystemExit("update needs --delta")
+        current = latest_path(args.model_dir)
+        if current is None:
+            raise SystemExit(f"No model in {args.model_dir}; run 'init' first")
+        source = args.delta
+        model_data = joblib.load(current)
+        epochs = args.epochs or 1
+        print(f"Loaded {current}")
+
+    start = time.perf_counter()
+    stats = update(model_data, source, args.batch_size, epochs, args.shuffle_buffer)
+    elapsed = time.perf_counter() - start
+
+    for field, counts in stats.items():
+        print(f"  {field}: {counts['rows']} rows learned, {counts['skipped']} skipped (unknown label)")
+    print(f"⏱️  {args.command} took {elapsed:.2f}s")
+
+    metadata = model_data['metadata']
+    metadata['trained_rows'] += stats['label']['rows'] // epochs
+    metadata['updates'].append({
+        'source': os.path.basename(source),
+        'rows': stats['label']['rows'] // epochs,
+        'seconds': round(elapsed, 3),
+        'at': datetime.now().isoformat(timespec='seconds')
+    })
+    metadata['updates'] = metadata['updates'][-100:]
+
+    path = publish(model_data, args.model_dir, args.publish)
+    print(f"✅ Published {path}" + (f" -> {args.publish}" if args.publish else ""))
+
+    if args.eval:
+        for field, accuracy in evaluate(model_data, args.eval).items():
+            print(f"  {field} accuracy: {accuracy:.3f}")
+
+
+if __name__ == "__main__":
+    main()
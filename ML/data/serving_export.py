@@ -0,0 +1,276 @@
+"""Export a trained model_data dict as a compact, mmap-friendly serving artifact.
+
+The artifact is a directory of plain ``.npy`` arrays plus a ``manifest.json``.
+Nothing in it is pickled, so the ML servers can open the weights with
+``np.load(..., mmap_mode='r')`` and several worker processes share one
+page-cache copy instead of each unpickling its own.
+
+Layout, for each of the ``category`` and ``severity`` models:
+    <model>_terms.npy      vocabulary terms, sorted (fixed-width unicode)
+    <model>_columns.npy    feature column of each sorted term
+    <model>_idf.npy        idf vector, indexed by feature column
+    <model>_coef.npy       classifier coefficients, (n_classes, n_features)
+    <model>_intercept.npy  classifier intercepts
+    <model>_classes.npy    classifier classes_ (encoded labels)
+plus ``label_encoder_classes.npy`` / ``severity_encoder_classes.npy`` for the label encoders
+and ``stop_words.npy`` when the vectorizers use a stop word list.
+
+Compact artifacts (``--precision float32|int8`` and/or ``--min-weight``,
+format version 2) shrink that further:
+    terms.npy                 one sorted UTF-8 string table shared by both models
+    <model>_columns.npy       feature column of each shared term in this model, -1 if absent
+    <model>_coef.npy          float32, or int8 with per-class scales in
+    <model>_coef_scale.npy    (coef = int8 value * scale of its class)
+Features whose largest |coefficient| over all classes is below min_weight are
+dropped from the vocabulary. They no longer count towards a text's l2 norm,
+so the remaining TF-IDF values (and probabilities) shift slightly; measure the
+effect with ml-server/ml-server/benchmarks/bench_compact_artifact.py.
+
+Usage:
+    python serving_export.py comprehensive_model.joblib text_model.serving [--precision int8] [--min-weight 0.05]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+ARTIFACT_FORMAT = 'ecoresolve-serving'
+ARTIFACT_VERSION = 1
+COMPACT_ARTIFACT_VERSION = 2
+
+WEIGHT_PRECISIONS = ('float64', 'float32', 'int8')
+
+MODELS = (
+    ('category', 'category_pipeline', 'label_encoder', 'label_encoder_classes'),
+    ('severity', 'severity_pipeline', 'severity_encoder', 'severity_encoder_classes'),
+)
+
+
+def jsonable_params(params):
+    """Keep only the estimator params that survive a JSON round trip"""
+    kept = {}
+    for name, value in params.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        try:
+            json.dumps(value)
+        except TypeError:
+            continue
+        kept[name] = value
+    return kept
+
+
+def vectorizer_settings(vectorizer):
+    """Settings needed to rebuild the vectorizer's analyzer and TF-IDF weighting"""
+    params = vectorizer.get_params()
+    for name in ('preprocessor', 'tokenizer', 'analyzer'):
+        if callable(params[name]):
+            raise ValueError(f"Cannot export a vectorizer with a custom {name}")
+
+    settings = jsonable_params({name: value for name, value in params.items()
+                                if name not in ('vocabulary', 'dtype')})
+    settings['dtype'] = np.dtype(params['dtype']).name
+    return settings
+
+
+def classifier_kind(classifier):
+    """How predict_proba turns decision scores into probabilities"""
+    if classifier.coef_.shape[0] == 1:
+        return 'binary'
+    if type(classifier).__name__ == 'SGDClassifier':
+        # log_loss SGD (streaming training) normalizes one-vs-rest sigmoids
+        if classifier.loss != 'log_loss':
+            raise ValueError(f"SGDClassifier with loss={classifier.loss!r} has no predict_proba")
+        return 'ovr'
+    if getattr(classifier, 'multi_class', None) == 'ovr' or classifier.solver == 'liblinear':
+        return 'ovr'
+    return 'multinomial'
+
+
+def stop_word_list(vectorizer):
+    """Resolve the vectorizer's stop_words setting to a sorted list, or None"""
+    stop_words = vectorizer.get_stop_words()
+    return sorted(stop_words) if stop_words else None
+
+
+def kept_features(coef, min_weight):
+    """Feature columns whose largest |coefficient| over all classes reaches min_weight"""
+    return np.flatnonzero(np.abs(coef).max(axis=0) >= min_weight)
+
+
+def quantize_int8(coef):
+    """Symmetric per-class int8 quantization; returns (int8 coef, float32 scale per class)"""
+    scale = np.abs(coef).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.rint(coef / scale[:, None]), -127, 127).astype(np.int8)
+    return quantized, scale.astype(np.float32)
+
+
+def export_serving_artifact(model_data, out_dir, precision='float64', min_weight=0.0):
+    """Write model_data to out_dir and return the manifest.
+
+    With the defaults the artifact keeps the exact float64 weights and each
+    model's own vocabulary (format version 1). A lower ``precision`` or a
+    positive ``min_weight`` writes a compact version 2 artifact instead.
+
+    The artifact is built in a sibling temp directory and moved into place at
+    the end, so a server watching out_dir never sees a half-written export.
+    """
+    if precision not in WEIGHT_PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {WEIGHT_PRECISIONS}")
+    compact = precision != 'float64' or min_weight > 0
+
+    tmp_dir = out_dir.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    digest = hashlib.sha256()
+    files = {}
+
+    def save(name, array):
+        array = np.ascontiguousarray(array)
+        np.save(os.path.join(tmp_dir, name + '.npy'), array)
+        digest.update(name.encode())
+        digest.update(array.tobytes())
+        files[name] = name + '.npy'
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': COMPACT_ARTIFACT_VERSION if compact else ARTIFACT_VERSION,
+        'models': {},
+    }
+
+    pipelines = {}
+    for name, pipeline_key, _, _ in MODELS:
+        pipeline = model_data[pipeline_key]
+        vectorizer, classifier = pipeline.steps[0][1], pipeline.steps[-1][1]
+        if len(pipeline.steps) != 2 or type(vectorizer).__name__ != 'TfidfVectorizer':
+            raise ValueError(f"{pipeline_key} must be a TfidfVectorizer + classifier pipeline")
+        pipelines[name] = (vectorizer, classifier)
+
+    if compact:
+        # Pruned vocabularies, renumbered densely in their original column order
+        vocabularies, kept = {}, {}
+        for name, (vectorizer, classifier) in pipelines.items():
+            kept[name] = kept_features(classifier.coef_, min_weight)
+            new_column = {old: new for new, old in enumerate(kept[name].tolist())}
+            vocabularies[name] = {term: new_column[column] for term, column in vectorizer.vocabulary_.items()
+                                  if column in new_column}
+
+        shared_terms = sorted(set().union(*vocabularies.values()))
+        save('terms', np.array([term.encode('utf-8') for term in shared_terms], dtype=bytes))
+        manifest['compact'] = {'precision': precision, 'min_weight': min_weight, 'features': {}}
+
+    stop_words = None
+    for name, pipeline_key, encoder_key, classes_name in MODELS:
+        vectorizer, classifier = pipelines[name]
+        settings = vectorizer_settings(vectorizer)
+        spec = {}
+
+        if compact:
+            vocabulary = vocabularies[name]
+            columns = np.array([vocabulary.get(term, -1) for term in shared_terms], dtype=np.int32)
+            idf, coef = vectorizer.idf_[kept[name]], classifier.coef_[:, kept[name]]
+            save(f'{name}_columns', columns)
+            spec['terms'] = 'terms'
+            manifest['compact']['features'][name] = {'before': int(classifier.coef_.shape[1]),
+                                                     'after': int(coef.shape[1])}
+            if precision != 'float64':
+                settings['dtype'] = 'float32'
+                idf = idf.astype(np.float32)
+            if precision == 'int8':
+                coef, scale = quantize_int8(coef)
+                save(f'{name}_coef_scale', scale)
+                spec['coef_scale'] = f'{name}_coef_scale'
+            elif precision == 'float32':
+                coef = coef.astype(np.float32)
+            intercept = classifier.intercept_.astype(settings['dtype'])
+        else:
+            terms = np.array(sorted(vectorizer.vocabulary_))
+            columns = np.array([vectorizer.vocabulary_[term] for term in terms], dtype=np.int32)
+            save(f'{name}_terms', terms)
+            save(f'{name}_columns', columns)
+            idf, coef, intercept = vectorizer.idf_, classifier.coef_, classifier.intercept_
+
+        save(f'{name}_idf', idf)
+        save(f'{name}_coef', coef)
+        save(f'{name}_intercept', intercept)
+        save(f'{name}_classes', classifier.classes_)
+        save(classes_name, np.asarray(model_data[encoder_key].classes_).astype(str))
+
+        model_stop_words = stop_word_list(vectorizer)
+        if model_stop_words is not None:
+            if stop_words is not None and stop_words != model_stop_words:
+                raise ValueError("Category and severity vectorizers use different stop word lists")
+            stop_words = model_stop_words
+
+        manifest['models'][name] = {
+            'vectorizer': settings,
+            'classifier': {
+                'type': type(classifier).__name__,
+                'kind': classifier_kind(classifier),
+                'params': jsonable_params(classifier.get_params()),
+            },
+            'n_features': int(coef.shape[1]),
+            'classes': classes_name,
+            **spec,
+        }
+
+    if stop_words is not None:
+        save('stop_words', np.array(stop_words))
+
+    manifest['files'] = files
+    manifest['version'] = digest.hexdigest()[:12]
+
+    # The manifest goes last: its presence marks a complete artifact
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = out_dir.rstrip(os.sep) + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    return manifest
+
+
+def artifact_size(path):
+    """Bytes on disk of every file in an artifact directory"""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def describe_export(out_dir, manifest):
+    """One-line summary printed after an export"""
+    summary = f"✅ Serving artifact written to {out_dir} (version {manifest['version']}, " \
+              f"{artifact_size(out_dir) / 1e6:.2f} MB"
+    compact = manifest.get('compact')
+    if compact:
+        features = ', '.join(f"{name} {counts['before']} -> {counts['after']} features"
+                             for name, counts in compact['features'].items())
+        summary += f"; {compact['precision']} weights, {features}"
+    return summary + ")"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a model_data joblib as a serving artifact")
+    parser.add_argument('model', help="model_data joblib from train_tfidf.py")
+    parser.add_argument('out_dir', help="artifact directory to write")
+    parser.add_argument('--precision', choices=WEIGHT_PRECISIONS, default='float64',
+                        help="weight storage; float32/int8 write a compact artifact")
+    parser.add_argument('--min-weight', type=float, default=0.0,
+                        help="drop features whose largest |coefficient| is below this (compact artifact)")
+    args = parser.parse_args()
+
+    manifest = export_serving_artifact(joblib.load(args.model), args.out_dir,
+                                       precision=args.precision, min_weight=args.min_weight)
+    print(describe_export(args.out_dir, manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Shared feature extraction for train_tfidf.py's --shared-features mode.
+
+The category and severity TfidfVectorizers use identical tokenization,
+min_df and max_df settings and differ only in max_features. Instead of
+letting each one tokenize the corpus, we count n-grams once with a
+CountVectorizer, cut each model's feature space out of that count matrix
+exactly the way TfidfVectorizer would (same df pruning, same top-N by term
+frequency, same alphabetical column order), and hand back fitted
+TfidfVectorizers that are indistinguishable from normally fitted ones.
+
+The count matrices can be cached on disk, keyed by a hash of the dataset
+file, the split and the vectorizer settings, so repeated experiments on the
+same data skip feature extraction entirely.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+
+def dataset_cache_key(data_path, vectorizer_params, split_params):
+    """Hash of the dataset bytes plus everything that shapes the count matrix"""
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(json.dumps({
+        'vectorizer': vectorizer_params,
+        'split': split_params,
+        'sklearn': sklearn.__version__,
+    }, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def count_features(X_train, X_test, vectorizer_params):
+    """Tokenize once: df-pruned counts for train and test over one sorted vocabulary"""
+    params = {name: value for name, value in vectorizer_params.items() if name != 'max_features'}
+    counter = CountVectorizer(**params)
+    counts_train = counter.fit_transform(X_train)
+    counts_test = counter.transform(X_test)
+    terms = counter.get_feature_names_out()
+    return counts_train.tocsr(), counts_test.tocsr(), np.asarray(terms, dtype=str)
+
+
+def cached_count_features(X_train, X_test, vectorizer_params, cache_dir=None, cache_key=None):
+    """count_features, memoized on disk under cache_dir/<cache_key>.*"""
+    if cache_dir is None or cache_key is None:
+        return count_features(X_train, X_test, vectorizer_params)
+
+    base = os.path.join(cache_dir, cache_key)
+    paths = [base + '.train.npz', base + '.test.npz', base + '.terms.npy']
+    if all(os.path.exists(path) for path in paths):
+        print(f"♻️  Using cached features {base}.*")
+        return sp.load_npz(paths[0]).tocsr(), sp.load_npz(paths[1]).tocsr(), np.load(paths[2])
+
+    counts_train, counts_test, terms = count_features(X_train, X_test, vectorizer_params)
+    os.makedirs(cache_dir, exist_ok=True)
+    sp.save_npz(paths[0], counts_train)
+    sp.save_npz(paths[1], counts_test)
+    np.save(paths[2], terms)
+    print(f"💾 Cached features to {base}.*")
+    return counts_train, counts_test, terms
+
+
+def derive_vectorizer(counts_train, terms, vectorizer_params):
+    """Build the fitted TfidfVectorizer that fitting on the raw texts would produce.
+
+    Returns (vectorizer, transformer, kept_columns): the transformer holds the
+    fitted TF-IDF weighting and kept_columns selects this vectorizer's
+    features out of the shared count matrix.
+    """
+    limit = vectorizer_params.get('max_features')
+    kept = np.arange(counts_train.shape[1])
+    if limit is not None and len(kept) > limit:
+        # Same selection as CountVectorizer._limit_features: the `limit` largest
+        # corpus term frequencies, ranked over the alphabetically sorted features
+        term_frequencies = np.asarray(counts_train.sum(axis=0)).ravel()
+        kept = np.sort((-term_frequencies).argsort()[:limit])
+
+    vectorizer = TfidfVectorizer(**vectorizer_params)
+    if not vectorizer.use_idf:
+        raise ValueError("Shared features require use_idf=True")
+
+    counts = counts_train[:, kept]
+    vectorizer.vocabulary_ = {term: index for index, term in enumerate(terms[kept].tolist())}
+    transformer = TfidfTransformer(
+        norm=vectorizer.norm,
+        use_idf=vectorizer.use_idf,
+        smooth_idf=vectorizer.smooth_idf,
+        sublinear_tf=vectorizer.sublinear_tf,
+    ).fit(counts)
+    vectorizer.idf_ = transformer.idf_
+    return vectorizer, transformer, kept
+
+
+def tfidf_features(counts, transformer, kept, dtype):
+    """TF-IDF features for rows of the shared count matrix"""
+    return transformer.transform(counts[:, kept].astype(dtype))
+
+
+def fit_classifier(features, labels, classifier_params):
+    return LogisticRegression(**classifier_params).fit(features, labels)
+
+
+def train_shared(X_train, X_test, targets, classifier_params, cache_dir=None, cache_key=None, n_jobs=-1):
+    """Fit one TF-IDF + LogisticRegression pipeline per target from a single tokenization pass.
+
+    ``targets`` maps a name to (vectorizer_params, y_train). All vectorizer
+    params must agree except max_features. Returns {name: (vectorizer,
+    classifier, test_features)}; the classifiers are fitted in parallel.
+    """
+    shared_params = None
+    for vectorizer_params, _ in targets.values():
+        params = {name: value for name, value in vectorizer_params.items() if name != 'max_features'}
+        if shared_params is not None and params != shared_params:
+            raise ValueError("Shared features need identical vectorizer settings apart from max_features")
+        shared_params = params
+
+    first_params = next(iter(targets.values()))[0]
+    counts_train, counts_test, terms = cached_count_features(
+        X_train, X_test, first_params, cache_dir, cache_key)
+
+    spaces = {}
+    for name, (vectorizer_params, y_train) in targets.items():
+        vectorizer, transformer, kept = derive_vectorizer(counts_train, terms, vectorizer_params)
+        spaces[name] = (
+            vectorizer,
+            tfidf_features(counts_train, transformer, kept, vectorizer.dtype),
+            tfidf_features(counts_test, transformer, kept, vectorizer.dtype),
+            y_train,
+        )
+
+    print(f"Fitting {len(spaces)} classifiers in parallel (n_jobs={n_jobs})...")
+    classifiers = Parallel(n_jobs=n_jobs)(
+        delayed(fit_classifier)(train_features, y_train, classifier_params)
+        for _, train_features, _, y_train in spaces.values()
+    )
+
+    return {
+        name: (vectorizer, classifier, test_features)
+        for (name, (vectorizer, _, test_features, _)), classifier in zip(spaces.items(), classifiers)
+    }
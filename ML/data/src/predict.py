@@ -1,25 +1,67 @@
-import joblib
+"""Classify complaints with a trained model: interactively or as an offline batch job.
+
+Interactive (the default): type one issue at a time.
+    python predict.py [--model comprehensive_model.joblib]
+
+Batch: stream a CSV or JSON Lines file (optionally .gz) through the
+category and severity pipelines in fixed-size chunks, spread over a pool of
+worker processes that each load the model once, and append predictions to
+the output file (CSV or JSONL, by extension, gzipped for .gz) as chunks finish, in input
+order. At most ``2 * workers`` chunks are in flight, so memory stays flat no
+matter how large the input is.
+    python predict.py --input complaints.jsonl --output predictions.csv \\
+        [--workers 4] [--chunksize 20000] [--keep-columns _id] [--probabilities]
+
+The description is read from a "text" or "description" column.
+"""
+import argparse
+import gzip
 import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def quick_predict():
-    # Find model automatically
-    model_paths = [
-        'comprehensive_model.joblib',
-        'enhanced_model.joblib',
-        'model_tfidf.joblib',
-        'models/comprehensive_model.joblib'
-    ]
-    
-    model_path = None
-    for path in model_paths:
-        if os.path.exists(path):
-            model_path = path
-            break
-    
+import joblib
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The complaint-file readers are shared with the ML server
+sys.path.append(os.path.join(HERE, '..', '..', '..', 'ml-server', 'ml-server'))
+from export_reader import is_jsonl, read_frames  # noqa: E402
+
+# Where train_tfidf.py, incremental_train.py and the ML server keep their models
+MODEL_PATHS = [
+    'comprehensive_model.joblib',
+    os.path.join(HERE, '..', 'comprehensive_model.joblib'),
+    os.path.join(HERE, '..', 'models', 'LATEST'),
+    os.path.join(HERE, '..', '..', '..', 'ml-server', 'ml-server', 'text_model.joblib'),
+]
+
+TEXT_COLUMNS = ('text', 'description')
+
+# Set in each worker process by init_worker
+worker_model = None
+
+def find_model():
+    """First existing model in MODEL_PATHS; a LATEST pointer resolves to the file it names"""
+    for path in MODEL_PATHS:
+        if not os.path.exists(path):
+            continue
+        if os.path.basename(path) == 'LATEST':
+            with open(path) as f:
+                path = os.path.join(os.path.dirname(path), f.read().strip())
+        return path
+    return None
+
+def quick_predict(model_path=None):
+    model_path = model_path or find_model()
     if not model_path:
         print("❌ No trained model found!")
         print("Please train a model first:")
-        print("  python train_with_severity.py")
+        print("  python train_tfidf.py")
         return
     
     print(f"✅ Loaded model: {model_path}")
@@ -51,5 +93,131 @@ def quick_predict():
             except Exception as e:
                 print(f"❌ Error: {e}\n")
 
+def read_chunks(path, chunksize):
+    """Yield DataFrames of up to chunksize rows with the description in a 'text' column"""
+    for chunk in read_frames(path, chunksize):
+        column = next((name for name in TEXT_COLUMNS if name in chunk.columns), None)
+        if column is None:
+            raise ValueError(f"{path} has no {' or '.join(TEXT_COLUMNS)} column")
+        chunk['text'] = chunk[column].fillna('').astype(str)
+        yield chunk
+
+def init_worker(model_path):
+    global worker_model
+    worker_model = joblib.load(model_path)
+
+def score_texts(texts, probabilities=False, model_data=None):
+    """Labels, confidences and optionally every class probability for a list of texts"""
+    model_data = model_data or worker_model
+    scored = {}
+    for name, pipeline_key, encoder_key in (('category', 'category_pipeline', 'label_encoder'),
+                                             ('severity', 'severity_pipeline', 'severity_encoder')):
+        pipeline = model_data[pipeline_key]
+        proba = pipeline.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        names = model_data[encoder_key].inverse_transform(pipeline[-1].classes_)
+        scored[name] = names[best]
+        scored[f'{name}_confidence'] = proba[np.arange(len(texts)), best].round(4)
+        if probabilities:
+            for column, class_name in enumerate(names):
+                scored[f'p_{name}_{class_name}'] = proba[:, column].round(4)
+    return scored
+
+def write_chunk(f, frame, jsonl, first):
+    if jsonl:
+        frame.to_json(f, orient='records', lines=True)
+    else:
+        frame.to_csv(f, header=first, index=False)
+
+def batch_predict(model_path, input_path, output_path, chunksize, workers, keep_columns, probabilities):
+    """Score input_path chunk by chunk into output_path; returns the number of rows written"""
+    model_data = joblib.load(model_path)
+    if 'category_pipeline' not in model_data:
+        raise SystemExit(f"{model_path} is not a category + severity model; retrain with train_tfidf.py")
+    
+    output_jsonl = is_jsonl(output_path)
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(model_path,))
+        model_data = None
+    
+    def finish(chunk, scored):
+        frame = chunk[keep_columns] if keep_columns else pd.DataFrame(index=chunk.index)
+        frame = frame.assign(**scored)
+        write_chunk(out, frame, output_jsonl, first=not written)
+        written.append(len(frame))
+    
+    written = []
+    in_flight = deque()
+    try:
+        opener = gzip.open if output_path.endswith('.gz') else open
+        with opener(output_path, 'wt', encoding='utf-8', newline='') as out:
+            for chunk in read_chunks(input_path, chunksize):
+                texts = chunk['text'].tolist()
+                if executor is None:
+                    finish(chunk, score_texts(texts, probabilities, model_data))
+                    continue
+                
+                in_flight.append((chunk, executor.submit(score_texts, texts, probabilities)))
+                # Write finished chunks in input order and keep at most 2 per worker queued
+                while in_flight and (len(in_flight) >= 2 * workers or in_flight[0][1].done()):
+                    chunk, future = in_flight.popleft()
+                    finish(chunk, future.result())
+            
+            while in_flight:
+                chunk, future = in_flight.popleft()
+                finish(chunk, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return sum(written)
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Largest of this process and its (finished) workers
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Classify complaints interactively or in batch")
+    parser.add_argument('--model', help="model_data joblib (default: first of the known model locations)")
+    parser.add_argument('--input', help="CSV or JSON Lines file of complaints to score in batch")
+    parser.add_argument('--output', help="where to write predictions (CSV, or JSON Lines for .jsonl)")
+    parser.add_argument('--chunksize', type=int, default=20000, help="rows per chunk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="scoring processes; 1 scores in this process")
+    parser.add_argument('--keep-columns', nargs='*', default=[],
+                        help="input columns copied to the output, e.g. _id")
+    parser.add_argument('--probabilities', action='store_true',
+                        help="also write every class probability (p_category_*, p_severity_*)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not args.input:
+        quick_predict(args.model)
+        return
+    if not args.output:
+        raise SystemExit("--input needs --output")
+    
+    model_path = args.model or find_model()
+    if not model_path:
+        raise SystemExit("❌ No trained model found! Train one with: python train_tfidf.py")
+    
+    print(f"✅ Scoring {args.input} with {model_path} ({args.workers} workers, {args.chunksize} rows per chunk)")
+    start = time.perf_counter()
+    rows = batch_predict(model_path, args.input, args.output, args.chunksize, max(1, args.workers),
+                         args.keep_columns, args.probabilities)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {rows} predictions written to {args.output} in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+    
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"📈 Peak memory: {peak:.1f} MB")
+
 if __name__ == "__main__":
-    quick_predict()
\ No newline at end of file
+    main()
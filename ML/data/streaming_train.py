@@ -0,0 +1,273 @@
+"""Out-of-core training for train_tfidf.py's --streaming mode.
+
+The full-memory path loads the whole CSV into a DataFrame, keeps every text
+for the split and fits LogisticRegression on one big matrix. Here the dataset
+(CSV or JSON Lines, optionally gzipped) is only ever read chunk by chunk:
+
+1. a scan pass assigns each row to train or test with a streaming stratified
+   split and accumulates n-gram document/term frequencies for the training
+   rows, from which the TF-IDF vocabularies and idf weights are derived with
+   the same min_df / max_df / max_features rules TfidfVectorizer applies;
+2. a few epochs of ``SGDClassifier(loss='log_loss').partial_fit`` over the
+   training rows, shuffled through a bounded buffer;
+3. a final pass scoring the test rows.
+
+Memory is bounded by the chunk size, the shuffle buffer and the n-gram
+frequency tables, not by the number of rows.
+"""
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from incremental_train import iter_batches, shuffle_buffer
+from shared_features import tfidf_features
+
+# The complaint-file readers are shared with the ML server
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ml-server', 'ml-server'))
+from export_reader import read_frames  # noqa: E402
+
+# Export column names used by the complaint database, mapped to the CSV's
+COLUMN_ALIASES = {'description': 'text', 'category': 'label'}
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrames with text/label/severity columns, chunksize rows at a time"""
+    for chunk in read_frames(path, chunksize):
+        aliases = {old: new for old, new in COLUMN_ALIASES.items()
+                   if old in chunk.columns and new not in chunk.columns}
+        chunk = chunk.rename(columns=aliases)
+        chunk['text'] = chunk['text'].fillna('').astype(str)
+        yield chunk[['text', 'label', 'severity']]
+
+
+class StreamingStratifiedSplit:
+    """Assign rows to train/test one at a time, holding out test_size of every label.
+
+    Within each label, rows are sent to the test set at evenly spaced
+    positions starting from a random offset, so each label's test share is
+    within one row of test_size without knowing the label counts up front.
+    The assignment only depends on the seed and the row order, so a fresh
+    splitter replays the same split on every pass over the file.
+    """
+
+    def __init__(self, test_size, seed):
+        self.test_size = test_size
+        self.rng = np.random.default_rng(seed)
+        self.positions = {}
+
+    def test_mask(self, labels):
+        mask = np.zeros(len(labels), dtype=bool)
+        for i, label in enumerate(labels):
+            if label not in self.positions:
+                self.positions[label] = self.rng.random() / self.test_size
+            position = self.positions[label]
+            mask[i] = int((position + 1) * self.test_size) > int(position * self.test_size)
+            self.positions[label] = position + 1
+        return mask
+
+
+def iter_split(path, chunksize, test_size, seed, want_test):
+    """Yield the train (or test) part of every chunk"""
+    splitter = StreamingStratifiedSplit(test_size, seed)
+    for chunk in read_chunks(path, chunksize):
+        test = splitter.test_mask(chunk['label'].tolist())
+        part = chunk[test] if want_test else chunk[~test]
+        if len(part):
+            yield part
+
+
+def scan(path, chunksize, test_size, seed, vectorizer_params):
+    """First pass: n-gram frequencies over the training rows plus label inventories"""
+    analyzer = TfidfVectorizer(**vectorizer_params).build_analyzer()
+    doc_freq = Counter()
+    term_freq = Counter()
+    label_counts = Counter()
+    severity_counts = Counter()
+    labels, severities = set(), set()
+    n_train = n_test = 0
+
+    splitter = StreamingStratifiedSplit(test_size, seed)
+    for chunk in read_chunks(path, chunksize):
+        labels.update(chunk['label'])
+        severities.update(chunk['severity'])
+        test = splitter.test_mask(chunk['label'].tolist())
+        n_test += int(test.sum())
+
+        train = chunk[~test]
+        n_train += len(train)
+        label_counts.update(train['label'])
+        severity_counts.update(train['severity'])
+        for text in train['text']:
+            grams = Counter(analyzer(text))
+            term_freq.update(grams)
+            doc_freq.update(grams.keys())
+
+    return {
+        'doc_freq': doc_freq,
+        'term_freq': term_freq,
+        'label_counts': label_counts,
+        'severity_counts': severity_counts,
+        'labels': sorted(labels),
+        'severities': sorted(severities),
+        'n_train': n_train,
+        'n_test': n_test,
+    }
+
+
+def prune_terms(doc_freq, term_freq, n_docs, vectorizer_params):
+    """Apply min_df/max_df like CountVectorizer; returns sorted terms with their df and tf"""
+    min_df = vectorizer_params.get('min_df', 1)
+    max_df = vectorizer_params.get('max_df', 1.0)
+    min_count = min_df if isinstance(min_df, int) else min_df * n_docs
+    max_count = max_df if isinstance(max_df, int) else max_df * n_docs
+    if max_count < min_count:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    terms = np.array(sorted(term for term, count in doc_freq.items()
+                            if min_count <= count <= max_count), dtype=str)
+    if not len(terms):
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    dfs = np.array([doc_freq[term] for term in terms.tolist()], dtype=np.int64)
+    tfs = np.array([term_freq[term] for term in terms.tolist()], dtype=np.int64)
+    return terms, dfs, tfs
+
+
+def derive_streaming_vectorizer(terms, dfs, tfs, n_docs, vectorizer_params):
+    """Fitted TfidfVectorizer from streamed counts, matching TfidfVectorizer.fit.
+
+    Returns (vectorizer, transformer, kept_columns) like
+    ``shared_features.derive_vectorizer``.
+    """
+    limit = vectorizer_params.get('max_features')
+    kept = np.arange(len(terms))
+    if limit is not None and len(kept) > limit:
+        # Same top-N by corpus term frequency as CountVectorizer._limit_features
+        kept = np.sort((-tfs).argsort()[:limit])
+
+    vectorizer = TfidfVectorizer(**vectorizer_params)
+    if not vectorizer.use_idf:
+        raise ValueError("Streaming training requires use_idf=True")
+
+    # TfidfTransformer's idf with smoothing, computed from document frequencies
+    smooth = float(vectorizer.smooth_idf)
+    idf = np.log((n_docs + int(vectorizer.smooth_idf)) / (dfs[kept].astype(np.float64) + smooth)) + 1.0
+
+    transformer = TfidfTransformer(
+        norm=vectorizer.norm,
+        use_idf=vectorizer.use_idf,
+        smooth_idf=vectorizer.smooth_idf,
+        sublinear_tf=vectorizer.sublinear_tf,
+    )
+    transformer.idf_ = idf
+    transformer.n_features_in_ = len(kept)
+
+    vectorizer.vocabulary_ = {term: index for index, term in enumerate(terms[kept].tolist())}
+    vectorizer.idf_ = idf
+    return vectorizer, transformer, kept
+
+
+def balanced_class_weight(counts, classes):
+    """class_weight='balanced' from streamed counts (partial_fit can't compute it itself)"""
+    total = sum(counts.values())
+    present = [label for label in classes if counts[label]]
+    return {index: total / (len(present) * counts[label])
+            for index, label in enumerate(classes) if counts[label]}
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB, or None where unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def train_streaming(path, vectorizer_params, max_features, classifier_params, test_size, seed,
+                    chunksize=10000, epochs=5, buffer_size=100000):
+    """Train both pipelines without holding the dataset in memory.
+
+    ``max_features`` maps 'category'/'severity' to that model's feature cap.
+    Returns (model_data, evaluation) where evaluation maps each target to
+    (y_true, y_pred) encoded test labels.
+    """
+    print(f"Scanning {path} in chunks of {chunksize} rows...")
+    stats = scan(path, chunksize, test_size, seed, vectorizer_params)
+    n_train = stats['n_train']
+    print(f"Dataset streamed: {n_train + stats['n_test']} samples "
+          f"({n_train} train / {stats['n_test']} test), {len(stats['doc_freq'])} distinct n-grams")
+
+    terms, dfs, tfs = prune_terms(stats['doc_freq'], stats['term_freq'], n_train, vectorizer_params)
+    del stats['doc_freq'], stats['term_freq']
+
+    encoders = {
+        'category': LabelEncoder().fit(stats['labels']),
+        'severity': LabelEncoder().fit(stats['severities']),
+    }
+    targets = {
+        'category': ('label', stats['label_counts']),
+        'severity': ('severity', stats['severity_counts']),
+    }
+
+    # One CountVectorizer over every df-pruned term counts each batch once;
+    # both models cut their own columns out of it
+    params = {name: value for name, value in vectorizer_params.items() if name != 'max_features'}
+    counter = CountVectorizer(vocabulary={term: index for index, term in enumerate(terms.tolist())}, **params)
+
+    spaces = {}
+    classifiers = {}
+    for name, (field, counts) in targets.items():
+        target_params = {**vectorizer_params, 'max_features': max_features[name]}
+        spaces[name] = derive_streaming_vectorizer(terms, dfs, tfs, n_train, target_params)
+
+        sgd_params = {
+            'loss': 'log_loss',
+            # LogisticRegression's C in SGD terms: alpha = 1 / (C * n_samples)
+            'alpha': 1.0 / (classifier_params.get('C', 1.0) * n_train),
+            'random_state': classifier_params.get('random_state'),
+        }
+        if classifier_params.get('class_weight') == 'balanced':
+            sgd_params['class_weight'] = balanced_class_weight(counts, encoders[name].classes_)
+        classifiers[name] = SGDClassifier(**sgd_params)
+
+    def features(texts):
+        counts = counter.transform(texts)
+        return {name: tfidf_features(counts, transformer, kept, vectorizer.dtype)
+                for name, (vectorizer, transformer, kept) in spaces.items()}
+
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        print(f"Epoch {epoch + 1}/{epochs}: partial_fit over training chunks...")
+        rows = (row for part in iter_split(path, chunksize, test_size, seed, want_test=False)
+                for row in part.itertuples(index=False))
+        for batch in iter_batches(shuffle_buffer(rows, buffer_size, rng), chunksize):
+            batch_features = features([row.text for row in batch])
+            for name, (field, _) in targets.items():
+                y = encoders[name].transform([getattr(row, field) for row in batch])
+                classifiers[name].partial_fit(batch_features[name], y,
+                                              classes=np.arange(len(encoders[name].classes_)))
+
+    evaluation = {name: ([], []) for name in targets}
+    for part in iter_split(path, chunksize, test_size, seed, want_test=True):
+        part_features = features(part['text'].tolist())
+        for name, (field, _) in targets.items():
+            y_true, y_pred = evaluation[name]
+            y_true.extend(encoders[name].transform(part[field]))
+            y_pred.extend(classifiers[name].predict(part_features[name]))
+
+    model_data = {
+        'category_pipeline': Pipeline([('tfidf', spaces['category'][0]), ('clf', classifiers['category'])]),
+        'severity_pipeline': Pipeline([('tfidf', spaces['severity'][0]), ('clf', classifiers['severity'])]),
+        'label_encoder': encoders['category'],
+        'severity_encoder': encoders['severity'],
+    }
+    evaluation = {name: (np.array(y_true), np.array(y_pred)) for name, (y_true, y_pred) in evaluation.items()}
+    return model_data, evaluation
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The training scripts are imported as top-level modules, as they import each other
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
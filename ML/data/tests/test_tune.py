@@ -0,0 +1,32 @@
+import json
+
+import numpy as np
+
+from tune import tune
+
+TEXTS = [
+    "large pothole on the main road", "deep pothole damaging cars", "crack in the road surface",
+    "pothole near the school gate", "no water supply since morning", "water pipe leaking on street",
+    "low water pressure in taps", "burst water main flooding", "garbage not collected for days",
+    "overflowing trash bins in park", "litter dumped near the market", "garbage piling up outside",
+]
+LABELS = np.array(["road"] * 4 + ["water"] * 4 + ["garbage"] * 4)
+SEVERITIES = np.array(["high", "high", "low", "low"] * 3)
+
+
+def test_each_target_keeps_its_own_cap_when_the_grid_does_not_search_it(tmp_path):
+    best = tune(TEXTS, {'category': LABELS, 'severity': SEVERITIES}, {'clf__C': [1.0, 3.0]},
+                {'ngram_range': (1, 1)}, {'max_iter': 500}, str(tmp_path),
+                max_features={'category': 7, 'severity': 5}, folds=2, n_jobs=1)
+
+    assert best['category'][1] == 7
+    assert best['severity'][1] == 5
+    report = json.loads((tmp_path / 'best_params.json').read_text())
+    assert {name: target['max_features'] for name, target in report['targets'].items()} == \
+        {'category': 7, 'severity': 5}
+
+
+def test_a_searched_cap_overrides_the_default(tmp_path):
+    best = tune(TEXTS, {'category': LABELS}, {'select__max_features': [3]}, {'ngram_range': (1, 1)},
+                {'max_iter': 500}, str(tmp_path), max_features={'category': 7}, folds=2, n_jobs=1)
+    assert best['category'][1] == 3
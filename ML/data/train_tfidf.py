@@ -1,7 +1,9 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.multioutput import MultiOutputClassifier
@@ -10,9 +12,107 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 
-def main():
+from serving_export import WEIGHT_PRECISIONS, describe_export, export_serving_artifact
+from streaming_train import peak_memory_mb, train_streaming
+
+# Both vectorizers share these settings and differ only in max_features
+TFIDF_PARAMS = {
+    'ngram_range': (1, 2),
+    'min_df': 2,
+    'max_df': 0.9,
+    'stop_words': 'english'
+}
+CATEGORY_MAX_FEATURES = 15000
+SEVERITY_MAX_FEATURES = 10000
+
+CLASSIFIER_PARAMS = {
+    'max_iter': 2000,
+    'class_weight': 'balanced',
+    'C': 1.0,
+    'random_state': 42
+}
+
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+# First stage of smart_server's cascade: hashed unigrams need no vocabulary and
+# are computed once for both classifiers
+FAST_HASHING_PARAMS = {
+    'ngram_range': (1, 1),
+    'stop_words': 'english',
+    'alternate_sign': False,
+    'n_features': 2 ** 16,
+    'norm': 'l2'
+}
+# Weaker regularization so the first stage is confident where the words are unambiguous
+FAST_CLASSIFIER_PARAMS = {**CLASSIFIER_PARAMS, 'C': 10.0}
+
+def build_pipeline(max_features, tfidf_params=None, classifier_params=None):
+    """TF-IDF + LogisticRegression pipeline with the project's (or tuned) settings"""
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(max_features=max_features, **(tfidf_params or TFIDF_PARAMS))),
+        ('clf', LogisticRegression(**(classifier_params or CLASSIFIER_PARAMS)))
+    ])
+
+def build_fast_pipeline():
+    """Hashed unigram + LogisticRegression pipeline for the cascade's first stage"""
+    return Pipeline([
+        ('hash', HashingVectorizer(**FAST_HASHING_PARAMS)),
+        ('clf', LogisticRegression(**FAST_CLASSIFIER_PARAMS))
+    ])
+
+def train_fast_model(X_train, y_train_label, y_train_severity, le_label, le_severity):
+    """Fit the cascade's first-stage pipelines in the same model_data layout"""
+    category_pipeline = build_fast_pipeline().fit(X_train, y_train_label)
+    severity_pipeline = build_fast_pipeline().fit(X_train, y_train_severity)
+    return {
+        'category_pipeline': category_pipeline,
+        'severity_pipeline': severity_pipeline,
+        'label_encoder': le_label,
+        'severity_encoder': le_severity
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the category and severity TF-IDF classifiers")
+    parser.add_argument('--data', default='urban_issues_dataset.csv')
+    parser.add_argument('--output', default='comprehensive_model.joblib')
+    parser.add_argument('--export-serving', metavar='DIR',
+                        help="also write an mmap-friendly serving artifact (see serving_export.py)")
+    parser.add_argument('--export-precision', choices=WEIGHT_PRECISIONS, default='float64',
+                        help="--export-serving weight storage; float32/int8 write a compact artifact "
+                             "with one shared vocabulary")
+    parser.add_argument('--prune-below', type=float, default=0.0, metavar='WEIGHT',
+                        help="--export-serving: drop features whose largest |coefficient| is below WEIGHT")
+    parser.add_argument('--shared-features', action='store_true',
+                        help="tokenize once for both models and fit them in parallel (see shared_features.py)")
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help="parallel classifier fits in --shared-features mode, parallel candidates in --tune mode")
+    parser.add_argument('--cache-dir', default='.feature_cache',
+                        help="where --shared-features caches count matrices ('' to disable)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="read --data in chunks and train out-of-core (see streaming_train.py)")
+    parser.add_argument('--chunksize', type=int, default=10000,
+                        help="rows per chunk in --streaming mode")
+    parser.add_argument('--epochs', type=int, default=5,
+                        help="partial_fit passes over the training rows in --streaming mode")
+    parser.add_argument('--tune', action='store_true',
+                        help="cross-validated hyperparameter search before fitting (see tune.py)")
+    parser.add_argument('--search', choices=('grid', 'halving'), default='grid',
+                        help="--tune strategy: exhaustive grid or successive halving")
+    parser.add_argument('--tune-grid', metavar='JSON',
+                        help="parameter grid for --tune (default: tune.DEFAULT_GRID)")
+    parser.add_argument('--tune-dir', default='tuning',
+                        help="where --tune writes best_params.json and the results tables")
+    parser.add_argument('--cv-folds', type=int, default=3)
+    parser.add_argument('--scoring', default='f1_macro', help="scikit-learn scorer for --tune")
+    parser.add_argument('--fast-model', metavar='PATH',
+                        help="also train the hashed unigram first stage for smart_server's --cascade-model")
+    return parser.parse_args()
+
+def train_in_memory(args):
+    """Load the whole dataset and fit both pipelines; returns (model_data, evaluation)"""
     # Load the comprehensive dataset
-    df = pd.read_csv('urban_issues_dataset.csv')
+    df = pd.read_csv(args.data)
     
     print(f"Dataset loaded: {len(df)} samples")
     print(f"Categories: {df['label'].nunique()}")
@@ -33,74 +133,134 @@ def main():
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y_label
+        X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=y_label
     )
     
     # Split multi-output targets
     y_train_label, y_train_severity = y_train[:, 0], y_train[:, 1]
     y_test_label, y_test_severity = y_test[:, 0], y_test[:, 1]
     
-    # Create pipeline for classification
-    pipeline = Pipeline([
-        ('tfidf', TfidfVectorizer(
-            ngram_range=(1, 2),
-            max_features=15000,
-            min_df=2,
-            max_df=0.9,
-            stop_words='english'
-        )),
-        ('clf', LogisticRegression(
-            max_iter=2000,
-            class_weight='balanced',
-            C=1.0,
-            random_state=42
-        ))
-    ])
-    
-    # Train label classifier
-    print("Training category classifier...")
-    pipeline.fit(X_train, y_train_label)
-    
-    # Predictions for category
-    y_pred_label = pipeline.predict(X_test)
-    
-    print("\n📊 Category Classification Results:")
-    print(classification_report(y_test_label, y_pred_label, target_names=le_label.classes_))
-    
-    # Train severity classifier
-    print("Training severity classifier...")
-    pipeline_severity = Pipeline([
-        ('tfidf', TfidfVectorizer(
-            ngram_range=(1, 2),
-            max_features=10000,
-            min_df=2,
-            max_df=0.9,
-            stop_words='english'
-        )),
-        ('clf', LogisticRegression(
-            max_iter=2000,
-            class_weight='balanced',
-            C=1.0,
-            random_state=42
-        ))
-    ])
-    
-    pipeline_severity.fit(X_train, y_train_severity)
-    y_pred_severity = pipeline_severity.predict(X_test)
+    if args.tune:
+        from tune import DEFAULT_GRID, load_grid, tune
+        
+        best = tune(
+            X_train, {'category': y_train_label, 'severity': y_train_severity},
+            load_grid(args.tune_grid) if args.tune_grid else DEFAULT_GRID,
+            TFIDF_PARAMS, CLASSIFIER_PARAMS, args.tune_dir,
+            max_features={'category': CATEGORY_MAX_FEATURES, 'severity': SEVERITY_MAX_FEATURES},
+            search=args.search, scoring=args.scoring, folds=args.cv_folds, seed=SPLIT_SEED,
+            n_jobs=args.n_jobs, cache_dir=os.path.join(args.cache_dir, 'pipeline') if args.cache_dir else None
+        )
+        
+        # Refit the winners as ordinary TfidfVectorizer pipelines on the whole training split
+        print("Training tuned category and severity classifiers...")
+        pipeline = build_pipeline(best['category'][1], best['category'][0], best['category'][2])
+        pipeline.fit(X_train, y_train_label)
+        y_pred_label = pipeline.predict(X_test)
+        pipeline_severity = build_pipeline(best['severity'][1], best['severity'][0], best['severity'][2])
+        pipeline_severity.fit(X_train, y_train_severity)
+        y_pred_severity = pipeline_severity.predict(X_test)
+    elif args.shared_features:
+        from shared_features import dataset_cache_key, train_shared
+        
+        targets = {
+            'category': ({**TFIDF_PARAMS, 'max_features': CATEGORY_MAX_FEATURES}, y_train_label),
+            'severity': ({**TFIDF_PARAMS, 'max_features': SEVERITY_MAX_FEATURES}, y_train_severity)
+        }
+        cache_key = None
+        if args.cache_dir:
+            cache_key = dataset_cache_key(args.data, TFIDF_PARAMS,
+                                          {'test_size': TEST_SIZE, 'random_state': SPLIT_SEED})
+        
+        print("Training category and severity classifiers on shared features...")
+        trained = train_shared(X_train, X_test, targets, CLASSIFIER_PARAMS,
+                               cache_dir=args.cache_dir or None, cache_key=cache_key, n_jobs=args.n_jobs)
+        
+        category_vectorizer, category_clf, category_test_features = trained['category']
+        severity_vectorizer, severity_clf, severity_test_features = trained['severity']
+        pipeline = Pipeline([('tfidf', category_vectorizer), ('clf', category_clf)])
+        pipeline_severity = Pipeline([('tfidf', severity_vectorizer), ('clf', severity_clf)])
+        
+        y_pred_label = category_clf.predict(category_test_features)
+        y_pred_severity = severity_clf.predict(severity_test_features)
+    else:
+        # Create pipeline for classification
+        pipeline = build_pipeline(CATEGORY_MAX_FEATURES)
+        
+        # Train label classifier
+        print("Training category classifier...")
+        pipeline.fit(X_train, y_train_label)
+        
+        # Predictions for category
+        y_pred_label = pipeline.predict(X_test)
+        
+        # Train severity classifier
+        print("Training severity classifier...")
+        pipeline_severity = build_pipeline(SEVERITY_MAX_FEATURES)
+        
+        pipeline_severity.fit(X_train, y_train_severity)
+        y_pred_severity = pipeline_severity.predict(X_test)
     
-    print("\n📊 Severity Classification Results:")
-    print(classification_report(y_test_severity, y_pred_severity, target_names=le_severity.classes_))
+    if args.fast_model:
+        print("Training fast cascade stage...")
+        fast_model = train_fast_model(X_train, y_train_label, y_train_severity, le_label, le_severity)
+        fast_accuracy = accuracy_score(y_test_label, fast_model['category_pipeline'].predict(X_test))
+        joblib.dump(fast_model, args.fast_model)
+        print(f"✅ Fast model saved to {args.fast_model} (category accuracy {fast_accuracy:.3f})")
     
-    # Save models
     model_data = {
         'category_pipeline': pipeline,
         'severity_pipeline': pipeline_severity,
         'label_encoder': le_label,
         'severity_encoder': le_severity
     }
+    evaluation = {
+        'category': (y_test_label, y_pred_label),
+        'severity': (y_test_severity, y_pred_severity)
+    }
+    return model_data, evaluation
+
+def main():
+    args = parse_args()
+    
+    if args.streaming and (args.fast_model or args.tune):
+        raise SystemExit("--fast-model and --tune are only supported for in-memory training")
+    
+    if args.streaming:
+        model_data, evaluation = train_streaming(
+            args.data, TFIDF_PARAMS,
+            {'category': CATEGORY_MAX_FEATURES, 'severity': SEVERITY_MAX_FEATURES},
+            CLASSIFIER_PARAMS, TEST_SIZE, SPLIT_SEED,
+            chunksize=args.chunksize, epochs=args.epochs
+        )
+    else:
+        model_data, evaluation = train_in_memory(args)
+    
+    pipeline, pipeline_severity = model_data['category_pipeline'], model_data['severity_pipeline']
+    le_label, le_severity = model_data['label_encoder'], model_data['severity_encoder']
+    y_test_label, y_pred_label = evaluation['category']
+    y_test_severity, y_pred_severity = evaluation['severity']
+    
+    print("\n📊 Category Classification Results:")
+    print(classification_report(y_test_label, y_pred_label, labels=np.arange(len(le_label.classes_)),
+                                target_names=le_label.classes_, zero_division=0))
+    
+    print("\n📊 Severity Classification Results:")
+    print(classification_report(y_test_severity, y_pred_severity, labels=np.arange(len(le_severity.classes_)),
+                                target_names=le_severity.classes_, zero_division=0))
+    
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"📈 Peak memory: {peak:.1f} MB")
+    
+    # Save models
+    joblib.dump(model_data, args.output)
+    print(f"\n✅ Comprehensive model saved to {args.output}!")
     
-    joblib.dump(model_data, 'comprehensive_model.joblib')
-    print(f"\n✅ Comprehensive model saved!")
+    if args.export_serving:
+        manifest = export_serving_artifact(model_data, args.export_serving,
+                                           precision=args.export_precision, min_weight=args.prune_below)
+        print(describe_export(args.export_serving, manifest))
     
     # Test predictions
     test_samples = [
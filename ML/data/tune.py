@@ -0,0 +1,177 @@
+"""Hyperparameter search for train_tfidf.py's --tune mode.
+
+Each target (category, severity) gets a cross-validated grid search - or a
+successive-halving one with ``--search halving`` - over the TF-IDF and
+LogisticRegression settings, with candidates fitted in parallel on all
+cores. The search pipeline splits TfidfVectorizer into its stages:
+
+    CountVectorizer (tokenization, min_df, max_df)
+    -> TopTermsSelector (max_features)
+    -> TfidfTransformer
+    -> LogisticRegression
+
+and is given a joblib ``Memory``, so a fitted CountVectorizer is cached per
+fold and tokenization setting: candidates that differ only in max_features
+or C reuse it instead of tokenizing the fold again.
+
+The winner is refit as train_tfidf.py's usual TfidfVectorizer pipeline, so
+the saved model is in the same ``model_data`` layout the servers load.
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Memory
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+DEFAULT_GRID = {
+    'vect__ngram_range': [(1, 1), (1, 2)],
+    'vect__min_df': [1, 2],
+    'vect__max_df': [0.9],
+    'select__max_features': [5000, 10000, 15000],
+    'clf__C': [0.3, 1.0, 3.0, 10.0],
+}
+
+
+class TopTermsSelector(BaseEstimator, TransformerMixin):
+    """Keep the max_features most frequent columns of a count matrix, as CountVectorizer's max_features does"""
+
+    def __init__(self, max_features=None):
+        self.max_features = max_features
+
+    def fit(self, X, y=None):
+        n_features = X.shape[1]
+        if self.max_features is None or n_features <= self.max_features:
+            self.columns_ = np.arange(n_features)
+        else:
+            term_frequencies = np.asarray(X.sum(axis=0)).ravel()
+            self.columns_ = np.sort((-term_frequencies).argsort()[:self.max_features])
+        return self
+
+    def transform(self, X):
+        return X[:, self.columns_]
+
+
+def search_pipeline(tfidf_params, classifier_params, memory=None, max_features=None):
+    """The split search pipeline; ``max_features`` applies whenever the grid doesn't search it"""
+    vectorizer_params = {name: value for name, value in tfidf_params.items() if name != 'max_features'}
+    return Pipeline([
+        ('vect', CountVectorizer(**vectorizer_params)),
+        ('select', TopTermsSelector(max_features)),
+        ('tfidf', TfidfTransformer()),
+        ('clf', LogisticRegression(**classifier_params))
+    ], memory=memory)
+
+
+def load_grid(path):
+    """Parameter grid from a JSON file, e.g. {"clf__C": [0.5, 1, 2], "vect__ngram_range": [[1, 2]]}"""
+    with open(path) as f:
+        grid = json.load(f)
+    if 'vect__ngram_range' in grid:
+        grid['vect__ngram_range'] = [tuple(value) for value in grid['vect__ngram_range']]
+    return grid
+
+
+def to_train_params(best_params, tfidf_params, classifier_params, max_features=None):
+    """Map search parameter names back to train_tfidf.py's (tfidf_params, max_features, classifier_params)"""
+    tfidf_params, classifier_params = dict(tfidf_params), dict(classifier_params)
+    for name, value in best_params.items():
+        step, param = name.split('__', 1)
+        if step == 'vect':
+            tfidf_params[param] = value
+        elif step == 'select':
+            max_features = value
+        elif step == 'clf':
+            classifier_params[param] = value
+        else:
+            raise ValueError(f"Unknown search parameter {name!r}")
+    return tfidf_params, max_features, classifier_params
+
+
+def make_search(pipeline, grid, search, scoring, folds, seed, n_jobs):
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    if search == 'halving':
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+        return HalvingGridSearchCV(pipeline, grid, factor=3, scoring=scoring, cv=cv, n_jobs=n_jobs,
+                                   random_state=seed, refit=False)
+    return GridSearchCV(pipeline, grid, scoring=scoring, cv=cv, n_jobs=n_jobs, refit=False)
+
+
+def results_table(search):
+    """cv_results_ as a DataFrame, best candidates first"""
+    results = pd.DataFrame(search.cv_results_)
+    columns = [column for column in results.columns if column.startswith('param_')]
+    columns += ['mean_test_score', 'std_test_score', 'rank_test_score', 'mean_fit_time']
+    if 'iter' in results.columns:
+        # Halving search: only the last round saw all the data
+        columns = ['iter', 'n_resources'] + columns
+        results = results.sort_values(['iter', 'rank_test_score'], ascending=[False, True])
+    else:
+        results = results.sort_values('rank_test_score')
+    return results[columns]
+
+
+def tune_target(X_train, y_train, grid, tfidf_params, classifier_params, max_features=None, search='grid',
+                scoring='f1_macro', folds=3, seed=42, n_jobs=-1, cache_dir=None):
+    """Search one target; returns (tfidf_params, max_features, classifier_params, best_score, results)"""
+    memory = Memory(cache_dir, verbose=0) if cache_dir else None
+    pipeline = search_pipeline(tfidf_params, classifier_params, memory, max_features)
+    searcher = make_search(pipeline, grid, search, scoring, folds, seed, n_jobs)
+    searcher.fit(X_train, y_train)
+
+    tfidf_params, max_features, classifier_params = to_train_params(
+        searcher.best_params_, tfidf_params, classifier_params, max_features)
+    return tfidf_params, max_features, classifier_params, searcher.best_score_, results_table(searcher)
+
+
+def tune(X_train, targets, grid, tfidf_params, classifier_params, output_dir, max_features=None,
+         **search_options):
+    """Tune every target, write best_params.json and results_<target>.csv to output_dir.
+
+    ``targets`` maps a name to y_train. ``max_features`` maps a name to the
+    vocabulary cap used when the grid has no ``select__max_features``.
+    Returns {name: (tfidf_params, max_features, classifier_params)} for
+    refitting the winners.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_candidates = int(np.prod([len(values) for values in grid.values()]))
+    best, report = {}, {'search': search_options.get('search', 'grid'),
+                        'scoring': search_options.get('scoring', 'f1_macro'),
+                        'folds': search_options.get('folds', 3), 'grid': grid, 'targets': {}}
+
+    caps = max_features or {}
+    for name, y_train in targets.items():
+        print(f"🔍 Tuning {name}: {n_candidates} candidates x {report['folds']} folds...")
+        start = time.perf_counter()
+        target_tfidf, target_max_features, target_classifier, score, results = tune_target(
+            X_train, y_train, grid, tfidf_params, classifier_params,
+            max_features=caps.get(name), **search_options)
+        elapsed = time.perf_counter() - start
+
+        results.to_csv(os.path.join(output_dir, f'results_{name}.csv'), index=False)
+        best[name] = (target_tfidf, target_max_features, target_classifier)
+        report['targets'][name] = {
+            'cv_score': score,
+            'tfidf_params': target_tfidf,
+            'max_features': target_max_features,
+            'classifier_params': target_classifier,
+            'search_seconds': round(elapsed, 2),
+        }
+        print(f"   best {report['scoring']} {score:.3f} in {elapsed:.1f}s: "
+              f"{target_tfidf}, max_features={target_max_features}, C={target_classifier.get('C')}")
+
+    tokenizations = {json.dumps(params, sort_keys=True, default=str) for params, _, _ in best.values()}
+    if len(tokenizations) > 1:
+        print("⚠️  The targets' best tokenization settings differ; the servers will tokenize each text twice")
+
+    with open(os.path.join(output_dir, 'best_params.json'), 'w') as f:
+        json.dump(report, f, indent=2, default=list)
+    print(f"✅ Best configuration and results tables written to {output_dir}/")
+    return best
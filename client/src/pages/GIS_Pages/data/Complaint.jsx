@@ -115,19 +115,20 @@ const ComplaintForm = () => {
 
   const FLASK_SERVER_URL = 'http://localhost:5000';
 
-  // Department mapping based on problem type
+  // Department per problem type, for manual selection and offline predictions.
+  // Mirrors hazard_types in ml-server/routing_rules.json; values must be in the Complaint schema's department enum.
   const departmentMapping = {
-    'Potholes': 'Road Maintenance Department',
-    'Road Damage': 'Road Maintenance Department',
-    'Electrical Hazards': 'Electrical Department',
-    'Water Supply': 'Water Department',
-    'Sewage & Drainage': 'Sewage Department',
+    'Potholes': 'Public Works Department (PWD)',
+    'Road Damage': 'Public Works Department (PWD)',
+    'Electrical Hazards': 'Electricity Department',
+    'Water Supply': 'Water Supply Department',
+    'Sewage & Drainage': 'Sanitation Department',
     'Garbage Collection': 'Sanitation Department',
-    'Street Lights': 'Electrical Department',
-    'Noise Pollution': 'Environmental Department',
-    'Illegal Construction': 'Building Department',
-    'Public Safety': 'Police Department',
-    'Other': 'General Complaints Department'
+    'Street Lights': 'Electricity Department',
+    'Noise Pollution': 'Parks & Environment Department',
+    'Illegal Construction': 'Public Works Department (PWD)',
+    'Public Safety': 'Public Works Department (PWD)',
+    'Other': 'Public Works Department (PWD)'
   };
 
   // Check server health on component mount
@@ -268,7 +269,8 @@ const ComplaintForm = () => {
             ...prev,
             complaintType: prediction.hazard_type,
             urgency: prediction.severity,
-            department: departmentMapping[prediction.hazard_type] || 'General Complaints Department'
+            // The ML service routes each prediction; the local table only covers offline fallbacks
+            department: prediction.department || departmentMapping[prediction.hazard_type] || departmentMapping['Other']
           }));
           setAutoDetected(true);
         }
@@ -1,44 +1,47 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
-import joblib
-import numpy as np
 import re
 import os
 from datetime import datetime
 
+from inference import CompiledModel, model_file_version
+from prediction_cache import PredictionCache
+from request_profiler import RequestProfiler
+from routing_table import UNROUTED, RoutingRules
+from serving_artifact import load_model_data
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Load your trained model
+# Opt-in sampled profiling (ML_PROFILE_RATE etc.), served on /admin/profile
+request_profiler = RequestProfiler.from_env()
+ADMIN_TOKEN = os.environ.get('ML_ADMIN_TOKEN')
+
+def profiled_wsgi_app(environ, start_response, wsgi_app=app.wsgi_app):
+    """Run the Flask app under the request profiler for a sampled fraction of requests"""
+    return request_profiler.run_request(environ.get('PATH_INFO', ''), wsgi_app, environ, start_response)
+
+app.wsgi_app = profiled_wsgi_app
+
+# Predictions keyed on (model_version, preprocessed text); sized by ML_CACHE_SIZE / ML_CACHE_TTL
+prediction_cache = PredictionCache.from_env()
+
+# Load your trained model (a joblib file or a serving artifact directory)
+MODEL_PATH = os.environ.get('ML_MODEL_PATH', 'text_model.joblib')
 try:
-    model = joblib.load('text_model.joblib')
+    model = CompiledModel(load_model_data(MODEL_PATH), version=model_file_version(MODEL_PATH))
+    prediction_cache.clear()
     print("Model loaded successfully!")
 except Exception as e:
     print(f"Error loading model: {e}")
     model = None
 
-# Hazard type mapping (adjust based on your model's output)
-HAZARD_TYPES = {
-    0: "Potholes",
-    1: "Electrical Hazards", 
-    2: "Water Supply",
-    3: "Sewage & Drainage",
-    4: "Road Damage",
-    5: "Street Lights",
-    6: "Garbage Collection",
-    7: "Public Safety",
-    8: "Noise Pollution",
-    9: "Illegal Construction",
-    10: "Other"
-}
-
-# Severity mapping (adjust based on your model's output)
-SEVERITY_LEVELS = {
-    0: "low",
-    1: "medium", 
-    2: "high",
-    3: "critical"
-}
+# Label -> hazard type, shared with smart_server.py; without it every hazard is "Other"
+try:
+    routing_rules = RoutingRules.from_file()
+except (OSError, ValueError) as e:
+    print(f"Error loading routing rules: {e}")
+    routing_rules = None
 
 def preprocess_text(text):
     """Preprocess the complaint description text"""
@@ -87,38 +90,27 @@ def predict_complaint():
                 "error": "Model not loaded properly"
             }), 500
         
-        # Make prediction (adjust this based on your model's predict method)
-        # This assumes your model returns (hazard_type, severity) or similar
+        cache_key = PredictionCache.make_key(model.version, processed_text)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            cached.update(processed_text=processed_text, original_text=description)
+            return jsonify(cached)
+        
         try:
             prediction = model.predict([processed_text])
+            category = str(prediction['category'][0])
+            route = routing_rules.route(category) if routing_rules else UNROUTED
             
-            # Adjust this part based on your model's output format
-            if isinstance(prediction, np.ndarray):
-                prediction = prediction.tolist()
-            
-            # If model returns multiple outputs (type and severity)
-            if isinstance(prediction[0], (list, np.ndarray)):
-                hazard_pred = prediction[0][0] if len(prediction[0]) > 0 else prediction[0]
-                severity_pred = prediction[0][1] if len(prediction[0]) > 1 else 1
-            else:
-                # Single output - adjust based on your model
-                hazard_pred = prediction[0]
-                severity_pred = 1  # Default medium severity
-            
-            # Map numerical predictions to labels
-            hazard_type = HAZARD_TYPES.get(int(hazard_pred), "Other")
-            severity = SEVERITY_LEVELS.get(int(severity_pred), "medium")
+            result = {
+                "hazard_type": route['hazard_type'],
+                "category": category,
+                "severity": str(prediction['severity'][0]),
+                "confidence": round(float(prediction['category_confidence'][0]), 2)
+            }
+            prediction_cache.put(cache_key, result)
             
-            # Calculate confidence scores (if your model supports it)
-            confidence = 0.85  # Default or calculate from model
-            
-            return jsonify({
-                "hazard_type": hazard_type,
-                "severity": severity,
-                "confidence": round(confidence, 2),
-                "processed_text": processed_text,
-                "original_text": description
-            })
+            result.update(processed_text=processed_text, original_text=description)
+            return jsonify(result)
             
         except Exception as model_error:
             print(f"Model prediction error: {model_error}")
@@ -137,8 +129,32 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "model_loaded": model is not None,
+        "model_version": model.version if model else None,
         "timestamp": datetime.now().isoformat()
     })
 
+@app.route('/stats')
+def stats():
+    return jsonify({
+        "model_version": model.version if model else None,
+        "cache": prediction_cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/admin/profile')
+def profile():
+    """Aggregated profile: ?format=text|pstats|collapsed|stats&window=last|current"""
+    if ADMIN_TOKEN is not None and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({"error": "Invalid admin token"}), 403
+    
+    output_format = request.args.get('format', 'text')
+    if output_format == 'stats':
+        return jsonify(request_profiler.stats())
+    try:
+        content_type, body = request_profiler.export(request.args.get('window', 'last'), output_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return app.response_class(body, content_type=content_type)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
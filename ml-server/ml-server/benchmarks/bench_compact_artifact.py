@@ -0,0 +1,126 @@
+"""Report: size, memory and accuracy of compact serving artifacts vs the full model.
+
+Exports the model as a full (float64, version 1) artifact and as compact
+variants - float32 or int8 weights, optionally pruned with --min-weights -
+then for each one reports the size on disk, the memory a fresh worker process
+needs to load it and score a text (RSS and private memory above the bare
+imports), held-out accuracy on train_tfidf.py's test split, and how far its
+predictions move from the full model's.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_compact_artifact.py [--model text_model.joblib] [--min-weights 0 0.05 0.1]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAINING_DIR = os.path.join(SERVER_DIR, '..', '..', 'ML', 'data')
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, TRAINING_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_startup import memory_kb  # noqa: E402
+from serving_export import artifact_size, export_serving_artifact  # noqa: E402
+
+DEFAULT_DATA = os.path.join(TRAINING_DIR, 'urban_issues_dataset.csv')
+
+# train_tfidf.py's held-out split
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+
+def child(path, engine):
+    """Worker process body: import, load the artifact, score once, report memory growth"""
+    if engine == 'numpy':
+        from numpy_engine import NumpyModel
+        before = memory_kb()
+        model = NumpyModel(path)
+    else:
+        from inference import CompiledModel
+        from serving_artifact import load_model_data
+        import sklearn.feature_extraction.text, sklearn.linear_model, sklearn.pipeline  # noqa: F401
+        before = memory_kb()
+        model = CompiledModel(load_model_data(path))
+    model.predict(["pothole on road"])
+    after = memory_kb()
+    print(json.dumps({key: after[key] - before[key] for key in ('Rss', 'Private')}), flush=True)
+
+
+def load_memory(path, engine):
+    output = subprocess.run([sys.executable, __file__, '--child', path, engine],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_split(model_data, data_path):
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(data_path)
+    y_label = model_data['label_encoder'].transform(df['label'])
+    y_severity = model_data['severity_encoder'].transform(df['severity'])
+    _, X_test, _, y_label_test, _, y_severity_test = train_test_split(
+        df['text'].values, y_label, y_severity, test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=y_label)
+    return X_test.tolist(), y_label_test, y_severity_test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--min-weights', type=float, nargs='+', default=[0.0, 0.05, 0.1])
+    parser.add_argument('--engine', choices=('numpy', 'sklearn'), default='numpy')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from numpy_engine import NumpyModel
+
+    model_data = joblib.load(args.model)
+    texts, y_label, y_severity = test_split(model_data, args.data)
+    variants = [('float64', 0.0)] + [(precision, min_weight) for min_weight in args.min_weights
+                                      for precision in ('float32', 'int8')]
+
+    out_root = tempfile.mkdtemp(prefix='compact-artifacts-')
+    try:
+        print(f"{len(texts)} held-out texts, {args.engine} engine\n")
+        print(f"{'weights':<9}{'min |w|':>8}{'features':>18}{'disk MB':>9}{'RSS MB':>8}{'private MB':>11}"
+              f"{'cat acc':>9}{'sev acc':>9}{'agree':>8}{'max |Δp|':>10}")
+        reference = None
+        for precision, min_weight in variants:
+            path = os.path.join(out_root, f'{precision}-{min_weight:g}')
+            manifest = export_serving_artifact(model_data, path, precision=precision, min_weight=min_weight)
+            memory = load_memory(path, args.engine)
+
+            engine = NumpyModel(path)
+            category_proba, severity_proba = engine.predict_proba(texts)
+            category_pred = np.asarray(engine.models['category'].classes)[category_proba.argmax(axis=1)]
+            severity_pred = np.asarray(engine.models['severity'].classes)[severity_proba.argmax(axis=1)]
+            if reference is None:
+                reference = (category_proba, severity_proba)
+            agreement = np.mean((category_proba.argmax(axis=1) == reference[0].argmax(axis=1)) &
+                                (severity_proba.argmax(axis=1) == reference[1].argmax(axis=1)))
+            max_diff = max(np.abs(category_proba - reference[0]).max(), np.abs(severity_proba - reference[1]).max())
+            features = '/'.join(str(model['n_features']) for model in manifest['models'].values())
+
+            print(f"{precision:<9}{min_weight:>8g}{features:>18}{artifact_size(path) / 1e6:>9.2f}"
+                  f"{memory['Rss'] / 1024:>8.1f}{memory['Private'] / 1024:>11.1f}"
+                  f"{np.mean(category_pred == y_label):>9.3f}{np.mean(severity_pred == y_severity):>9.3f}"
+                  f"{agreement:>8.3f}{max_diff:>10.2e}")
+    finally:
+        shutil.rmtree(out_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
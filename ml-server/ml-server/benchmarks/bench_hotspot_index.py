@@ -0,0 +1,115 @@
+"""Hotspot index build, insert and query latency at up to millions of complaints.
+
+Synthetic classified complaints are scattered over a 30 x 30 km city: 70%
+uniformly, 30% in a few hundred Gaussian clusters (the hotspots), with the
+hazard types and severities of the classifier's labels. For every index size
+the script reports the vectorized bulk build time, memory, the rate of
+single inserts (including the periodic merges), and query latency
+percentiles for
+
+- summary: exact counts by hazard and severity in a random 1-10 km box
+- top10: the 10 hottest cells of the whole index
+- top10 box x4: the 10 hottest 4 x 4 cell blocks in a random box, high severity only
+
+The brute-force column answers the same summary boxes by testing every point,
+which is what the cell table avoids.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_hotspot_index.py [--sizes 100000 1000000 5000000] [--queries 300]
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hotspot_index import HotspotIndex, in_bbox  # noqa: E402
+
+# Roughly Bengaluru; 0.27 degrees is about 30 km
+CITY_ORIGIN = (12.85, 77.45)
+CITY_SPAN = 0.27
+
+HAZARD_TYPES = np.array(['Potholes', 'Electrical Hazards', 'Garbage Collection', 'Water Supply', 'Sewage & Drainage',
+                         'Street Lights', 'Noise Pollution', 'Illegal Construction', 'Public Safety', 'Other'])
+SEVERITIES = np.array(['low', 'medium', 'high'])
+
+
+def synthetic_points(size, rng):
+    clustered = int(size * 0.3)
+    centers = rng.random((300, 2)) * CITY_SPAN
+    which = rng.integers(len(centers), size=clustered)
+    offsets = np.vstack([rng.random((size - clustered, 2)) * CITY_SPAN,
+                         centers[which] + rng.normal(scale=0.003, size=(clustered, 2))])
+    return (CITY_ORIGIN[0] + offsets[:, 0], CITY_ORIGIN[1] + offsets[:, 1],
+            HAZARD_TYPES[rng.integers(len(HAZARD_TYPES), size=size)],
+            SEVERITIES[rng.integers(len(SEVERITIES), size=size)])
+
+
+def random_boxes(count, rng):
+    sides = rng.uniform(0.01, 0.09, size=count)
+    south = CITY_ORIGIN[0] + rng.random(count) * (CITY_SPAN - sides)
+    west = CITY_ORIGIN[1] + rng.random(count) * (CITY_SPAN - sides)
+    return [(s, w, s + side, w + side) for s, w, side in zip(south, west, sides)]
+
+
+def timed(function, arguments):
+    samples = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        samples.append(time.perf_counter() - start)
+    return np.percentile(np.asarray(samples) * 1000, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000, 5000000])
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--inserts', type=int, default=50000)
+    parser.add_argument('--cell-size', type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"{'indexed':>9}{'cells':>7}{'build s':>9}{'RSS MB':>8}{'inserts/s':>11}"
+          f"{'summary p50/p99':>17}{'top10 p50/p99':>15}{'box x4 p50/p99':>16}{'brute ms':>10}")
+
+    for size in args.sizes:
+        rng = np.random.default_rng(0)
+        latitudes, longitudes, hazards, severities = synthetic_points(size + args.inserts, rng)
+
+        start = time.perf_counter()
+        index = HotspotIndex(cell_size=args.cell_size)
+        index.add_many(latitudes[:size], longitudes[:size], hazards[:size], severities[:size])
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(size, size + args.inserts):
+            index.add(latitudes[i], longitudes[i], hazards[i], severities[i])
+        insert_rate = args.inserts / (time.perf_counter() - start)
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        boxes = random_boxes(args.queries, rng)
+        summary = timed(index.aggregate, [(box,) for box in boxes])
+        top = timed(lambda: index.hotspots(10), [()] * args.queries)
+        box_top = timed(lambda box: index.hotspots(10, bbox=box, min_severity='high', scale=4),
+                        [(box,) for box in boxes])
+
+        # Every point tested against the box (a sample of queries is enough)
+        brute = []
+        for box in boxes[:20]:
+            start = time.perf_counter()
+            inside = in_bbox(latitudes, longitudes, box)
+            np.unique(hazards[inside], return_counts=True)
+            brute.append(time.perf_counter() - start)
+
+        print(f"{len(index):>9}{index.stats()['cells']:>7}{build_seconds:>9.2f}{rss_mb:>8.0f}{insert_rate:>11.0f}"
+              f"{summary[0]:>9.2f}/{summary[1]:<7.2f}{top[0]:>7.2f}/{top[1]:<7.2f}"
+              f"{box_top[0]:>8.2f}/{box_top[1]:<7.2f}{np.median(brute) * 1000:>10.1f}")
+        del index
+
+
+if __name__ == '__main__':
+    main()
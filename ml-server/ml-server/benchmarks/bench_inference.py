@@ -0,0 +1,98 @@
+"""Micro-benchmark: per-request inference latency before and after single-pass inference.
+
+Compares the legacy path (predict + predict_proba on both pipelines, four
+TF-IDF transforms per request) with the CompiledModel core, with and without
+shared tokenization, on the texts of urban_issues_dataset.csv.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_inference.py [--model text_model.joblib] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import CompiledModel
+from smart_server import preprocess_text
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', '..', 'ML', 'data', 'urban_issues_dataset.csv')
+
+
+def legacy_predict(model_data, text):
+    """The pre-refactor ml_prediction: predict and predict_proba on each pipeline"""
+    category_pred = model_data['category_pipeline'].predict([text])[0]
+    category_name = model_data['label_encoder'].inverse_transform([category_pred])[0]
+    severity_pred = model_data['severity_pipeline'].predict([text])[0]
+    severity_name = model_data['severity_encoder'].inverse_transform([severity_pred])[0]
+    category_proba = model_data['category_pipeline'].predict_proba([text])[0]
+    severity_proba = model_data['severity_pipeline'].predict_proba([text])[0]
+    return category_name, severity_name, float(np.max(category_proba)), float(np.max(severity_proba))
+
+
+def time_per_request(predict, texts, repeat):
+    """Return per-request latencies in milliseconds"""
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            predict(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(name, latencies, baseline=None):
+    mean = latencies.mean()
+    line = (f"{name:<28} mean {mean:7.3f} ms   p50 {np.percentile(latencies, 50):7.3f} ms   "
+            f"p99 {np.percentile(latencies, 99):7.3f} ms")
+    if baseline is not None:
+        line += f"   speedup x{baseline / mean:.2f}"
+    print(line)
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    model_data = joblib.load(args.model)
+    texts = [preprocess_text(text) for text in pd.read_csv(args.data)['text']]
+
+    shared = CompiledModel(model_data)
+    unshared = CompiledModel(model_data)
+    unshared.shared_tokenizer = None
+
+    # Sanity check: every path must agree on labels before we compare speed
+    legacy = [legacy_predict(model_data, text)[:2] for text in texts]
+    for model in (shared, unshared):
+        prediction = model.predict(texts)
+        assert legacy == list(zip(prediction['category'], prediction['severity'])), "label mismatch"
+
+    print(f"{len(texts)} texts x {args.repeat} repeats, one request per text")
+    print(f"shared tokenization available: {shared.shared_tokenizer is not None}\n")
+
+    baseline = report("legacy (4 transforms)", time_per_request(
+        lambda text: legacy_predict(model_data, text), texts, args.repeat))
+    report("single-pass per pipeline", time_per_request(
+        lambda text: unshared.predict([text]), texts, args.repeat), baseline)
+    report("single-pass + shared tokens", time_per_request(
+        lambda text: shared.predict([text]), texts, args.repeat), baseline)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        shared.predict(texts)
+    per_text = (time.perf_counter() - start) * 1000 / (args.repeat * len(texts))
+    print(f"\nwhole-dataset batch           {per_text:7.3f} ms per text")
+
+
+if __name__ == '__main__':
+    main()
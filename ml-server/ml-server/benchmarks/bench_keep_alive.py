@@ -0,0 +1,151 @@
+"""wrk-style requests/sec with and without connection reuse and orjson.
+
+Starts smart_server.py in threaded and async mode, once per JSON encoder
+(ML_JSON_ENCODER=stdlib / auto, the latter picks orjson when installed), and
+drives it with --connections closed-loop clients spread over --threads
+client processes. Each configuration is measured twice: a fresh TCP
+connection per request, as HTTP/1.0 clients did, and one persistent
+HTTP/1.1 connection per client. A CORS preflight is sent first to check the
+Access-Control-Max-Age the browsers will cache it for.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_keep_alive.py [--connections 32] [--threads 4] [--duration 10] [--path /health]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import SAMPLE_TEXTS, SERVER_DIR, wait_until_healthy  # noqa: E402
+
+
+def request_factory(path):
+    """(method, path, body) for each request number"""
+    if path == '/predict':
+        bodies = [json.dumps({"description": text}) for text in SAMPLE_TEXTS]
+        return lambda i: ('POST', path, bodies[i % len(bodies)])
+    return lambda i: ('GET', path, None)
+
+
+def client_process(port, path, reuse, duration, threads, results):
+    """`threads` closed-loop clients; each sends its next request as soon as a reply arrives"""
+    next_request = request_factory(path)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def loop():
+        own, failed, i = [], 0, 0
+        conn = None
+        while time.time() < deadline:
+            method, target, body = next_request(i)
+            start = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection('localhost', port, timeout=30)
+                conn.request(method, target, body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                if not reuse or response.will_close:
+                    conn.close()
+                    conn = None
+                own.append((time.perf_counter() - start) * 1000)
+            except OSError:
+                failed += 1
+                conn = None
+            i += 1
+        with lock:
+            latencies.extend(own)
+            errors.append(failed)
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((latencies, sum(errors)))
+
+
+def preflight_max_age(port):
+    conn = http.client.HTTPConnection('localhost', port, timeout=5)
+    conn.request('OPTIONS', '/predict', headers={
+        'Origin': 'http://localhost:5173', 'Access-Control-Request-Method': 'POST'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.getheader('Access-Control-Max-Age')
+
+
+def measure(port, path, reuse, connections, threads, duration):
+    per_process = [connections // threads + (i < connections % threads) for i in range(threads)]
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client_process, args=(port, path, reuse, duration, n, results))
+             for n in per_process if n]
+    for proc in procs:
+        proc.start()
+    collected = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    latencies = np.concatenate([np.asarray(lat) for lat, _ in collected]) if collected else np.array([])
+    return {
+        "rps": len(latencies) / duration,
+        "p50": float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        "p99": float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        "errors": sum(failed for _, failed in collected),
+    }
+
+
+def run_config(mode, encoder, args):
+    env = dict(os.environ, ML_JSON_ENCODER=encoder, ML_REQUEST_LOG_RATE='0', ML_CACHE_SIZE='0')
+    server = subprocess.Popen(
+        [sys.executable, 'smart_server.py', '--mode', mode, '--port', str(args.port)],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_healthy(args.port):
+            raise RuntimeError(f"server did not start ({mode}, {encoder})")
+        max_age = preflight_max_age(args.port)
+        rows = [(reuse, measure(args.port, args.path, reuse, args.connections, args.threads, args.duration))
+                for reuse in (False, True)]
+    finally:
+        server.terminate()
+        server.wait()
+    return max_age, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=4, help="client processes the connections are spread over")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--path', choices=('/health', '/predict'), default='/health')
+    parser.add_argument('--modes', nargs='+', default=['threaded', 'async'])
+    parser.add_argument('--port', type=int, default=5058)
+    args = parser.parse_args()
+
+    print(f"{args.path}: {args.connections} connections over {args.threads} client processes, "
+          f"{args.duration:.0f}s per run, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<10}{'json':<8}{'connection':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode in args.modes:
+        for encoder in ('stdlib', 'auto'):
+            max_age, rows = run_config(mode, encoder, args)
+            baseline = rows[0][1]['rps']
+            for reuse, stats in rows:
+                gain = f"  x{stats['rps'] / baseline:.2f}" if reuse and baseline else ''
+                print(f"{mode:<10}{encoder:<8}{'keep-alive' if reuse else 'per-request':<12}"
+                      f"{stats['rps']:>10.1f}{stats['p50']:>10.2f}{stats['p99']:>10.2f}{stats['errors']:>8}{gain}")
+        print(f"{'':<10}preflight Access-Control-Max-Age: {max_age}")
+
+
+if __name__ == '__main__':
+    main()
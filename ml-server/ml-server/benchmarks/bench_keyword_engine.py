@@ -0,0 +1,130 @@
+"""Keyword fallback cost vs rule count: linear substring scans against the compiled automaton.
+
+Builds synthetic rule tables of increasing size (real keywords from
+keyword_rules.json plus generated words and two-word phrases spread over the
+hazard and severity labels), then scores the texts of
+urban_issues_dataset.csv two ways:
+
+  linear     every rule checked with ``pattern in text``, as the old
+             fallback_prediction loops did (but without stopping at the
+             first hit, so all matches are scored)
+  automaton  KeywordEngine: one Aho-Corasick pass per text
+
+Both must find the same matches; the script checks that before timing.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_keyword_engine.py [--sizes 100 1000 10000 50000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_engine import DEFAULT_RULES_PATH, KeywordEngine
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', '..', 'ML', 'data', 'urban_issues_dataset.csv')
+
+
+def synthetic_rules(base_rules, size, vocabulary, seed=0):
+    """Grow base_rules to about `size` substring rules using generated words and phrases"""
+    rng = np.random.default_rng(seed)
+    rules = json.loads(json.dumps(base_rules))
+    tables = [(table, label) for table in ('hazards', 'severities') for label in rules[table]]
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+
+    # Drop whole-word options so the linear baseline matches the same way
+    for table, label in tables:
+        rules[table][label] = {pattern: spec['weight'] if isinstance(spec, dict) else spec
+                               for pattern, spec in rules[table][label].items()}
+
+    count = sum(len(rules[table][label]) for table, label in tables)
+    while count < size:
+        kind = rng.integers(3)
+        if kind == 0:
+            pattern = ''.join(rng.choice(letters, rng.integers(5, 10)))
+        elif kind == 1:
+            pattern = f"{rng.choice(vocabulary)} {''.join(rng.choice(letters, 4))}"
+        else:
+            pattern = f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}"
+        table, label = tables[rng.integers(len(tables))]
+        if pattern not in rules[table][label]:
+            rules[table][label][pattern] = float(rng.integers(1, 4))
+            count += 1
+    return rules
+
+
+def linear_matches(flat_rules, text):
+    text = text.lower()
+    return {pattern for pattern, _, _, _ in flat_rules if pattern in text}
+
+
+def linear_classify(flat_rules, text):
+    """All-matches scoring with one substring search per rule"""
+    text = text.lower()
+    scores = {'hazard': {}, 'severity': {}}
+    for pattern, field, label, weight in flat_rules:
+        if pattern in text:
+            scores[field][label] = scores[field].get(label, 0.0) + weight
+    return scores
+
+
+def flatten(rules):
+    return [(pattern.lower(), field, label, float(weight))
+            for table, field in KeywordEngine.TABLES
+            for label, keywords in rules[table].items()
+            for pattern, weight in keywords.items()]
+
+
+def time_per_text(classify, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            classify(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', default=DEFAULT_RULES_PATH)
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.rules, encoding='utf-8') as f:
+        base_rules = json.load(f)
+    texts = pd.read_csv(args.data)['text'].astype(str).tolist()
+    vocabulary = sorted({word for text in texts for word in text.lower().split() if word.isalpha()})
+
+    print(f"{len(texts)} texts, best of {args.repeat} runs\n")
+    print(f"{'rules':>8}{'states':>10}{'compile ms':>12}{'linear us':>12}{'automaton us':>14}{'speedup':>9}")
+    for size in args.sizes:
+        rules = synthetic_rules(base_rules, size, vocabulary)
+        flat = flatten(rules)
+
+        start = time.perf_counter()
+        engine = KeywordEngine(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        for text in texts:
+            found = {engine.patterns[i] for i in engine.matched_patterns(text.lower())}
+            if found != linear_matches(flat, text):
+                raise AssertionError(f"Match sets differ for {text!r}")
+
+        linear_us = time_per_text(lambda text: linear_classify(flat, text), texts, args.repeat)
+        automaton_us = time_per_text(engine.classify, texts, args.repeat)
+        print(f"{len(flat):>8}{engine.automaton.n_states:>10}{compile_ms:>12.1f}"
+              f"{linear_us:>12.1f}{automaton_us:>14.1f}{linear_us / automaton_us:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Throughput vs added latency of async-mode micro-batching.
+
+Starts smart_server.py in threaded mode (baseline) and in async mode with a
+range of --max-wait-ms settings, fires concurrent single-description /predict
+calls at it and reports requests/sec, latency percentiles and the mean batch
+size the server actually formed. Every request carries a distinct text and
+the prediction cache is disabled, so each one reaches the model.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_micro_batching.py [--concurrency 64] [--waits 0 1 2 5 10] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import SAMPLE_TEXTS, SERVER_DIR, timed_request, wait_until_healthy  # noqa: E402
+
+THREADS_PER_PROCESS = 8
+
+
+def client_process(port, duration, threads, seed, results):
+    """Run `threads` closed-loop clients, each sending its next request as soon as a reply arrives"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def loop(offset):
+        own = []
+        failed = 0
+        i = 0
+        while time.time() < deadline:
+            text = f"{SAMPLE_TEXTS[(offset + i) % len(SAMPLE_TEXTS)]} report {seed}-{offset}-{i}"
+            try:
+                own.append(timed_request(port, 'POST', '/predict', json.dumps({"description": text})))
+            except OSError:
+                # e.g. connections reset when the server's listen backlog overflows
+                failed += 1
+            i += 1
+        with lock:
+            latencies.extend(own)
+            errors.append(failed)
+
+    workers = [threading.Thread(target=loop, args=(offset,)) for offset in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((latencies, sum(errors)))
+
+
+def run_config(server_args, concurrency, duration, port):
+    env = dict(os.environ, ML_CACHE_SIZE='0')
+    server = subprocess.Popen(
+        [sys.executable, 'smart_server.py', '--port', str(port)] + server_args,
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_healthy(port):
+            raise RuntimeError(f"server did not start ({' '.join(server_args)})")
+
+        processes = max(1, concurrency // THREADS_PER_PROCESS)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client_process,
+                                         args=(port, duration, concurrency // processes, seed, results))
+                 for seed in range(processes)]
+        for proc in procs:
+            proc.start()
+        collected = [results.get() for _ in procs]
+        latencies = np.concatenate([latencies for latencies, _ in collected])
+        errors = sum(failed for _, failed in collected)
+        for proc in procs:
+            proc.join()
+
+        conn = http.client.HTTPConnection('localhost', port, timeout=5)
+        conn.request('GET', '/stats')
+        batching = json.loads(conn.getresponse().read()).get('micro_batching')
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "rps": len(latencies) / duration,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "mean_batch": batching['mean_batch_size'] if batching else 1.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=64, help="concurrent in-flight requests")
+    parser.add_argument('--waits', type=float, nargs='+', default=[0, 1, 2, 5, 10],
+                        help="async --max-wait-ms values to try")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5056)
+    args = parser.parse_args()
+
+    configs = [('threaded', ['--mode', 'threaded'])] + [
+        (f'async {wait:g}ms', ['--mode', 'async', '--batch-size', str(args.batch_size), '--max-wait-ms', str(wait)])
+        for wait in args.waits
+    ]
+
+    print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per configuration, "
+          f"{os.cpu_count()} CPUs, async batch size {args.batch_size}\n")
+    print(f"{'config':<14}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean batch':>12}{'errors':>8}")
+    for name, server_args in configs:
+        stats = run_config(server_args, args.concurrency, args.duration, args.port)
+        print(f"{name:<14}{stats['rps']:>10.1f}{stats['p50']:>10.2f}{stats['p99']:>10.2f}"
+              f"{stats['mean_batch']:>12.1f}{stats['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
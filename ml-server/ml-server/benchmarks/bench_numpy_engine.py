@@ -0,0 +1,113 @@
+"""Benchmark: startup and latency of the NumPy engine vs the sklearn pipelines.
+
+Startup is measured in fresh processes (imports included, since dropping
+scikit-learn's import cost is the point); latency is per-request and
+whole-batch on the texts of urban_issues_dataset.csv.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_numpy_engine.py [--model text_model.joblib] [--artifact text_model.serving]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DEFAULT_DATA = os.path.join(SERVER_DIR, '..', '..', 'ML', 'data', 'urban_issues_dataset.csv')
+
+STARTUP_SNIPPETS = {
+    'sklearn (joblib)': (
+        "from inference import CompiledModel\n"
+        "import joblib\n"
+        "model = CompiledModel(joblib.load({path!r}))\n"
+    ),
+    'sklearn (artifact)': (
+        "from inference import CompiledModel\n"
+        "from serving_artifact import load_model_data\n"
+        "model = CompiledModel(load_model_data({path!r}))\n"
+    ),
+    'numpy (artifact)': (
+        "from numpy_engine import NumpyModel\n"
+        "model = NumpyModel({path!r})\n"
+    ),
+}
+
+STARTUP_TEMPLATE = """
+import json, sys, time
+start = time.perf_counter()
+{body}model.predict(['pothole on road'])
+elapsed = (time.perf_counter() - start) * 1000
+rss = [int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmRSS')][0]
+print(json.dumps({{'ms': elapsed, 'rss_kb': rss,
+                  'sklearn': any(name.startswith('sklearn') for name in sys.modules)}}))
+"""
+
+
+def measure_startup(name, path, runs):
+    code = STARTUP_TEMPLATE.format(body=STARTUP_SNIPPETS[name].format(path=path))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=SERVER_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output))
+    return results
+
+
+def per_request_ms(model, texts, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            model.predict([text])
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--artifact', default='text_model.serving')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("Cold start (fresh process: imports + load + first prediction)")
+    print(f"{'engine':<22}{'ms':>10}{'RSS MB':>10}  sklearn imported")
+    for name in STARTUP_SNIPPETS:
+        path = args.model if 'joblib' in name else args.artifact
+        results = measure_startup(name, path, args.runs)
+        print(f"{name:<22}{np.median([r['ms'] for r in results]):>10.1f}"
+              f"{np.median([r['rss_kb'] for r in results]) / 1024:>10.1f}  {results[0]['sklearn']}")
+
+    import joblib
+    import pandas as pd
+    from inference import CompiledModel
+    from numpy_engine import NumpyModel
+    from smart_server import preprocess_text
+
+    texts = [preprocess_text(text) for text in pd.read_csv(args.data)['text']]
+    engines = {
+        'sklearn': CompiledModel(joblib.load(args.model)),
+        'numpy': NumpyModel(args.artifact),
+    }
+
+    print(f"\nLatency ({len(texts)} texts x {args.repeat} repeats)")
+    print(f"{'engine':<22}{'mean ms':>10}{'p99 ms':>10}{'batch ms/text':>15}")
+    for name, model in engines.items():
+        latencies = per_request_ms(model, texts, args.repeat)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            model.predict(texts)
+        batch = (time.perf_counter() - start) * 1000 / (args.repeat * len(texts))
+        print(f"{name:<22}{latencies.mean():>10.3f}{np.percentile(latencies, 99):>10.3f}{batch:>15.4f}")
+
+
+if __name__ == '__main__':
+    main()
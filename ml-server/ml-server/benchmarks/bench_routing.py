@@ -0,0 +1,58 @@
+"""Routing cost per batch: compiled column lookup vs a mapping dict built per prediction.
+
+The old path rebuilt the label -> hazard type dict on every call and left the
+department to a second, client-side dict. The compiled table resolves hazard
+type, department and escalation level for a whole batch of predicted column
+indices with one array lookup per field. Both are timed on random column
+indices for the loaded model's labels.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_routing.py [--model text_model.joblib] [--batch-sizes 1 32 1000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import CompiledModel  # noqa: E402
+from routing_table import RoutingRules  # noqa: E402
+from serving_artifact import load_model_data  # noqa: E402
+
+
+def per_call_route(label, rules):
+    """What one prediction cost before: a fresh mapping dict, then a department lookup"""
+    mapping = {name: route['hazard_type'] for name, route in rules.label_routes.items()}
+    hazard_type = mapping.get(label, 'Other')
+    departments = {name: route['department'] for name, route in rules.hazard_routes.items()}
+    return hazard_type, departments.get(hazard_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 1000])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    model = CompiledModel(load_model_data(args.model))
+    rules = RoutingRules.from_file()
+    routes = rules.compile(model.category_names)
+    rng = np.random.default_rng(0)
+
+    print(f"{len(model.category_names)} labels\n")
+    print(f"{'batch':>7}{'per-call dict µs':>18}{'compiled µs':>13}{'speedup':>9}")
+    for size in args.batch_sizes:
+        columns = rng.integers(len(model.category_names), size=size)
+        labels = model.category_names[columns]
+        repeat = max(10, args.repeat // size)
+        before = timeit.timeit(lambda: [per_call_route(label, rules) for label in labels], number=repeat) / repeat
+        after = timeit.timeit(lambda: routes.lookup(columns), number=repeat) / repeat
+        print(f"{size:>7}{before * 1e6:>18.1f}{after * 1e6:>13.1f}{before / after:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
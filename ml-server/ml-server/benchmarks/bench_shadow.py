@@ -0,0 +1,141 @@
+"""Live /predict latency with and without shadow evaluation of a candidate model.
+
+Starts smart_server.py twice in the same mode - without a shadow model, then
+with --shadow-model - and drives /predict with the same closed-loop,
+keep-alive clients each time. Reports requests/sec and p50/p99 of the live
+path, then what the shadow worker did meanwhile (calls scored and dropped,
+agreement with the live model). Every request carries a distinct text and the
+prediction cache is off, so each one reaches the model.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_shadow.py [--candidate text_model.serving] [--connections 8] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import SAMPLE_TEXTS, SERVER_DIR, wait_until_healthy  # noqa: E402
+
+
+def client_process(port, duration, threads, seed, results):
+    """`threads` keep-alive clients sending distinct descriptions back to back"""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def loop(offset):
+        own = []
+        conn = http.client.HTTPConnection('localhost', port, timeout=30)
+        i = 0
+        while time.time() < deadline:
+            text = f"{SAMPLE_TEXTS[(offset + i) % len(SAMPLE_TEXTS)]} report {seed}-{offset}-{i}"
+            start = time.perf_counter()
+            conn.request('POST', '/predict', body=json.dumps({"description": text}),
+                         headers={'Content-Type': 'application/json'})
+            conn.getresponse().read()
+            own.append((time.perf_counter() - start) * 1000)
+            i += 1
+        conn.close()
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=loop, args=(offset,)) for offset in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(latencies)
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection('localhost', port, timeout=5)
+    conn.request('GET', path)
+    return json.loads(conn.getresponse().read())
+
+
+def run_config(args, shadow):
+    command = [sys.executable, 'smart_server.py', '--mode', args.mode, '--port', str(args.port),
+               '--model', args.model]
+    if shadow:
+        command += ['--shadow-model', args.candidate]
+    env = dict(os.environ, ML_CACHE_SIZE='0', ML_REQUEST_LOG_RATE='0',
+               ML_SHADOW_MAX_WAIT_MS=str(args.max_wait_ms))
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_healthy(args.port):
+            raise RuntimeError(f"server did not start (shadow={shadow})")
+        if shadow:
+            # Let the shadow worker load the candidate before measuring
+            deadline = time.time() + 30
+            while get_json(args.port, '/admin/shadow').get('state') == 'starting' and time.time() < deadline:
+                time.sleep(0.2)
+
+        processes = max(1, min(args.connections, os.cpu_count() or 1))
+        per_process = [args.connections // processes + (i < args.connections % processes)
+                       for i in range(processes)]
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client_process, args=(args.port, args.duration, n, seed, results))
+                 for seed, n in enumerate(per_process)]
+        for proc in procs:
+            proc.start()
+        latencies = np.concatenate([np.asarray(results.get()) for _ in procs])
+        for proc in procs:
+            proc.join()
+
+        # Give the worker a moment to drain what is still queued
+        time.sleep(args.max_wait_ms / 1000 + 0.5)
+        shadow_stats = get_json(args.port, '/admin/shadow') if shadow else None
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "rps": len(latencies) / args.duration,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+    }, shadow_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--candidate', default='text_model.joblib',
+                        help="shadow model (e.g. a newly trained joblib or a compact serving artifact)")
+    parser.add_argument('--mode', default='threaded', choices=('threaded', 'async', 'prefork'))
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--port', type=int, default=5059)
+    args = parser.parse_args()
+
+    print(f"{args.mode} mode, {args.connections} keep-alive connections, {args.duration:.0f}s per run, "
+          f"{os.cpu_count()} CPUs\n")
+    print(f"{'shadow':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    baseline = None
+    for shadow in (False, True):
+        stats, shadow_stats = run_config(args, shadow)
+        change = f"   p99 {stats['p99'] / baseline['p99'] - 1:+.1%}" if baseline else ''
+        print(f"{'on' if shadow else 'off':<8}{stats['rps']:>10.1f}{stats['p50']:>10.2f}{stats['p99']:>10.2f}{change}")
+        baseline = baseline or stats
+
+    print(f"\nshadow worker: {shadow_stats['texts_scored']} texts scored in {shadow_stats['batches']} batches "
+          f"(mean {shadow_stats['mean_batch_ms']} ms), {shadow_stats['calls_dropped']} of "
+          f"{shadow_stats['calls_submitted']} calls dropped, queue depth {shadow_stats['queue_depth']}")
+    print(f"agreement: category {shadow_stats['category_agreement']}, severity {shadow_stats['severity_agreement']}, "
+          f"both {shadow_stats['both_agreement']}; mean |Δconfidence| "
+          f"{shadow_stats['category_confidence_abs_delta']} / {shadow_stats['severity_confidence_abs_delta']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""/similar query latency and recall at up to 1M indexed complaints.
+
+Synthetic complaints are made from the texts of urban_issues_dataset.csv:
+each gets a few random street/landmark words appended and sometimes a word
+dropped, plus a random location inside a 30 x 30 km city. Queries are
+perturbed copies (one word dropped, one added) of indexed complaints, so
+each has one known near-duplicate in the index.
+
+For every index size the script reports bulk build time, memory, query
+latency percentiles with and without coordinates, the mean number of
+candidates scored, and recall: how often the known duplicate is in the top
+5. The brute-force column scores the same queries against every signature
+in the index, which is what the LSH buckets avoid.
+
+Run from ml-server/ml-server:
+    python benchmarks/bench_similarity_index.py [--sizes 10000 100000 1000000] [--queries 500]
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity_index import SimilarityIndex, tokenize
+from smart_server import preprocess_text
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', '..', 'ML', 'data', 'urban_issues_dataset.csv')
+
+# Roughly Bengaluru; 0.27 degrees is about 30 km
+CITY_ORIGIN = (12.85, 77.45)
+CITY_SPAN = 0.27
+
+
+def synthetic_complaints(texts, size, rng):
+    """(id, processed_text, latitude, longitude) rows with per-complaint variation"""
+    extra_words = np.array([f"{prefix}{n}" for prefix in ('street', 'ward', 'block', 'lane')
+                            for n in range(5000)])
+    templates = rng.integers(len(texts), size=size)
+    extras = rng.choice(extra_words, size=(size, 3))
+    n_extra = rng.integers(1, 4, size=size)
+    drop = rng.random(size) < 0.3
+    latitudes = CITY_ORIGIN[0] + rng.random(size) * CITY_SPAN
+    longitudes = CITY_ORIGIN[1] + rng.random(size) * CITY_SPAN
+
+    for i in range(size):
+        words = texts[templates[i]].split()
+        if drop[i] and len(words) > 3:
+            del words[rng.integers(len(words))]
+        words.extend(extras[i, :n_extra[i]])
+        yield f"c{i}", ' '.join(words), float(latitudes[i]), float(longitudes[i])
+
+
+def perturb(text, rng):
+    words = text.split()
+    if len(words) > 3:
+        del words[rng.integers(len(words))]
+    words.append(f"note{rng.integers(1000)}")
+    return ' '.join(words)
+
+
+def percentiles(samples):
+    return np.percentile(np.asarray(samples) * 1000, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    texts = [preprocess_text(text) for text in pd.read_csv(args.data)['text'].astype(str)]
+    print(f"{'indexed':>9}{'build s':>9}{'RSS MB':>8}{'p50 ms':>8}{'p99 ms':>8}"
+          f"{'geo p50':>9}{'geo p99':>9}{'cands':>7}{'recall':>8}{'brute ms':>10}")
+
+    for size in args.sizes:
+        rng = np.random.default_rng(0)
+        rows = list(synthetic_complaints(texts, size, rng))
+
+        start = time.perf_counter()
+        index = SimilarityIndex()
+        index.add_many(rows)
+        build_seconds = time.perf_counter() - start
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        picks = rng.integers(size, size=args.queries)
+        queries = [(rows[i][0], perturb(rows[i][1], rng), rows[i][2], rows[i][3]) for i in picks]
+
+        plain, located, candidates, hits = [], [], [], 0
+        for complaint_id, text, latitude, longitude in queries:
+            start = time.perf_counter()
+            matches = index.query(text, k=args.k)
+            plain.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            nearby = index.query(text, k=args.k, latitude=latitude, longitude=longitude)
+            located.append(time.perf_counter() - start)
+            hits += any(match['id'] == complaint_id for match in nearby)
+
+            signature = index.signature(tokenize(text))
+            keys = index.band_keys(signature[None, :])[0]
+            candidates.append(len(np.unique(np.concatenate(
+                [table.lookup(key) for table, key in zip(index.tables, keys)]))))
+
+        # Brute force: score every stored signature (a sample of queries is enough)
+        brute = []
+        for _, text, _, _ in queries[:20]:
+            start = time.perf_counter()
+            signature = index.signature(tokenize(text))
+            similarity = (index.signatures[:len(index.ids)] == signature).mean(axis=1)
+            np.argpartition(-similarity, args.k)[:args.k]
+            brute.append(time.perf_counter() - start)
+
+        p50, p99 = percentiles(plain)
+        geo_p50, geo_p99 = percentiles(located)
+        print(f"{size:>9}{build_seconds:>9.1f}{rss_mb:>8.0f}{p50:>8.3f}{p99:>8.3f}{geo_p50:>9.3f}{geo_p99:>9.3f}"
+              f"{np.mean(candidates):>7.0f}{hits / len(queries):>8.1%}{np.median(brute) * 1000:>10.2f}")
+        del rows, index
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: cold-start time and memory of the pickle vs the mmap serving artifact.
+
+Starts several fresh worker processes per format. Each one imports the
+serving code, loads the model, compiles it and runs one prediction, then
+reports its load time and memory once all workers are up, so PSS reflects
+how much of the model the workers actually share.
+
+Run from ml-server/ml-server (export the artifact first with
+ML/data/serving_export.py or train_tfidf.py --export-serving):
+    python benchmarks/bench_startup.py [--model text_model.joblib] [--artifact text_model.serving]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kb():
+    """RSS, PSS and private memory of this process from /proc, in kB"""
+    stats = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:', 'Shared_Clean:'):
+                stats[parts[0].rstrip(':')] = int(parts[1])
+    stats['Private'] = stats.pop('Private_Clean') + stats.pop('Private_Dirty')
+    return stats
+
+
+def child(path, mmap_mode):
+    """Worker process body: load, predict once, wait for the parent, then report"""
+    sys.path.insert(0, SERVER_DIR)
+    start = time.perf_counter()
+    from inference import CompiledModel
+    from serving_artifact import load_model_data
+    # sklearn is needed by both formats; import it here so load_ms is the model alone
+    import sklearn.feature_extraction.text, sklearn.linear_model, sklearn.pipeline  # noqa: F401
+    imported = time.perf_counter()
+
+    model = CompiledModel(load_model_data(path, mmap_mode=mmap_mode))
+    model.predict(["pothole on road"])
+    loaded = time.perf_counter()
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "load_ms": (loaded - imported) * 1000,
+        **memory_kb(),
+    }), flush=True)
+
+
+def run_format(path, mmap_mode, workers):
+    procs = [subprocess.Popen([sys.executable, __file__, '--child', path, str(mmap_mode)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    for proc in procs:
+        assert proc.stdout.readline().strip() == "ready"
+    reports = []
+    for proc in procs:
+        proc.stdin.write("go\n")
+        proc.stdin.flush()
+        reports.append(json.loads(proc.stdout.readline()))
+        proc.wait()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--artifact', default='text_model.serving')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        path, mmap_mode = args.child
+        child(path, None if mmap_mode == 'None' else mmap_mode)
+        return
+
+    if not os.path.isdir(args.artifact):
+        sys.exit(f"{args.artifact} not found; export it with ML/data/serving_export.py first")
+
+    formats = [
+        ("joblib pickle", args.model, None),
+        ("artifact (read into RAM)", args.artifact, None),
+        ("artifact (mmap)", args.artifact, 'r'),
+    ]
+    print(f"{args.workers} worker processes per format\n")
+    print(f"{'format':<26}{'import ms':>10}{'load ms':>10}{'RSS MB':>9}{'PSS MB':>9}{'private MB':>12}"
+          f"{'total PSS MB':>14}")
+    for name, path, mmap_mode in formats:
+        reports = run_format(path, mmap_mode, args.workers)
+
+        def mean(key):
+            return sum(report[key] for report in reports) / len(reports)
+
+        print(f"{name:<26}{mean('import_ms'):>10.1f}{mean('load_ms'):>10.1f}{mean('Rss') / 1024:>9.1f}"
+              f"{mean('Pss') / 1024:>9.1f}{mean('Private') / 1024:>12.1f}"
+              f"{sum(report['Pss'] for report in reports) / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Load test: requests/sec and p99 latency per serving mode as workers increase.
+
+Starts smart_server.py in each configuration on a local port, drives /predict
+from several client processes for a fixed duration while probing /health, and
+prints throughput and latency percentiles.
+
+Run from ml-server/ml-server:
+    python benchmarks/load_test.py [--workers 1 2 4] [--clients 8] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_TEXTS = [
+    "Large pothole on Main Street causing vehicle damage",
+    "Electrical wires sparking dangerously near the school gate",
+    "Garbage has not been collected for a week and is overflowing",
+    "Street light not working on the corner of 5th avenue",
+    "Sewage water leaking onto the road near the market",
+]
+
+
+def wait_until_healthy(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('localhost', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def timed_request(port, method, path, body=None):
+    """One request on a fresh connection (see bench_keep_alive.py for reuse); returns latency in ms"""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('localhost', port, timeout=30)
+    conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    conn.getresponse().read()
+    conn.close()
+    return (time.perf_counter() - start) * 1000
+
+
+def client_loop(port, duration, seed, results):
+    """Fire /predict requests back to back until the deadline"""
+    latencies = []
+    deadline = time.time() + duration
+    i = seed
+    while time.time() < deadline:
+        body = json.dumps({"description": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]})
+        latencies.append(timed_request(port, 'POST', '/predict', body))
+        i += 1
+    results.put(latencies)
+
+
+def run_config(mode, workers, clients, duration, port):
+    server = subprocess.Popen(
+        [sys.executable, 'smart_server.py', '--mode', mode, '--workers', str(workers), '--port', str(port)],
+        cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_healthy(port):
+            raise RuntimeError(f"server did not start ({mode}, {workers} workers)")
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client_loop, args=(port, duration, seed, results))
+                 for seed in range(clients)]
+        for proc in procs:
+            proc.start()
+
+        # Health probes run alongside the load, as a liveness checker would
+        health = []
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            health.append(timed_request(port, 'GET', '/health'))
+            time.sleep(0.1)
+
+        latencies = np.concatenate([results.get() for _ in procs])
+        for proc in procs:
+            proc.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "rps": len(latencies) / duration,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "health_p99": float(np.percentile(health, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    configs = [('single', 1), ('threaded', 1)] + \
+              [('prefork', n) for n in args.workers]
+
+    print(f"{args.clients} client processes, {args.duration:.0f}s per configuration, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<10}{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'health p99':>12}")
+    for mode, workers in configs:
+        stats = run_config(mode, workers, args.clients, args.duration, args.port)
+        shown = workers if mode == 'prefork' else '-'
+        print(f"{mode:<10}{shown:>8}{stats['rps']:>10.1f}{stats['p50']:>10.2f}"
+              f"{stats['p99']:>10.2f}{stats['health_p99']:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
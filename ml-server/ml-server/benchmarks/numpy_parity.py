@@ -0,0 +1,58 @@
+"""Parity check: the pure-NumPy engine must match the sklearn pipelines.
+
+Scores every text in urban_issues_dataset.csv (raw and preprocessed) with
+both engines and fails if any class probability differs by more than the
+tolerance or any predicted label differs.
+
+Run from ml-server/ml-server:
+    python benchmarks/numpy_parity.py [--model text_model.joblib] [--artifact text_model.serving]
+"""
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import CompiledModel
+from numpy_engine import NumpyModel
+from smart_server import preprocess_text
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', '..', 'ML', 'data', 'urban_issues_dataset.csv')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--artifact', default='text_model.serving')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    reference = CompiledModel(joblib.load(args.model))
+    engine = NumpyModel(args.artifact)
+
+    raw = pd.read_csv(args.data)['text'].tolist()
+    # Raw text exercises the analyzer's own lowercasing and punctuation handling
+    texts = [preprocess_text(text) for text in raw] + raw + ["", "the and of", "ÉLECTRIC wire café"]
+
+    failed = False
+    for name, expected, actual in zip(('category', 'severity'),
+                                      reference.predict_proba(texts), engine.predict_proba(texts)):
+        max_diff = float(np.abs(expected - actual).max())
+        label_mismatches = int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum())
+        ok = max_diff <= args.tolerance and label_mismatches == 0
+        failed |= not ok
+        print(f"{name:<9} max |Δp| = {max_diff:.3e}   label mismatches = {label_mismatches}   "
+              f"{'OK' if ok else 'FAIL'}")
+
+    print(f"\n{len(texts)} texts compared")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""Reproducible benchmark suite for the ML training and serving paths, with JSON output.
+
+Runs offline against a local model and urban_issues_dataset.csv:
+
+    preprocess  preprocess_text throughput
+    predict     single-text latency and batched throughput of the category and
+                severity pipelines, CompiledModel and (with --artifact) NumpyModel
+    load        model load time and RSS growth in a fresh process
+    http        requests/sec and p50/p99 of POST /predict against a locally
+                started smart_server.py (keep-alive clients, cache off)
+    train       train_tfidf.py wall time and peak RSS on synthetic corpora
+                resampled from the dataset at --train-scales (10x ... 1000x)
+
+Every metric is written to one JSON file together with the commit, library
+versions and settings, so two runs can be compared:
+
+    python benchmarks/suite.py [--only predict http] [--output results.json]
+    python benchmarks/suite.py --compare before.json after.json [--tolerance 0.1]
+
+--compare exits with status 1 when a metric regressed by more than the
+tolerance. The synthetic training corpora are seeded, so every run trains on
+the same data.
+Run from ml-server/ml-server.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+TRAINING_DIR = os.path.abspath(os.path.join(SERVER_DIR, '..', '..', 'ML', 'data'))
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_keep_alive import measure  # noqa: E402
+from bench_startup import memory_kb  # noqa: E402
+from load_test import wait_until_healthy  # noqa: E402
+
+DEFAULT_DATA = os.path.join(TRAINING_DIR, 'urban_issues_dataset.csv')
+SECTIONS = ('preprocess', 'predict', 'load', 'http', 'train')
+SUITE_VERSION = 1
+SEED = 42
+
+
+class Results:
+    """Flat name -> {value, unit, better} metrics"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better='lower'):
+        self.metrics[name] = {"value": float(value), "unit": unit, "better": better}
+        print(f"  {name:<52}{value:>14.3f} {unit}")
+
+    def latencies(self, prefix, latencies_ms):
+        self.add(f"{prefix}.p50_ms", np.percentile(latencies_ms, 50), 'ms')
+        self.add(f"{prefix}.p99_ms", np.percentile(latencies_ms, 99), 'ms')
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SERVER_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def environment():
+    import sklearn
+
+    commit, dirty = git_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def bench_preprocess(results, texts, repeat):
+    from smart_server import preprocess_text
+
+    corpus = texts * repeat
+    start = time.perf_counter()
+    for text in corpus:
+        preprocess_text(text)
+    elapsed = time.perf_counter() - start
+    results.add("preprocess.texts_per_second", len(corpus) / elapsed, 'texts/s', 'higher')
+
+
+def time_calls(function, batches):
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        function(batch)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def bench_predict(results, model_path, artifact_path, texts, repeat, batch_sizes):
+    import joblib
+    from inference import CompiledModel
+    from smart_server import preprocess_text
+
+    processed = [preprocess_text(text) for text in texts]
+    model_data = joblib.load(model_path)
+    engines = {
+        "category_pipeline": model_data['category_pipeline'].predict_proba,
+        "severity_pipeline": model_data['severity_pipeline'].predict_proba,
+        "compiled": CompiledModel(model_data).predict,
+    }
+    if artifact_path:
+        from numpy_engine import NumpyModel
+        engines["numpy"] = NumpyModel(artifact_path).predict
+
+    for name, predict in engines.items():
+        predict(processed[:8])
+        singles = [[text] for text in processed] * repeat
+        results.latencies(f"predict.{name}.single", time_calls(predict, singles))
+        for batch_size in batch_sizes:
+            rows = (processed * (batch_size // len(processed) + 1))[:batch_size]
+            latencies = time_calls(predict, [rows] * repeat)
+            results.add(f"predict.{name}.batch{batch_size}.texts_per_second",
+                        batch_size * 1000 / np.median(latencies), 'texts/s', 'higher')
+
+
+def load_child(path):
+    """Fresh-process body for bench_load: import, then time the load alone"""
+    import joblib  # noqa: F401
+    import sklearn.feature_extraction.text, sklearn.linear_model, sklearn.pipeline  # noqa: F401
+    from inference import CompiledModel
+    from serving_artifact import load_model_data
+
+    before = memory_kb()
+    start = time.perf_counter()
+    model = CompiledModel(load_model_data(path))
+    loaded = time.perf_counter()
+    model.predict(["pothole on road"])
+    print(json.dumps({"load_ms": (loaded - start) * 1000, "rss_kb": memory_kb()['Rss'] - before['Rss']}))
+
+
+def bench_load(results, paths, repeat):
+    for name, path in paths.items():
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, __file__, '--load-child', path],
+                                    capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        results.add(f"load.{name}.ms", np.median([run['load_ms'] for run in runs]), 'ms')
+        results.add(f"load.{name}.rss_mb", np.median([run['rss_kb'] for run in runs]) / 1024, 'MB')
+
+
+def bench_http(results, model_path, modes, connections, duration, port):
+    env = dict(os.environ, ML_MODEL_PATH=model_path, ML_CACHE_SIZE='0', ML_REQUEST_LOG_RATE='0',
+               ML_PROFILE_RATE='0')
+    for mode in modes:
+        server = subprocess.Popen([sys.executable, 'smart_server.py', '--mode', mode, '--port', str(port)],
+                                  cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_until_healthy(port):
+                raise RuntimeError(f"smart_server.py did not start in {mode} mode")
+            measure(port, '/predict', True, connections, 1, 1)
+            stats = measure(port, '/predict', True, connections, min(connections, os.cpu_count() or 1), duration)
+        finally:
+            server.terminate()
+            server.wait()
+        results.add(f"http.{mode}.requests_per_second", stats['rps'], 'req/s', 'higher')
+        results.add(f"http.{mode}.p50_ms", stats['p50'], 'ms')
+        results.add(f"http.{mode}.p99_ms", stats['p99'], 'ms')
+        results.add(f"http.{mode}.errors", stats['errors'], 'requests')
+
+
+def synthetic_corpus(df, scale, seed=SEED):
+    """df resampled to scale x its rows; each copy drops and reorders a few words and
+    gets a location token, so the vocabulary grows with the corpus like real reports"""
+    rng = random.Random(seed)
+    rows = []
+    for copy in range(scale):
+        for text, label, severity in zip(df['text'], df['label'], df['severity']):
+            words = text.split()
+            if copy and len(words) > 3:
+                words = [word for word in words if rng.random() > 0.1]
+                i = rng.randrange(len(words) - 1) if len(words) > 1 else 0
+                words[i:i + 2] = reversed(words[i:i + 2])
+            words.append(f"ward{rng.randrange(50 * scale)}")
+            rows.append((' '.join(words), label, severity))
+    return pd.DataFrame(rows, columns=['text', 'label', 'severity'])
+
+
+def bench_train(results, df, scales, extra_args):
+    work_dir = tempfile.mkdtemp(prefix='bench-train-')
+    try:
+        for scale in scales:
+            data_path = os.path.join(work_dir, f'corpus_{scale}x.csv')
+            synthetic_corpus(df, scale).to_csv(data_path, index=False)
+            command = [sys.executable, 'train_tfidf.py', '--data', data_path,
+                       '--output', os.path.join(work_dir, 'model.joblib')] + extra_args
+            start = time.perf_counter()
+            process = subprocess.Popen(command, cwd=TRAINING_DIR, stdout=subprocess.DEVNULL)
+            # wait4 reports this child's own peak RSS (kB on Linux)
+            _, status, usage = os.wait4(process.pid, 0)
+            elapsed = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode:
+                raise RuntimeError(f"train_tfidf.py failed on the {scale}x corpus")
+            peak_kb = usage.ru_maxrss
+            results.add(f"train.{scale}x.wall_seconds", elapsed, 's')
+            results.add(f"train.{scale}x.peak_rss_mb", peak_kb / 1024, 'MB')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(before_path, after_path, tolerance):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"{before['environment']['commit']} -> {after['environment']['commit']} (tolerance {tolerance:.0%})\n")
+    regressions = 0
+    for name in sorted(set(before['metrics']) & set(after['metrics'])):
+        old, new = before['metrics'][name], after['metrics'][name]
+        if old['value'] == 0:
+            continue
+        change = new['value'] / old['value'] - 1
+        worse = change < -tolerance if new['better'] == 'higher' else change > tolerance
+        regressions += worse
+        print(f"{name:<52}{old['value']:>12.3f}{new['value']:>12.3f} {new['unit']:<8}{change:>+8.1%}"
+              f"{'  REGRESSION' if worse else ''}")
+    print(f"\n{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='text_model.joblib')
+    parser.add_argument('--artifact', help="serving artifact to add to the predict and load sections")
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--only', nargs='+', choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument('--output', help="JSON results file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 256])
+    parser.add_argument('--http-modes', nargs='+', default=['threaded', 'async'])
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5061)
+    parser.add_argument('--train-scales', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--train-args', default='', help="extra train_tfidf.py arguments, e.g. '--shared-features'")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--load-child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load_child:
+        load_child(args.load_child)
+        return
+    if args.compare:
+        sys.exit(compare(*args.compare, args.tolerance))
+
+    if not os.path.exists(args.model):
+        sys.exit(f"{args.model} not found; train one with ML/data/train_tfidf.py first")
+    df = pd.read_csv(args.data)
+    texts = df['text'].tolist()
+
+    results = Results()
+    started = time.perf_counter()
+    for section in args.only:
+        print(f"\n[{section}]")
+        if section == 'preprocess':
+            bench_preprocess(results, texts, args.repeat * 20)
+        elif section == 'predict':
+            bench_predict(results, args.model, args.artifact, texts, args.repeat, args.batch_sizes)
+        elif section == 'load':
+            paths = {"joblib": args.model}
+            if args.artifact:
+                paths["artifact"] = args.artifact
+            bench_load(results, paths, args.repeat)
+        elif section == 'http':
+            bench_http(results, os.path.abspath(args.model), args.http_modes, args.connections,
+                       args.duration, args.port)
+        elif section == 'train':
+            bench_train(results, df, sorted(args.train_scales), args.train_args.split())
+
+    env = environment()
+    report = {
+        "suite_version": SUITE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "environment": env,
+        "config": {name: value for name, value in vars(args).items() if name not in ('compare', 'load_child')},
+        "elapsed_seconds": round(time.perf_counter() - started, 1),
+        "metrics": results.metrics,
+    }
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f"{env['commit'] or 'unknown'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ {len(results.metrics)} metrics written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Confidence-gated inference cascade.
+
+A cheap first-stage model scores every text: hashed unigrams feeding two
+logistic regressions (``train_tfidf.py --fast-model``), so there is one
+vocabulary-free vectorizer pass for both targets. Texts on which it is
+confident about both the category and the severity are answered right there;
+only the rest go on to the full bigram TF-IDF pipelines. Obvious complaints
+like "pothole on road" never pay for the full models.
+"""
+import time
+
+import numpy as np
+
+# Value of the per-row 'stage' array for each stage
+FAST_STAGE = 'fast'
+FULL_STAGE = 'full'
+
+
+class CascadeModel:
+    """Same interface as ``inference.CompiledModel``, answering from ``fast`` when it is sure"""
+
+    def __init__(self, fast, full, threshold):
+        if list(fast.category_classes) != list(full.category_classes):
+            raise ValueError("Cascade stages disagree on the category classes")
+        if list(fast.severity_classes) != list(full.severity_classes):
+            raise ValueError("Cascade stages disagree on the severity classes")
+        # Rows answered by either stage share one array of column indices
+        if list(fast.category_names) != list(full.category_names):
+            raise ValueError("Cascade stages order the category columns differently")
+
+        self.fast = fast
+        self.full = full
+        self.threshold = threshold
+        # Cached results depend on both models and on where the gate sits
+        self.version = f"{full.version}+{fast.version}@{threshold:g}"
+        self.loaded_at = time.time()
+
+    @property
+    def engine(self):
+        return f"cascade({self.fast.engine} -> {self.full.engine})"
+
+    @property
+    def shares_tokenization(self):
+        return self.full.shares_tokenization
+
+    @property
+    def category_classes(self):
+        return self.full.category_classes
+
+    @property
+    def severity_classes(self):
+        return self.full.severity_classes
+
+    @property
+    def category_names(self):
+        return self.full.category_names
+
+    def predict(self, texts, timings=None):
+        """``CompiledModel.predict`` output plus a 'stage' array naming the stage that answered each row.
+
+        ``timings`` receives 'fast_model' seconds and, if any row was passed
+        on, the full model's 'vectorize' and 'classify' seconds.
+        """
+        start = time.perf_counter()
+        prediction = self.fast.predict(texts)
+        if timings is not None:
+            timings['fast_model'] = time.perf_counter() - start
+
+        confident = ((prediction['category_confidence'] >= self.threshold)
+                     & (prediction['severity_confidence'] >= self.threshold))
+        result = {
+            'category': np.asarray(prediction['category'], dtype=object),
+            'severity': np.asarray(prediction['severity'], dtype=object),
+            'category_index': np.array(prediction['category_index']),
+            'severity_index': np.array(prediction['severity_index']),
+            'category_confidence': np.array(prediction['category_confidence'], dtype=np.float64),
+            'severity_confidence': np.array(prediction['severity_confidence'], dtype=np.float64),
+            'stage': np.where(confident, FAST_STAGE, FULL_STAGE).astype(object),
+        }
+
+        uncertain = np.flatnonzero(~confident)
+        if len(uncertain):
+            full = self.full.predict([texts[i] for i in uncertain], timings)
+            for key in ('category', 'severity', 'category_index', 'severity_index',
+                        'category_confidence', 'severity_confidence'):
+                result[key][uncertain] = full[key]
+        return result
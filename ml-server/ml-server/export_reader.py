@@ -0,0 +1,57 @@
+"""Record readers for complaint exports from the database.
+
+Exports are CSV (``mongoexport --type=csv``) or JSON Lines (``mongoexport``'s
+default), optionally gzipped; the format is picked by file extension. The
+bulk loaders of the similarity and hotspot indexes read them through here,
+and so do the training and batch prediction scripts in ML/data, which put
+this directory on ``sys.path``: ``iter_records`` streams one dict per record,
+``read_frames`` yields pandas DataFrames of up to ``chunksize`` rows.
+"""
+import csv
+import gzip
+import io
+import json
+import math
+
+JSONL_SUFFIXES = ('.jsonl', '.jsonl.gz', '.json', '.json.gz')
+
+
+def is_jsonl(path):
+    return path.endswith(JSONL_SUFFIXES)
+
+
+def open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8')
+    return open(path, encoding='utf-8', newline='')
+
+
+def iter_records(path):
+    """Yield every record of an export as a dict, one at a time"""
+    with open_text(path) as f:
+        if is_jsonl(path):
+            yield from (json.loads(line) for line in f if line.strip())
+        else:
+            yield from csv.DictReader(f)
+
+
+def read_frames(path, chunksize):
+    """Yield DataFrames of up to chunksize rows; pandas is only needed by the ML/data scripts"""
+    import pandas as pd
+
+    if is_jsonl(path):
+        reader = pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunksize)
+    with reader:
+        yield from reader
+
+
+def has_location(latitude, longitude):
+    if latitude is None or longitude is None:
+        return False
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return False
+    return math.isfinite(latitude) and math.isfinite(longitude) and -90 <= latitude <= 90
@@ -0,0 +1,367 @@
+"""In-memory spatial index of classified complaints for hotspot queries.
+
+Complaints are binned into a regular latitude/longitude grid of
+``cell_size`` degrees (0.01 is about 1.1 km north-south). Points are kept in
+columnar numpy arrays sorted by cell, next to a per-cell table of counts by
+(hazard_type, severity), so queries mostly work on occupied cells rather than
+on points:
+
+- ``aggregate`` counts complaints inside a bounding box exactly: cells wholly
+  inside the box come from the count table, and only the points of the cells
+  on its edge are tested one by one.
+- ``hotspots`` ranks cells (or blocks of ``scale`` x ``scale`` cells) that
+  overlap the box by severity-weighted count and returns the top N with their
+  breakdown.
+
+Single inserts go to a fixed-size pending buffer that queries scan directly;
+every ``merge_every`` inserts it is merged into the sorted arrays in one
+vectorized pass. Bulk loads (``add_many``, ``build_index``) bin and sort the
+whole dump at once.
+"""
+import json
+import math
+import threading
+
+import numpy as np
+
+from export_reader import has_location, iter_records
+
+# Weight of one complaint per severity when ranking hotspots; unknown severities count 1.
+# 'critical' comes from the keyword fallback (keyword_rules.json), not the model.
+SEVERITY_WEIGHTS = {'low': 1.0, 'medium': 2.0, 'high': 3.0, 'critical': 4.0}
+
+# Severity recorded for a classified complaint that has none
+DEFAULT_SEVERITY = 'medium'
+
+
+def parse_bbox(value):
+    """(south, west, north, east) from 'south,west,north,east' or a 4-item list; west > east crosses 180°"""
+    parts = value.split(',') if isinstance(value, str) else value
+    try:
+        south, west, north, east = (float(part) for part in parts)
+    except (TypeError, ValueError):
+        raise ValueError("bbox must be south,west,north,east") from None
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("bbox must satisfy -90 <= south <= north <= 90 and -180 <= west, east <= 180")
+    return south, west, north, east
+
+
+def wrap_longitude(longitudes):
+    return (longitudes + 180.0) % 360.0 - 180.0
+
+
+def in_bbox(latitudes, longitudes, bbox):
+    south, west, north, east = bbox
+    inside = (latitudes >= south) & (latitudes <= north)
+    if west <= east:
+        return inside & (longitudes >= west) & (longitudes <= east)
+    return inside & ((longitudes >= west) | (longitudes <= east))
+
+
+class HotspotIndex:
+    """Grid index of (latitude, longitude, hazard_type, severity) points"""
+
+    def __init__(self, cell_size=0.01, merge_every=10000, severity_weights=None):
+        self.cell_size = cell_size
+        self.n_rows = int(math.ceil(180.0 / cell_size))
+        self.n_cols = int(math.ceil(360.0 / cell_size))
+        self.merge_every = merge_every
+        self.severity_weights = dict(SEVERITY_WEIGHTS if severity_weights is None else severity_weights)
+
+        self.hazards, self.hazard_codes = [], {}
+        self.severities, self.severity_codes = [], {}
+        for severity in self.severity_weights:
+            self.severity_code(severity)
+
+        # Merged points, sorted by cell key
+        self.keys = np.empty(0, dtype=np.int64)
+        self.latitudes = np.empty(0, dtype=np.float64)
+        self.longitudes = np.empty(0, dtype=np.float64)
+        self.hazard = np.empty(0, dtype=np.uint16)
+        self.severity = np.empty(0, dtype=np.uint16)
+
+        # Occupied cells: key, offset of the first point, counts[cell, hazard, severity]
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_starts = np.zeros(1, dtype=np.int64)
+        self.cell_counts = np.zeros((0, 0, len(self.severities)), dtype=np.int32)
+
+        self.pending_latitudes = np.empty(merge_every, dtype=np.float64)
+        self.pending_longitudes = np.empty(merge_every, dtype=np.float64)
+        self.pending_hazard = np.empty(merge_every, dtype=np.uint16)
+        self.pending_severity = np.empty(merge_every, dtype=np.uint16)
+        self.pending = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.keys) + self.pending
+
+    def hazard_code(self, hazard_type):
+        code = self.hazard_codes.get(hazard_type)
+        if code is None:
+            code = self.hazard_codes[hazard_type] = len(self.hazards)
+            self.hazards.append(hazard_type)
+        return code
+
+    def severity_code(self, severity):
+        code = self.severity_codes.get(severity)
+        if code is None:
+            code = self.severity_codes[severity] = len(self.severities)
+            self.severities.append(severity)
+        return code
+
+    def encode(self, values, code):
+        """Integer codes for an array of labels (a dict lookup each: far cheaper than sorting strings)"""
+        values = np.asarray(values).tolist()
+        return np.fromiter((code(str(value)) for value in values), dtype=np.uint16, count=len(values))
+
+    def rows_cols(self, latitudes, longitudes):
+        rows = np.floor((np.asarray(latitudes) + 90.0) / self.cell_size).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes) + 180.0) / self.cell_size).astype(np.int64)
+        return np.clip(rows, 0, self.n_rows - 1), np.clip(cols, 0, self.n_cols - 1)
+
+    def add(self, latitude, longitude, hazard_type, severity=None):
+        """Index one classified complaint; returns False if it has no usable location or hazard type"""
+        if not hazard_type or not has_location(latitude, longitude):
+            return False
+
+        with self.lock:
+            slot = self.pending
+            self.pending_latitudes[slot] = float(latitude)
+            self.pending_longitudes[slot] = wrap_longitude(float(longitude))
+            self.pending_hazard[slot] = self.hazard_code(str(hazard_type))
+            self.pending_severity[slot] = self.severity_code(str(severity or DEFAULT_SEVERITY))
+            self.pending += 1
+            if self.pending == self.merge_every:
+                self.merge_pending()
+        return True
+
+    def add_many(self, latitudes, longitudes, hazard_types, severities):
+        """Bulk-index parallel arrays of points and labels; returns how many had a usable location"""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes) & (np.abs(latitudes) <= 90)
+        if not valid.any():
+            return 0
+
+        with self.lock:
+            hazard = self.encode(np.asarray(hazard_types)[valid], self.hazard_code)
+            severity = self.encode(np.asarray(severities)[valid], self.severity_code)
+            self.merge_pending()
+            self.merge(latitudes[valid], wrap_longitude(longitudes[valid]), hazard, severity)
+        return int(np.count_nonzero(valid))
+
+    def merge_pending(self):
+        if not self.pending:
+            return
+        count, self.pending = self.pending, 0
+        self.merge(self.pending_latitudes[:count].copy(), self.pending_longitudes[:count].copy(),
+                   self.pending_hazard[:count].copy(), self.pending_severity[:count].copy())
+
+    def merge(self, latitudes, longitudes, hazard, severity):
+        """Fold new points into the sorted arrays and rebuild the cell table; call with the lock held"""
+        rows, cols = self.rows_cols(latitudes, longitudes)
+        keys = np.concatenate([self.keys, rows * self.n_cols + cols])
+        # The stable sort (timsort) treats the already sorted points as one run
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.latitudes = np.concatenate([self.latitudes, latitudes])[order]
+        self.longitudes = np.concatenate([self.longitudes, longitudes])[order]
+        self.hazard = np.concatenate([self.hazard, hazard])[order]
+        self.severity = np.concatenate([self.severity, severity])[order]
+
+        boundaries = np.flatnonzero(np.diff(self.keys)) + 1
+        self.cell_starts = np.concatenate([[0], boundaries, [len(self.keys)]]).astype(np.int64)
+        self.cell_keys = self.keys[self.cell_starts[:-1]]
+
+        n_cells, n_hazards, n_severities = len(self.cell_keys), len(self.hazards), len(self.severities)
+        cells = np.repeat(np.arange(n_cells, dtype=np.int64), np.diff(self.cell_starts))
+        flat = (cells * n_hazards + self.hazard) * n_severities + self.severity
+        self.cell_counts = np.bincount(flat, minlength=n_cells * n_hazards * n_severities).astype(
+            np.int32).reshape(n_cells, n_hazards, n_severities)
+
+    def point_counts(self, hazard, severity):
+        """[hazard, severity] counts of individual points, at the current label sizes"""
+        n_hazards, n_severities = len(self.hazards), len(self.severities)
+        flat = hazard.astype(np.int64) * n_severities + severity
+        return np.bincount(flat, minlength=n_hazards * n_severities).reshape(n_hazards, n_severities)
+
+    def padded(self, counts):
+        """Count-table rows padded to labels first seen since the last merge"""
+        n_hazards, n_severities = len(self.hazards), len(self.severities)
+        if counts.shape[1:] == (n_hazards, n_severities):
+            return counts
+        wide = np.zeros((len(counts), n_hazards, n_severities), dtype=counts.dtype)
+        wide[:, :counts.shape[1], :counts.shape[2]] = counts
+        return wide
+
+    def overlapping_cells(self, bbox):
+        """(cell indices overlapping the box, which of them lie wholly inside it)"""
+        if bbox is None:
+            everything = np.arange(len(self.cell_keys))
+            return everything, np.ones(len(everything), dtype=bool)
+
+        south, west, north, east = bbox
+        (row_0, row_1), (col_0, col_1) = self.rows_cols([south, north], [west, east])
+        start, end = np.searchsorted(self.cell_keys, [row_0 * self.n_cols, (row_1 + 1) * self.n_cols])
+        rows, cols = np.divmod(self.cell_keys[start:end], self.n_cols)
+        interior_rows = (rows > row_0) & (rows < row_1)
+        if west <= east:
+            overlap = (cols >= col_0) & (cols <= col_1)
+            interior = interior_rows & (cols > col_0) & (cols < col_1)
+        else:
+            overlap = (cols >= col_0) | (cols <= col_1)
+            interior = interior_rows & ((cols > col_0) | (cols < col_1))
+        cells = np.flatnonzero(overlap) + start
+        return cells, interior[overlap]
+
+    def cell_points(self, cells):
+        """Indices of the merged points stored in the given cells"""
+        starts = self.cell_starts[cells]
+        lengths = self.cell_starts[cells + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return np.arange(int(lengths.sum())) + offsets
+
+    def aggregate(self, bbox):
+        """Exact [hazard, severity] counts of the complaints inside a (south, west, north, east) box"""
+        with self.lock:
+            cells, interior = self.overlapping_cells(bbox)
+            counts = self.padded(self.cell_counts[cells[interior]]).sum(axis=0)
+
+            edge = self.cell_points(cells[~interior])
+            inside = edge[in_bbox(self.latitudes[edge], self.longitudes[edge], bbox)]
+            counts = counts + self.point_counts(self.hazard[inside], self.severity[inside])
+
+            pending = slice(0, self.pending)
+            inside = in_bbox(self.pending_latitudes[pending], self.pending_longitudes[pending], bbox)
+            counts = counts + self.point_counts(self.pending_hazard[pending][inside],
+                                                self.pending_severity[pending][inside])
+            return self.summary(counts)
+
+    def summary(self, counts):
+        by_hazard = {hazard: int(total) for hazard, total in zip(self.hazards, counts.sum(axis=1)) if total}
+        return {
+            "total": int(counts.sum()),
+            "by_hazard": dict(sorted(by_hazard.items(), key=lambda item: -item[1])),
+            "by_severity": {severity: int(total) for severity, total in zip(self.severities, counts.sum(axis=0))},
+            "by_hazard_severity": {
+                hazard: {severity: int(count) for severity, count in zip(self.severities, row) if count}
+                for hazard, row in zip(self.hazards, counts) if row.any()
+            },
+        }
+
+    def label_weights(self, hazard_type=None, min_severity=None):
+        """[hazard, severity] weight of one complaint in a hotspot score; 0 drops it"""
+        weights = np.array([self.severity_weights.get(severity, 1.0) for severity in self.severities])
+        if min_severity is not None:
+            if min_severity not in self.severity_weights:
+                raise ValueError(f"min_severity must be one of {', '.join(self.severity_weights)}")
+            floor = self.severity_weights[min_severity]
+            weights = np.where(weights >= floor, weights, 0.0)
+        matrix = np.tile(weights, (len(self.hazards), 1))
+        if hazard_type is not None:
+            keep = np.array([hazard == hazard_type for hazard in self.hazards], dtype=bool)
+            matrix[~keep] = 0.0
+        return matrix
+
+    def hotspots(self, n=10, bbox=None, hazard_type=None, min_severity=None, scale=1):
+        """Top-n blocks of scale x scale cells by severity-weighted count, optionally within a box.
+
+        Whole cells overlapping the box are ranked, so counts near its edge may
+        include complaints just outside it.
+        """
+        scale = max(1, int(scale))
+        with self.lock:
+            cells, _ = self.overlapping_cells(bbox)
+            counts = self.padded(self.cell_counts[cells])
+            keys = self.cell_keys[cells]
+
+            if self.pending:
+                latitudes = self.pending_latitudes[:self.pending]
+                longitudes = self.pending_longitudes[:self.pending]
+                inside = np.ones(self.pending, dtype=bool) if bbox is None else in_bbox(latitudes, longitudes, bbox)
+                rows, cols = self.rows_cols(latitudes[inside], longitudes[inside])
+                point_counts = np.zeros((len(rows), len(self.hazards), len(self.severities)), dtype=counts.dtype)
+                point_counts[np.arange(len(rows)), self.pending_hazard[:self.pending][inside],
+                             self.pending_severity[:self.pending][inside]] = 1
+                keys = np.concatenate([keys, rows * self.n_cols + cols])
+                counts = np.concatenate([counts, point_counts])
+
+            weights = self.label_weights(hazard_type, min_severity)
+            flat_counts = counts.reshape(len(counts), weights.size)
+            scores = flat_counts @ weights.ravel()
+
+            rows, cols = np.divmod(keys, self.n_cols)
+            blocks, block_of = np.unique((rows // scale) * self.n_cols + cols // scale, return_inverse=True)
+            block_of = block_of.ravel()
+            block_scores = np.bincount(block_of, weights=scores, minlength=len(blocks))
+
+            candidates = np.flatnonzero(block_scores > 0)
+            if len(candidates) > n:
+                candidates = candidates[np.argpartition(-block_scores[candidates], n - 1)[:n]]
+            top = candidates[np.argsort(-block_scores[candidates], kind='stable')]
+
+            label_mask = weights > 0
+            results = []
+            for block in top:
+                block_row, block_col = divmod(int(blocks[block]), self.n_cols)
+                south = block_row * scale * self.cell_size - 90.0
+                west = block_col * scale * self.cell_size - 180.0
+                span = scale * self.cell_size
+                breakdown = counts[block_of == block].sum(axis=0) * label_mask
+                results.append({
+                    "south": round(south, 6),
+                    "west": round(west, 6),
+                    "north": round(min(south + span, 90.0), 6),
+                    "east": round(min(west + span, 180.0), 6),
+                    "latitude": round(min(south + span / 2, 90.0), 6),
+                    "longitude": round(min(west + span / 2, 180.0), 6),
+                    "score": round(float(block_scores[block]), 3),
+                    **self.summary(breakdown),
+                })
+            return results
+
+    def stats(self):
+        with self.lock:
+            return {
+                "indexed": len(self),
+                "pending": self.pending,
+                "cells": len(self.cell_keys),
+                "cell_size": self.cell_size,
+                "hazard_types": len(self.hazards),
+                "memory_mb": round(sum(array.nbytes for array in (
+                    self.keys, self.latitudes, self.longitudes, self.hazard, self.severity,
+                    self.cell_keys, self.cell_starts, self.cell_counts)) / 1e6, 1),
+            }
+
+
+def prediction_labels(record):
+    """(hazard_type, severity) of an exported complaint, from ``ml_prediction`` or flat columns"""
+    prediction = record.get('ml_prediction')
+    if isinstance(prediction, str) and prediction.startswith('{'):
+        try:
+            prediction = json.loads(prediction)
+        except ValueError:
+            # A truncated or mangled cell: try the flat columns rather than failing the whole build
+            prediction = None
+    if isinstance(prediction, dict):
+        return prediction.get('hazard_type'), prediction.get('severity')
+    # mongoexport --type=csv names nested fields with dots
+    return (record.get('ml_prediction.hazard_type') or record.get('hazard_type'),
+            record.get('ml_prediction.severity') or record.get('severity'))
+
+
+def iter_classified(path):
+    """Yield (latitude, longitude, hazard_type, severity) for located, classified complaints in an export"""
+    for record in iter_records(path):
+        hazard_type, severity = prediction_labels(record)
+        latitude, longitude = record.get('latitude'), record.get('longitude')
+        if hazard_type and has_location(latitude, longitude):
+            yield float(latitude), float(longitude), hazard_type, severity or DEFAULT_SEVERITY
+
+
+def build_index(path, **index_params):
+    """Bulk-build an index from a complaint export (CSV or JSON Lines, optionally gzipped)"""
+    columns = list(zip(*iter_classified(path))) or [(), (), (), ()]
+    index = HotspotIndex(**index_params)
+    index.add_many(*columns)
+    return index
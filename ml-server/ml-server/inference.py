@@ -0,0 +1,225 @@
+"""Single-pass inference core shared by the ML servers.
+
+Each pipeline's vectorizer runs once per batch and labels are taken as the
+argmax of ``predict_proba`` instead of calling ``predict`` separately. When
+the category and severity TF-IDF vectorizers were trained with the same
+tokenization settings, both feature spaces are cut from a single count matrix
+so every text is tokenized only once. Stateless HashingVectorizers (as used
+by ``ML/data/incremental_train.py``) with identical settings are simply run
+once and their output fed to both classifiers.
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+
+# Vectorizer settings that decide how raw text becomes n-gram counts. Two
+# vectorizers agreeing on all of these produce identical counts for every term
+# they both know, so they can share one tokenization pass.
+ANALYZER_PARAMS = (
+    'analyzer', 'binary', 'decode_error', 'encoding', 'input', 'lowercase',
+    'ngram_range', 'preprocessor', 'stop_words', 'strip_accents',
+    'token_pattern', 'tokenizer',
+)
+
+
+def model_file_version(path):
+    """Short content hash of a model file, used to tell loaded models apart"""
+    if os.path.isdir(path):
+        # Serving artifacts carry a content hash of their arrays in the manifest
+        from serving_artifact import read_manifest
+        return read_manifest(path)['version']
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def split_pipeline(pipeline):
+    """Return (vectorizer, classifier) for a two-step text pipeline"""
+    steps = getattr(pipeline, 'steps', None)
+    if not steps or len(steps) != 2:
+        return None, None
+    return steps[0][1], steps[1][1]
+
+
+def is_tfidf_vectorizer(vectorizer):
+    """True for fitted TfidfVectorizer instances"""
+    return type(vectorizer).__name__ == 'TfidfVectorizer' and hasattr(vectorizer, 'vocabulary_')
+
+
+def can_share_tokenization(vectorizer_a, vectorizer_b):
+    """Check whether two fitted TF-IDF vectorizers tokenize text the same way"""
+    if not (is_tfidf_vectorizer(vectorizer_a) and is_tfidf_vectorizer(vectorizer_b)):
+        return False
+
+    params_a = vectorizer_a.get_params()
+    params_b = vectorizer_b.get_params()
+    return (
+        all(params_a[name] == params_b[name] for name in ANALYZER_PARAMS)
+        and vectorizer_a.dtype == vectorizer_b.dtype
+    )
+
+
+def shares_stateless_vectorizer(vectorizer_a, vectorizer_b):
+    """True when two HashingVectorizers would produce the same matrix for any text"""
+    if type(vectorizer_a).__name__ != 'HashingVectorizer' or type(vectorizer_b) is not type(vectorizer_a):
+        return False
+    return vectorizer_a.get_params() == vectorizer_b.get_params()
+
+
+def apply_tfidf(counts, vectorizer):
+    """Weight a raw count matrix exactly like ``TfidfVectorizer.transform`` does"""
+    from sklearn.preprocessing import normalize
+
+    features = counts.astype(vectorizer.dtype, copy=True)
+    if vectorizer.sublinear_tf:
+        np.log(features.data, features.data)
+        features.data += 1.0
+    if vectorizer.use_idf:
+        features.data *= vectorizer.idf_[features.indices]
+    if vectorizer.norm is not None:
+        features = normalize(features, norm=vectorizer.norm, copy=False)
+    return features
+
+
+class SharedTokenizer:
+    """Counts n-grams once over the union of two vectorizers' vocabularies"""
+
+    def __init__(self, primary, secondary):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        # The primary vocabulary keeps its own column order so its feature
+        # matrix is a plain leading slice; secondary-only terms go after it.
+        union = dict(primary.vocabulary_)
+        for term in secondary.vocabulary_:
+            if term not in union:
+                union[term] = len(union)
+
+        self.primary_width = len(primary.vocabulary_)
+        self.secondary_columns = np.empty(len(secondary.vocabulary_), dtype=np.int64)
+        for term, column in secondary.vocabulary_.items():
+            self.secondary_columns[column] = union[term]
+
+        params = primary.get_params()
+        self.counter = CountVectorizer(
+            vocabulary=union,
+            dtype=primary.dtype,
+            **{name: params[name] for name in ANALYZER_PARAMS}
+        )
+        # CountVectorizer validates a fixed vocabulary lazily on first use; do it
+        # now so concurrent request threads only ever read shared state.
+        self.counter.transform([''])
+
+    def transform(self, texts):
+        """Return (primary_counts, secondary_counts) for a batch of texts"""
+        counts = self.counter.transform(texts)
+        return counts[:, :self.primary_width], counts[:, self.secondary_columns]
+
+
+class CompiledModel:
+    """Ready-to-serve wrapper around the ``model_data`` dict from train_tfidf.py"""
+
+    REQUIRED_COMPONENTS = ('category_pipeline', 'severity_pipeline', 'label_encoder', 'severity_encoder')
+
+    engine = 'sklearn'
+
+    def __init__(self, model_data, version=None):
+        missing = [name for name in self.REQUIRED_COMPONENTS if name not in model_data]
+        if missing:
+            raise ValueError(f"Missing components: {missing}")
+
+        self.model_data = model_data
+        self.version = version
+        self.loaded_at = time.time()
+        self.category_pipeline = model_data['category_pipeline']
+        self.severity_pipeline = model_data['severity_pipeline']
+
+        # Precompute the decoded class name for every probability column so
+        # a batch of argmax indices turns into names with one array lookup.
+        self.category_names = np.asarray(
+            model_data['label_encoder'].inverse_transform(self.category_pipeline[-1].classes_))
+        self.severity_names = np.asarray(
+            model_data['severity_encoder'].inverse_transform(self.severity_pipeline[-1].classes_))
+
+        category_vectorizer, self.category_classifier = split_pipeline(self.category_pipeline)
+        severity_vectorizer, self.severity_classifier = split_pipeline(self.severity_pipeline)
+        self.category_vectorizer = category_vectorizer
+        self.severity_vectorizer = severity_vectorizer
+
+        self.shared_tokenizer = None
+        if can_share_tokenization(category_vectorizer, severity_vectorizer):
+            self.shared_tokenizer = SharedTokenizer(category_vectorizer, severity_vectorizer)
+        self.shared_hashing = shares_stateless_vectorizer(category_vectorizer, severity_vectorizer)
+
+    @property
+    def shares_tokenization(self):
+        return self.shared_tokenizer is not None or self.shared_hashing
+
+    @property
+    def category_classes(self):
+        return list(self.model_data['label_encoder'].classes_)
+
+    @property
+    def severity_classes(self):
+        return list(self.model_data['severity_encoder'].classes_)
+
+    def features(self, texts):
+        """Return (category_features, severity_features), vectorizing as few times as possible"""
+        if self.shared_tokenizer is not None:
+            category_counts, severity_counts = self.shared_tokenizer.transform(texts)
+            return (
+                apply_tfidf(category_counts, self.category_vectorizer),
+                apply_tfidf(severity_counts, self.severity_vectorizer),
+            )
+
+        if self.shared_hashing:
+            features = self.category_vectorizer.transform(texts)
+            return features, features
+
+        # Everything but the classifier, without the second pass ``predict`` would add
+        return (
+            self.category_pipeline[:-1].transform(texts),
+            self.severity_pipeline[:-1].transform(texts),
+        )
+
+    def predict_proba(self, texts, timings=None):
+        """Return (category_proba, severity_proba) for already-preprocessed texts.
+
+        If ``timings`` is a dict, the seconds spent in the 'vectorize' and
+        'classify' stages are stored in it.
+        """
+        start = time.perf_counter()
+        category_features, severity_features = self.features(texts)
+        vectorized = time.perf_counter()
+        probabilities = (
+            self.category_pipeline[-1].predict_proba(category_features),
+            self.severity_pipeline[-1].predict_proba(severity_features),
+        )
+        if timings is not None:
+            timings['vectorize'] = vectorized - start
+            timings['classify'] = time.perf_counter() - vectorized
+        return probabilities
+
+    def predict(self, texts, timings=None):
+        """Predict a batch of preprocessed texts.
+
+        Returns a dict of parallel arrays: decoded ``category``/``severity``
+        names, their column ``*_index`` and the winning ``*_confidence``.
+        """
+        category_proba, severity_proba = self.predict_proba(texts, timings)
+        rows = np.arange(len(texts))
+        category_index = np.argmax(category_proba, axis=1)
+        severity_index = np.argmax(severity_proba, axis=1)
+
+        return {
+            'category': self.category_names[category_index],
+            'severity': self.severity_names[severity_index],
+            'category_index': category_index,
+            'severity_index': severity_index,
+            'category_confidence': category_proba[rows, category_index],
+            'severity_confidence': severity_proba[rows, severity_index],
+        }
@@ -0,0 +1,54 @@
+"""JSON response encoding for smart_server's handlers and async front-end.
+
+``dumps`` returns UTF-8 bytes ready for the socket. It uses orjson when it
+is installed (``pip install orjson``; several times faster than the stdlib
+on prediction payloads) unless ``ML_JSON_ENCODER=stdlib`` forces the
+fallback, which is compact ``json.dumps`` output. For the str-keyed dicts
+of strings, numbers and NumPy values the handlers send, both produce the
+same bytes. They differ on edge cases:
+
+- NaN and +/-Infinity become ``null`` with orjson, but the non-standard
+  ``NaN``/``Infinity`` tokens with the stdlib.
+- Non-str dict keys: both stringify int, float, bool and None keys. orjson
+  also accepts keys like dates, which the stdlib rejects with TypeError.
+"""
+import json
+import os
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.environ.get('ML_JSON_ENCODER', 'auto') == 'stdlib':
+    orjson = None
+
+ENCODER = 'orjson' if orjson is not None else 'stdlib'
+
+
+def _default(value):
+    """NumPy scalars and arrays that slip into a payload"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data):
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _stdlib_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_default)
+
+    def dumps(data):
+        return _stdlib_encoder.encode(data).encode('utf-8')
+
+
+def error_body(message):
+    """Encode an {"error": message, "success": false} response body"""
+    return dumps({"error": message, "success": False})
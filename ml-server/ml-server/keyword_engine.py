@@ -0,0 +1,171 @@
+"""Weighted keyword rules compiled into one Aho-Corasick automaton.
+
+Replaces the hand-written keyword loops of smart_server's fallback: the
+hazard and severity tables live in a JSON file (``keyword_rules.json`` by
+default), every pattern of every table is compiled into a single automaton,
+and a description is scanned once, character by character, no matter how
+many rules there are. All matches are scored - each distinct pattern adds its
+weight to its hazard or severity - so the result no longer depends on the
+order of the tables.
+
+Rules file layout::
+
+    {
+      "default_hazard": "Other",
+      "default_severity": "medium",
+      "smoothing": 1.0,
+      "hazards": {"Potholes": {"pothole": 3, "crater": {"weight": 2, "whole_word": true}}},
+      "severities": {"high": {"urgent": 2}}
+    }
+
+Patterns are matched case-insensitively as substrings unless ``whole_word``
+is set. Confidence is ``top / (top + runner_up + smoothing)``, so a single
+strong match scores high and conflicting matches score low.
+"""
+import json
+import os
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keyword_rules.json')
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher; ``find`` reports (pattern_id, end) for every occurrence"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                raise ValueError("Empty keyword pattern")
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] += (pattern_id,)
+
+        # Breadth-first failure links; each state also reports the patterns
+        # ending at its longest proper suffix state
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] += self.output[self.fail[next_state]]
+
+    @property
+    def n_states(self):
+        return len(self.goto)
+
+    def find(self, text):
+        goto, fail, output = self.goto, self.fail, self.output
+        matches = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                matches.extend((pattern_id, end) for pattern_id in output[state])
+        return matches
+
+
+class KeywordEngine:
+    """Scores a description against weighted hazard and severity keyword tables"""
+
+    TABLES = (('hazards', 'hazard'), ('severities', 'severity'))
+
+    def __init__(self, rules, source=None):
+        self.source = source
+        self.default_hazard = rules.get('default_hazard', 'Other')
+        self.default_severity = rules.get('default_severity', 'medium')
+        self.smoothing = float(rules.get('smoothing', 1.0))
+
+        # Per distinct pattern: its length, whether it must match a whole word,
+        # and the (field, label, weight) entries it contributes to
+        pattern_ids = {}
+        self.patterns = []
+        self.whole_word = []
+        self.entries = []
+        # Definition order breaks score ties deterministically
+        self.rank = {'hazard': {}, 'severity': {}}
+
+        for table, field in self.TABLES:
+            for label, keywords in rules.get(table, {}).items():
+                self.rank[field].setdefault(label, len(self.rank[field]))
+                for pattern, spec in keywords.items():
+                    if isinstance(spec, dict):
+                        weight, whole_word = float(spec.get('weight', 1.0)), bool(spec.get('whole_word', False))
+                    else:
+                        weight, whole_word = float(spec), False
+                    pattern = pattern.lower()
+                    key = (pattern, whole_word)
+                    if key not in pattern_ids:
+                        pattern_ids[key] = len(self.patterns)
+                        self.patterns.append(pattern)
+                        self.whole_word.append(whole_word)
+                        self.entries.append([])
+                    self.entries[pattern_ids[key]].append((field, label, weight))
+
+        self.automaton = AhoCorasick(self.patterns)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), source=path)
+
+    @property
+    def n_rules(self):
+        return sum(len(entries) for entries in self.entries)
+
+    def matched_patterns(self, text):
+        """Ids of the distinct patterns found in the (lowercased) text"""
+        found = set()
+        for pattern_id, end in self.automaton.find(text):
+            if pattern_id in found:
+                continue
+            if self.whole_word[pattern_id]:
+                start = end - len(self.patterns[pattern_id]) + 1
+                if (start > 0 and text[start - 1].isalnum()) or (end + 1 < len(text) and text[end + 1].isalnum()):
+                    continue
+            found.add(pattern_id)
+        return found
+
+    def pick(self, scores, field, default):
+        """Best label, its confidence and the runner-up score"""
+        if not scores:
+            return default, 0.0
+        ranked = sorted(scores, key=lambda label: (-scores[label], self.rank[field][label]))
+        top = scores[ranked[0]]
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0.0
+        return ranked[0], top / (top + runner_up + self.smoothing)
+
+    def classify(self, description):
+        """Return hazard, severity, their confidences and the matched keywords"""
+        text = description.lower()
+        scores = {'hazard': {}, 'severity': {}}
+        matched = []
+        for pattern_id in sorted(self.matched_patterns(text)):
+            matched.append(self.patterns[pattern_id])
+            for field, label, weight in self.entries[pattern_id]:
+                scores[field][label] = scores[field].get(label, 0.0) + weight
+
+        hazard, hazard_confidence = self.pick(scores['hazard'], 'hazard', self.default_hazard)
+        severity, severity_confidence = self.pick(scores['severity'], 'severity', self.default_severity)
+        return {
+            'hazard_type': hazard,
+            'severity': severity,
+            'hazard_confidence': hazard_confidence,
+            'severity_confidence': severity_confidence,
+            'keywords': matched,
+        }
@@ -0,0 +1,173 @@
+"""Low-overhead request instrumentation for the ML servers.
+
+Histograms keep one counter per fixed bucket (found with ``bisect``) plus a
+running sum, so observing a value costs a lock and a couple of additions and
+memory never grows with traffic. Everything is rendered on demand in the
+Prometheus text exposition format for a ``/metrics`` endpoint.
+
+``RateLimitedLog`` replaces unconditional per-request ``logger.info`` calls:
+it lets through at most ``per_second`` lines and reports how many it dropped.
+"""
+import bisect
+import threading
+import time
+
+# Seconds; spans sub-millisecond stages up to slow requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label value tuple"""
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # bucket counts (last one is +Inf), observation count, sum
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            snapshot = {labels: (list(counts), count, total)
+                        for labels, (counts, count, total) in self.series.items()}
+
+        for labels, (counts, count, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                label_text = format_labels(self.label_names + ('le',), labels + (bound,))
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_text} {total}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter, one series per label value tuple"""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            snapshot = dict(self.series)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{format_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class CallbackMetric:
+    """Single value read from a callback at scrape time, e.g. from existing stats"""
+
+    def __init__(self, name, documentation, kind, read):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.read = read
+
+    def render(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}',
+                f'{self.name} {self.read()}']
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def callback(self, *args, **kwargs):
+        return self.register(CallbackMetric(*args, **kwargs))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class RateLimitedLog:
+    """Pass at most ``per_second`` log lines through, counting the rest.
+
+    A token bucket refilled continuously; ``per_second=0`` silences
+    per-request logging and ``float('inf')`` logs everything.
+    """
+
+    def __init__(self, logger, per_second):
+        self.logger = logger
+        self.per_second = per_second
+        self.tokens = min(per_second, 1.0) if per_second != float('inf') else 0.0
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if self.per_second == float('inf'):
+            return True
+        if self.per_second <= 0:
+            self.suppressed += 1
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.per_second, self.tokens + (now - self.updated) * self.per_second)
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+
+        if suppressed:
+            self.logger.info(f"({suppressed} request log lines suppressed)")
+        return True
+
+    def info(self, message):
+        if self.allow():
+            self.logger.info(message)
+
+    def warning(self, message):
+        if self.allow():
+            self.logger.warning(message)
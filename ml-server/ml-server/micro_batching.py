@@ -0,0 +1,240 @@
+"""Asyncio front-end with dynamic micro-batching for smart_server's ``async`` mode.
+
+Single ``/predict`` calls are cheap to batch: one TF-IDF transform and one
+matrix product over N rows costs far less than N separate passes. Here every
+connection is a coroutine on one event loop; ``/predict`` bodies are put on a
+queue and a ``MicroBatcher`` flushes the queue as one model call when either
+``max_batch_size`` requests are waiting or the oldest one has waited
+``max_wait`` seconds. The results are fanned back out to the waiting
+requests.
+
+Routes that are not batched are handed, as raw bytes, to the server's regular
+``BaseHTTPRequestHandler`` subclass on a worker thread, so they behave exactly
+as in the other serving modes.
+"""
+import asyncio
+import io
+import time
+
+from json_encoding import dumps as encode_json
+
+
+def parse_content_length(value):
+    """Body size from a Content-Length header value (0 if absent); ValueError if malformed"""
+    length = int(value or 0)
+    if length < 0:
+        raise ValueError(f"Negative Content-Length {length}")
+    return length
+
+
+class MicroBatcher:
+    """Collect submitted items and process them in batches.
+
+    ``process_batch(items) -> results`` runs in ``executor`` so the event loop
+    keeps accepting connections while a batch is being scored; requests that
+    arrive meanwhile form the next batch.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_wait=0.005, executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self.queue = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.size_flushes = 0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        return await future
+
+    async def collect(self):
+        """Wait for one item, then gather more until the batch is full or the deadline passes"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        self.queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect()
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            if len(batch) == self.max_batch_size:
+                self.size_flushes += 1
+
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.process_batch, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "requests": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "flushed_on_size": self.size_flushes,
+            "flushed_on_deadline": self.batches - self.size_flushes,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+        }
+
+
+class BufferedConnection:
+    """Socket stand-in that replays one buffered request into a request handler"""
+
+    def __init__(self, raw_request):
+        self.raw_request = raw_request
+        self.output = io.BytesIO()
+
+    def makefile(self, mode, *args, **kwargs):
+        return io.BytesIO(self.raw_request)
+
+    def sendall(self, data):
+        self.output.write(data)
+
+    def settimeout(self, timeout):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+
+class AsyncHTTPFrontend:
+    """Minimal HTTP/1.1 server on asyncio streams.
+
+    ``routes`` maps (method, path) to a coroutine ``route(body) -> (status,
+    payload)``. Anything else is replayed through ``handler_class`` on the
+    executor. Connections are kept alive unless the client asks otherwise or
+    the handler class speaks HTTP/1.0 (its responses then have no framing the
+    front-end can rely on).
+
+    For routed requests, body read and serialize times go to
+    ``stage_histogram`` and the total to ``request_histogram`` (labelled
+    path, status), when given. A kept-alive connection that sends nothing
+    for ``idle_timeout`` seconds is closed. Like the threaded handler, a
+    malformed Content-Length gets a 400 and a body over ``max_body_size``
+    bytes a 413, without reading the body; the connection is then closed.
+    """
+
+    def __init__(self, routes, handler_class, executor=None, stage_histogram=None, request_histogram=None,
+                 idle_timeout=None, max_body_size=None):
+        self.routes = routes
+        self.idle_timeout = idle_timeout
+        self.max_body_size = max_body_size
+        self.handler_class = handler_class
+        self.executor = executor
+        self.stage_histogram = stage_histogram
+        self.request_histogram = request_histogram
+
+    def delegate(self, raw_request, client_address):
+        connection = BufferedConnection(raw_request)
+        self.handler_class(connection, client_address, self)
+        return connection.output.getvalue()
+
+    def error_bytes(self, status, message):
+        return self.response_bytes(status, {"error": message, "success": False}, False)
+
+    def response_bytes(self, status, payload, keep_alive):
+        start = time.perf_counter()
+        body = encode_json(payload)
+        if self.stage_histogram is not None:
+            self.stage_histogram.observe(time.perf_counter() - start, 'serialize')
+        headers = [
+            f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+            "Content-Type: application/json",
+            "Access-Control-Allow-Origin: *",
+            "Cache-Control: no-store",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        client_address = writer.get_extra_info('peername')
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not request_line.strip():
+                    break
+
+                raw_headers = [request_line]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    raw_headers.append(line)
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    writer.write(self.error_bytes(400, "Bad request"))
+                    break
+                method, path, version = parts
+
+                try:
+                    content_length = parse_content_length(headers.get('content-length'))
+                except ValueError:
+                    writer.write(self.error_bytes(400, "Invalid Content-Length"))
+                    break
+                if self.max_body_size is not None and content_length > self.max_body_size:
+                    writer.write(self.error_bytes(413, f"Request body too large (max {self.max_body_size} bytes)"))
+                    break
+
+                started = time.perf_counter()
+                body = await reader.readexactly(content_length)
+                if self.stage_histogram is not None:
+                    self.stage_histogram.observe(time.perf_counter() - started, 'body_read')
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                route = self.routes.get((method, path))
+                if route is None:
+                    raw_request = b''.join(raw_headers) + body
+                    writer.write(await loop.run_in_executor(
+                        self.executor, self.delegate, raw_request, client_address))
+                    keep_alive = keep_alive and self.handler_class.protocol_version == 'HTTP/1.1'
+                else:
+                    status, payload = await route(body)
+                    writer.write(self.response_bytes(status, payload, keep_alive))
+                    if self.request_histogram is not None:
+                        self.request_histogram.observe(time.perf_counter() - started, path, str(status))
+
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,247 @@
+"""Pure-NumPy inference engine for serving artifacts.
+
+Reimplements exactly what the trained pipelines do at predict time -
+sklearn's word analyzer (lowercasing, token regex, stop words, n-grams),
+vocabulary lookup, TF-IDF weighting and LogisticRegression's
+``predict_proba`` - on top of the arrays written by
+``ML/data/serving_export.py``. Serving through it never imports
+scikit-learn or scipy, which keeps worker startup time and RSS down.
+
+Vocabulary lookups use ``np.searchsorted`` on the sorted, memory-mapped term
+table, so no per-process vocabulary dict is built either. Compact artifacts
+keep that table once, as UTF-8 bytes, for both models, and int8 weights stay
+int8 in memory: each class's scale is applied to its summed score.
+"""
+import re
+import time
+import unicodedata
+
+import numpy as np
+
+from serving_artifact import MODELS, load_arrays, model_arrays, read_manifest
+
+# Settings that shape the analyzer output; models agreeing on these share tokenization
+ANALYZER_SETTINGS = ('analyzer', 'lowercase', 'strip_accents', 'token_pattern', 'stop_words', 'ngram_range')
+
+
+def strip_accents_unicode(text):
+    normalized = unicodedata.normalize('NFKD', text)
+    if normalized == text:
+        return text
+    return ''.join(char for char in normalized if not unicodedata.combining(char))
+
+
+def strip_accents_ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
+
+class Analyzer:
+    """sklearn's ``analyzer='word'`` text -> n-gram list, without sklearn"""
+
+    def __init__(self, settings, stop_words):
+        if settings['analyzer'] != 'word':
+            raise ValueError(f"Unsupported analyzer {settings['analyzer']!r}")
+
+        self.lowercase = settings['lowercase']
+        self.strip_accents = {
+            None: None,
+            'unicode': strip_accents_unicode,
+            'ascii': strip_accents_ascii,
+        }[settings['strip_accents']]
+        self.token_pattern = re.compile(settings['token_pattern'])
+        if self.token_pattern.groups > 1:
+            raise ValueError("token_pattern may contain at most one capturing group")
+        self.stop_words = frozenset(stop_words) if settings['stop_words'] is not None else None
+        self.min_n, self.max_n = settings['ngram_range']
+
+    def __call__(self, text):
+        if self.lowercase:
+            text = text.lower()
+        if self.strip_accents is not None:
+            text = self.strip_accents(text)
+
+        tokens = self.token_pattern.findall(text)
+        if self.stop_words is not None:
+            tokens = [token for token in tokens if token not in self.stop_words]
+
+        if self.max_n == 1:
+            return tokens
+
+        ngrams = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), min(self.max_n, len(tokens)) + 1):
+            ngrams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+
+class LinearTextModel:
+    """One exported TF-IDF + logistic regression model"""
+
+    def __init__(self, spec, arrays, name):
+        settings = spec['vectorizer']
+        self.settings = settings
+        self.terms, self.columns, idf, self.coef, self.coef_scale, self.intercept, self.classes = \
+            model_arrays(spec, arrays, name)
+        self.idf = idf if settings['use_idf'] else None
+        self.kind = spec['classifier']['kind']
+        self.n_features = spec['n_features']
+        self.dtype = np.dtype(settings['dtype'])
+
+    def lookup(self, ngrams):
+        """Map n-grams (encoded like the term table) to feature columns; -1 for n-grams outside the vocabulary"""
+        if not len(ngrams):
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.terms, ngrams)
+        positions[positions == len(self.terms)] = 0
+        found = self.terms[positions] == ngrams
+        return np.where(found, self.columns[positions], -1)
+
+    def features(self, row_ids, ngrams, n_rows):
+        """Sparse TF-IDF rows as (rows, columns, values), l2-normalized like TfidfVectorizer"""
+        columns = self.lookup(ngrams)
+        known = columns >= 0
+        keys = row_ids[known] * self.n_features + columns[known]
+        keys, counts = np.unique(keys, return_counts=True)
+        rows, columns = np.divmod(keys, self.n_features)
+
+        values = counts.astype(self.dtype)
+        if self.settings['binary']:
+            values[:] = 1
+        if self.settings['sublinear_tf']:
+            values = np.log(values) + 1
+        if self.idf is not None:
+            values *= self.idf[columns]
+
+        norm = self.settings['norm']
+        if norm == 'l2':
+            norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_rows))
+        elif norm == 'l1':
+            norms = np.bincount(rows, weights=np.abs(values), minlength=n_rows)
+        elif norm is None:
+            norms = None
+        else:
+            raise ValueError(f"Unsupported norm {norm!r}")
+        if norms is not None:
+            norms[norms == 0] = 1
+            values = values / norms[rows]
+
+        return rows, columns, values
+
+    def predict_proba(self, row_ids, ngrams, n_rows, timings=None):
+        start = time.perf_counter()
+        rows, columns, values = self.features(row_ids, ngrams, n_rows)
+        if timings is not None:
+            timings['vectorize'] = timings.get('vectorize', 0.0) + time.perf_counter() - start
+
+        # decision = X @ coef.T + intercept, accumulated per class over the nonzeros
+        contributions = self.coef[:, columns] * values
+        scores = np.empty((n_rows, self.coef.shape[0]), dtype=np.float64)
+        for k in range(self.coef.shape[0]):
+            scores[:, k] = np.bincount(rows, weights=contributions[k], minlength=n_rows)
+        if self.coef_scale is not None:
+            scores *= self.coef_scale
+        scores += self.intercept
+
+        if self.kind == 'binary':
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        if self.kind == 'ovr':
+            proba = 1.0 / (1.0 + np.exp(-scores))
+            return proba / proba.sum(axis=1, keepdims=True)
+
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+
+class NumpyModel:
+    """Drop-in replacement for ``inference.CompiledModel`` backed by a serving artifact"""
+
+    engine = 'numpy'
+
+    def __init__(self, path, mmap_mode='r', version=None):
+        manifest = read_manifest(path)
+        arrays = load_arrays(path, manifest, mmap_mode)
+        stop_words = arrays['stop_words'].tolist() if 'stop_words' in arrays else None
+
+        self.version = version or manifest['version']
+        self.loaded_at = time.time()
+
+        self.models = {}
+        self.encoder_classes = {}
+        self.class_names = {}
+        for name, _, _ in MODELS:
+            spec = manifest['models'][name]
+            self.models[name] = LinearTextModel(spec, arrays, name)
+            encoder_classes = np.asarray(arrays[spec['classes']])
+            self.encoder_classes[name] = encoder_classes.tolist()
+            # Decoded class name per probability column, as in CompiledModel
+            self.class_names[name] = encoder_classes[np.asarray(self.models[name].classes)]
+
+        self.category_names = self.class_names['category']
+        self.severity_names = self.class_names['severity']
+
+        # Models with identical analyzer settings share one tokenization pass
+        self.analyzers = {}
+        self.analyzer_for = {}
+        for name, model in self.models.items():
+            key = repr([model.settings[setting] for setting in ANALYZER_SETTINGS])
+            if key not in self.analyzers:
+                self.analyzers[key] = Analyzer(model.settings, stop_words)
+            self.analyzer_for[name] = key
+        self.shares_tokenization = len(self.analyzers) < len(self.models)
+        # Compact artifacts store the term table as UTF-8 bytes
+        self.encode_terms = any(model.terms.dtype.kind == 'S' for model in self.models.values())
+
+    @property
+    def category_classes(self):
+        return self.encoder_classes['category']
+
+    @property
+    def severity_classes(self):
+        return self.encoder_classes['severity']
+
+    def tokenize(self, analyzer, texts):
+        """Flatten a batch into parallel (row id, n-gram) arrays"""
+        row_ids = []
+        ngrams = []
+        for row, text in enumerate(texts):
+            grams = analyzer(text)
+            ngrams.extend(grams)
+            row_ids.extend([row] * len(grams))
+        if self.encode_terms:
+            return np.array(row_ids, dtype=np.int64), np.array([gram.encode('utf-8') for gram in ngrams], dtype=bytes)
+        return np.array(row_ids, dtype=np.int64), np.array(ngrams, dtype=str)
+
+    def predict_proba(self, texts, timings=None):
+        """Return (category_proba, severity_proba) for already-preprocessed texts.
+
+        ``timings``, if given, receives 'vectorize' (tokenizing plus TF-IDF
+        features) and 'classify' seconds like ``CompiledModel.predict_proba``.
+        """
+        start = time.perf_counter()
+        tokenized = {key: self.tokenize(analyzer, texts) for key, analyzer in self.analyzers.items()}
+        stages = {'vectorize': time.perf_counter() - start}
+        probabilities = tuple(
+            self.models[name].predict_proba(*tokenized[self.analyzer_for[name]], len(texts), stages)
+            for name in ('category', 'severity')
+        )
+        if timings is not None:
+            timings['vectorize'] = stages['vectorize']
+            timings['classify'] = time.perf_counter() - start - stages['vectorize']
+        return probabilities
+
+    def predict(self, texts, timings=None):
+        """Same output as ``CompiledModel.predict``"""
+        category_proba, severity_proba = self.predict_proba(texts, timings)
+        rows = np.arange(len(texts))
+        category_index = np.argmax(category_proba, axis=1)
+        severity_index = np.argmax(severity_proba, axis=1)
+
+        return {
+            'category': self.category_names[category_index],
+            'severity': self.severity_names[severity_index],
+            'category_index': category_index,
+            'severity_index': severity_index,
+            'category_confidence': category_proba[rows, category_index],
+            'severity_confidence': severity_proba[rows, severity_index],
+        }
@@ -0,0 +1,91 @@
+"""Bounded LRU cache for prediction results.
+
+Keys are ``(model_version, preprocessed_text)`` so near-identical complaints
+that normalize to the same text share one entry, and entries from a previous
+model can never be served after a reload.
+"""
+from collections import OrderedDict
+import os
+import threading
+import time
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with an optional per-entry TTL.
+
+    ``maxsize=0`` disables caching entirely; ``ttl=None`` keeps entries until
+    they are evicted.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from ML_CACHE_SIZE and ML_CACHE_TTL (seconds, 0 = no expiry)"""
+        ttl = float(os.environ.get('ML_CACHE_TTL', '0'))
+        return cls(maxsize=int(os.environ.get('ML_CACHE_SIZE', '10000')), ttl=ttl or None)
+
+    @staticmethod
+    def make_key(model_version, processed_text):
+        return (model_version, processed_text)
+
+    def get(self, key):
+        """Return a copy of the cached result, or None on a miss"""
+        if not self.maxsize:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+
+        with self._lock:
+            self._entries[key] = (dict(value), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry; counters are kept so /stats stays cumulative"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": bool(self.maxsize),
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,283 @@
+"""Opt-in, sampled request profiling for the ML servers.
+
+A ``RequestProfiler`` runs a configurable fraction of requests under a
+profiler and aggregates what it sees over a time window:
+
+- ``cprofile`` mode wraps each sampled request in ``cProfile`` and merges
+  the results into one ``pstats.Stats``, served as a binary pstats dump
+  (``snakeviz``, ``python -m pstats``) or as text.
+- ``sample`` mode registers the request's thread with one background
+  thread that snapshots its stack every ``interval`` seconds, and counts
+  the stacks in collapsed format (``a;b;c 42``) for ``flamegraph.pl`` or
+  speedscope. Far cheaper than cProfile, at the cost of precision.
+
+With ``rate`` 0 (the default) ``run`` is a single attribute check in front
+of the handler call. Only one request is profiled at a time in cprofile
+mode: from Python 3.12 cProfile cannot be enabled on two threads at once.
+
+At the end of each window the aggregate becomes the "last" window (and is
+written to ``dump_dir`` when set, after the lock is released so requests
+never wait on the disk) and a new one starts. Settings come from
+ML_PROFILE_RATE, ML_PROFILE_MODE, ML_PROFILE_WINDOW, ML_PROFILE_INTERVAL_MS
+and ML_PROFILE_DIR.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+# Innermost frames kept per sampled stack
+MAX_STACK_DEPTH = 64
+
+# Requests under this path (profile export and config, reloads) are neither profiled nor counted
+ADMIN_PATH_PREFIX = '/admin/'
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse_stack(frame):
+    """Root-first 'file:function;...' for a thread's current frame"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class ProfileWindow:
+    """What the sampled requests of one time window added up to"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ended_at = None
+        self.requests = 0
+        self.stats = None
+        self.stacks = Counter()
+
+    def add_profile(self, profile):
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+
+    def pstats_bytes(self):
+        """Binary pstats dump, as ``pstats.Stats.dump_stats`` writes it"""
+        return marshal.dumps(self.stats.stats) if self.stats is not None else marshal.dumps({})
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def text(self, limit=40):
+        if self.stats is not None:
+            out = io.StringIO()
+            report = pstats.Stats(stream=out)
+            report.add(self.stats)
+            report.sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+        return ''.join(f"{count:>8}  {stack}\n" for stack, count in self.stacks.most_common(limit))
+
+    def summary(self):
+        return {
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "requests": self.requests,
+            "functions": len(self.stats.stats) if self.stats is not None else 0,
+            "samples": sum(self.stacks.values()),
+            "distinct_stacks": len(self.stacks),
+        }
+
+
+class RequestProfiler:
+    """Profile a random ``rate`` fraction of ``run`` calls, aggregated per ``window`` seconds"""
+
+    def __init__(self, rate=0.0, mode='cprofile', window=60.0, interval=0.005, dump_dir=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+        self.rate = rate
+        self.mode = mode
+        self.window = window
+        self.interval = interval
+        self.dump_dir = dump_dir
+        self.lock = threading.Lock()
+        self.cprofile_lock = threading.Lock()
+        self.current = ProfileWindow()
+        self.last = None
+        # Finished windows waiting to be written to dump_dir by write_dumps
+        self.finished = []
+        self.skipped = 0
+        # Sample mode: threads being profiled, and the sampler that watches them
+        self.active_threads = set()
+        self.wake = threading.Event()
+        self.sampler = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            rate=float(os.environ.get('ML_PROFILE_RATE', '0')),
+            mode=os.environ.get('ML_PROFILE_MODE', 'cprofile'),
+            window=float(os.environ.get('ML_PROFILE_WINDOW', '60')),
+            interval=float(os.environ.get('ML_PROFILE_INTERVAL_MS', '5')) / 1000,
+            dump_dir=os.environ.get('ML_PROFILE_DIR') or None,
+        )
+
+    def configure(self, rate=None, mode=None):
+        """Change the sampling rate or mode at runtime; a mode change starts a new window"""
+        with self.lock:
+            if mode is not None and mode != self.mode:
+                if mode not in PROFILE_MODES:
+                    raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+                self.mode = mode
+                self.rotate(time.time())
+            if rate is not None:
+                self.rate = min(max(float(rate), 0.0), 1.0)
+        self.write_dumps()
+
+    def run(self, function, *args):
+        """Call function(*args), profiling it for a sampled fraction of calls"""
+        if not self.rate or random.random() >= self.rate:
+            return function(*args)
+        if self.mode == 'sample':
+            return self.run_sampled(function, args)
+        return self.run_cprofile(function, args)
+
+    def run_request(self, path, function, *args):
+        """``run`` for the handler of an HTTP request to ``path``; admin routes always run unprofiled"""
+        if path.startswith(ADMIN_PATH_PREFIX):
+            return function(*args)
+        return self.run(function, *args)
+
+    def run_cprofile(self, function, args):
+        if not self.cprofile_lock.acquire(blocking=False):
+            self.skipped += 1
+            return function(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                return function(*args)
+            finally:
+                profile.disable()
+        finally:
+            self.cprofile_lock.release()
+            with self.lock:
+                self.current_window().add_profile(profile)
+                self.current.requests += 1
+            self.write_dumps()
+
+    def run_sampled(self, function, args):
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.start_sampler()
+            self.active_threads.add(thread_id)
+            self.wake.set()
+        try:
+            return function(*args)
+        finally:
+            with self.lock:
+                self.active_threads.discard(thread_id)
+                if not self.active_threads:
+                    self.wake.clear()
+                self.current_window().requests += 1
+            self.write_dumps()
+
+    def start_sampler(self):
+        if self.sampler is None:
+            self.sampler = threading.Thread(target=self.sample_loop, name="request-sampler", daemon=True)
+            self.sampler.start()
+
+    def sample_loop(self):
+        me = threading.get_ident()
+        while True:
+            # Sleeps here, costing nothing, while no sampled request is running
+            self.wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                window = self.current_window()
+                for thread_id in self.active_threads:
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        window.stacks[collapse_stack(frame)] += 1
+            self.write_dumps()
+
+    def current_window(self):
+        """The window being filled, rotated first if it has run out; call with the lock held"""
+        now = time.time()
+        if now - self.current.started_at >= self.window:
+            self.rotate(now)
+        return self.current
+
+    def rotate(self, now):
+        """Start a new window; call with the lock held, then ``write_dumps`` once it is released"""
+        finished = self.current
+        finished.ended_at = now
+        self.current = ProfileWindow()
+        if finished.requests:
+            self.last = finished
+            if self.dump_dir:
+                self.finished.append(finished)
+
+    def write_dumps(self):
+        """Write the windows finished since the last call to dump_dir; call without the lock"""
+        if not self.finished:
+            return
+        with self.lock:
+            finished, self.finished = self.finished, []
+        for window in finished:
+            self.dump(window)
+
+    def dump(self, window):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(window.started_at))
+        base = os.path.join(self.dump_dir, f"profile-{os.getpid()}-{stamp}")
+        if window.stats is not None:
+            with open(base + '.pstats', 'wb') as f:
+                f.write(window.pstats_bytes())
+        if window.stacks:
+            with open(base + '.collapsed', 'w') as f:
+                f.write(window.collapsed())
+
+    def window_for(self, which):
+        """'current' or 'last' (the last completed window, else the current one)"""
+        with self.lock:
+            self.current_window()
+            window = self.last if which == 'last' and self.last is not None else self.current
+        self.write_dumps()
+        return window
+
+    def export(self, which='last', output_format='text'):
+        """(content_type, body bytes) of a window in 'pstats', 'collapsed' or 'text' format"""
+        window = self.window_for(which)
+        with self.lock:
+            if output_format == 'pstats':
+                return 'application/octet-stream', window.pstats_bytes()
+            if output_format == 'collapsed':
+                return 'text/plain; charset=utf-8', window.collapsed().encode()
+            if output_format == 'text':
+                return 'text/plain; charset=utf-8', window.text().encode()
+        raise ValueError(f"Unknown profile format {output_format!r}")
+
+    def stats(self):
+        with self.lock:
+            self.current_window()
+            stats = {
+                "rate": self.rate,
+                "mode": self.mode,
+                "window_seconds": self.window,
+                "skipped_busy": self.skipped,
+                "current": self.current.summary(),
+                "last": self.last.summary() if self.last is not None else None,
+            }
+        self.write_dumps()
+        return stats
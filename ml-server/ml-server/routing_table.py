@@ -0,0 +1,154 @@
+"""Model label -> hazard type, department and escalation level, compiled once per model.
+
+The routing rules (``routing_rules.json`` by default) give every hazard type
+the frontend knows a department and a default escalation level, and map each
+model label to a hazard type, optionally overriding its department or
+escalation level::
+
+    {
+      "default_hazard": "Other",
+      "hazard_types": {"Potholes": {"department": "Public Works Department (PWD)", "escalation_level": "staff"}},
+      "labels": {"road_damage": "Potholes",
+                 "park_maintenance": {"hazard_type": "Other", "department": "Parks & Environment Department"}}
+    }
+
+Departments and escalation levels are checked against the enums of the
+``Complaint`` schema when the rules are loaded, so a prediction never names a
+department the backend would reject. The enums are read from
+``complaint.model.js`` when the server source is next to this one
+(ML_COMPLAINT_SCHEMA points elsewhere), else the copies below are used.
+
+``RoutingRules.compile`` lays the routes out as arrays aligned with a model's
+probability columns: a batch of predicted column indices resolves to hazard
+types, departments and escalation levels with one array lookup per field.
+Labels the rules don't know go to ``default_hazard``.
+"""
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_ROUTING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing_rules.json')
+DEFAULT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   '..', '..', 'server', 'src', 'models', 'complaint.model.js')
+
+# Copies of the Complaint schema enums, for deployments without the server source
+DEPARTMENTS = (
+    'Public Works Department (PWD)',
+    'Sanitation Department',
+    'Water Supply Department',
+    'Electricity Department',
+    'Parks & Environment Department',
+)
+ESCALATION_LEVELS = ('staff', 'admin', 'superadmin')
+
+ROUTE_FIELDS = ('hazard_type', 'department', 'escalation_level')
+
+# Route of every label while no valid rules are loaded: the backend picks the department
+UNROUTED = {'hazard_type': 'Other', 'department': None, 'escalation_level': None}
+
+
+def schema_enum(source, field):
+    """Values of ``field: {..., enum: [...]}`` in a mongoose schema's source, or None if absent"""
+    match = re.search(rf"\b{field}\s*:\s*\{{[^}}]*?\benum\s*:\s*\[([^\]]*)\]", source)
+    if match is None:
+        return None
+    return tuple(single or double for single, double in re.findall(r"'([^']*)'|\"([^\"]*)\"", match.group(1)))
+
+
+def load_schema_enums(path=None):
+    """(departments, escalation levels, where they came from)"""
+    path = path or DEFAULT_SCHEMA_PATH
+    try:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+    except OSError:
+        return DEPARTMENTS, ESCALATION_LEVELS, 'built-in'
+    departments = schema_enum(source, 'department')
+    levels = schema_enum(source, 'escalationLevel')
+    if not departments or not levels:
+        raise ValueError(f"No department/escalationLevel enum found in {path}")
+    return departments, levels, os.path.normpath(path)
+
+
+class CompiledRoutes:
+    """Routes of one model: per probability column hazard type, department and escalation level"""
+
+    def __init__(self, columns, fingerprint):
+        self.columns = columns
+        self.fingerprint = fingerprint
+
+    def lookup(self, column_index):
+        """{field: array} for an array of predicted column indices"""
+        return {field: values[column_index] for field, values in self.columns.items()}
+
+    @classmethod
+    def unrouted(cls, column_labels):
+        """Routes for a model served without routing rules"""
+        columns = {field: np.full(len(column_labels), UNROUTED[field], dtype=object) for field in ROUTE_FIELDS}
+        return cls(columns, 'unrouted')
+
+
+class RoutingRules:
+    """Validated routing rules; ``compile`` turns them into a model's ``CompiledRoutes``"""
+
+    def __init__(self, rules, departments=DEPARTMENTS, escalation_levels=ESCALATION_LEVELS, source=None,
+                 schema='built-in'):
+        self.source = source
+        self.schema = schema
+        self.fingerprint = hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:12]
+
+        errors = []
+        self.hazard_routes = {}
+        for hazard_type, route in rules.get('hazard_types', {}).items():
+            self.hazard_routes[hazard_type] = {'hazard_type': hazard_type, 'department': route.get('department'),
+                                               'escalation_level': route.get('escalation_level', 'staff')}
+
+        self.default_hazard = rules.get('default_hazard', 'Other')
+        if self.default_hazard not in self.hazard_routes:
+            errors.append(f"default_hazard {self.default_hazard!r} has no hazard_types entry")
+
+        self.label_routes = {}
+        for label, route in rules.get('labels', {}).items():
+            if isinstance(route, str):
+                route = {'hazard_type': route}
+            hazard_type = route.get('hazard_type')
+            if hazard_type not in self.hazard_routes:
+                errors.append(f"label {label!r}: unknown hazard_type {hazard_type!r}")
+                continue
+            self.label_routes[label] = {**self.hazard_routes[hazard_type],
+                                        **{field: route[field] for field in ROUTE_FIELDS if field in route}}
+
+        for name, route in [*self.hazard_routes.items(), *self.label_routes.items()]:
+            if route['department'] not in departments:
+                errors.append(f"{name!r}: department {route['department']!r} is not one of {list(departments)}")
+            if route['escalation_level'] not in escalation_levels:
+                errors.append(f"{name!r}: escalation_level {route['escalation_level']!r} "
+                              f"is not one of {list(escalation_levels)}")
+        if errors:
+            raise ValueError("Invalid routing rules: " + "; ".join(errors))
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_ROUTING_PATH, schema_path=None):
+        departments, escalation_levels, schema = load_schema_enums(schema_path)
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), departments, escalation_levels, source=path, schema=schema)
+
+    def route(self, label):
+        """Route of one model label"""
+        return self.label_routes.get(label) or self.hazard_routes[self.default_hazard]
+
+    def hazard_route(self, hazard_type):
+        """Route of a hazard type, for predictions that come with one (the keyword fallback)"""
+        return self.hazard_routes.get(hazard_type) or self.hazard_routes[self.default_hazard]
+
+    def unrouted(self, labels):
+        return [label for label in labels if label not in self.label_routes]
+
+    def compile(self, column_labels):
+        """CompiledRoutes for a model whose probability column i predicts ``column_labels[i]``"""
+        routes = [self.route(label) for label in column_labels]
+        columns = {field: np.array([route[field] for route in routes], dtype=object) for field in ROUTE_FIELDS}
+        return CompiledRoutes(columns, self.fingerprint)
@@ -0,0 +1,136 @@
+"""Load models from either a joblib pickle or an mmap-friendly serving artifact.
+
+Serving artifacts are directories written by ``ML/data/serving_export.py``:
+plain ``.npy`` arrays plus a ``manifest.json``. Loading one maps the weight
+arrays read-only instead of unpickling them, so startup is fast and every
+worker process shares the same page-cache copy of the coefficients.
+
+Version 2 artifacts are the compact export (pruned vocabulary, one shared
+term table, float32 or int8 weights); ``model_arrays`` resolves either
+layout to the same per-model arrays.
+"""
+import json
+import os
+
+import numpy as np
+
+ARTIFACT_FORMAT = 'ecoresolve-serving'
+SUPPORTED_VERSIONS = (1, 2)
+
+MODELS = (
+    ('category', 'category_pipeline', 'label_encoder'),
+    ('severity', 'severity_pipeline', 'severity_encoder'),
+)
+
+
+def is_serving_artifact(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'manifest.json'))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a serving artifact")
+    if manifest.get('format_version') not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported serving artifact version {manifest.get('format_version')}")
+    return manifest
+
+
+def load_arrays(path, manifest, mmap_mode='r'):
+    """Open every array listed in the manifest, memory-mapped unless mmap_mode is None"""
+    return {
+        name: np.load(os.path.join(path, filename), mmap_mode=mmap_mode, allow_pickle=False)
+        for name, filename in manifest['files'].items()
+    }
+
+
+def model_arrays(spec, arrays, name):
+    """(terms, columns, idf, coef, coef_scale, intercept, classes) of one model.
+
+    ``terms`` may be the shared UTF-8 table of a compact artifact, in which
+    case ``columns`` is -1 for terms this model doesn't use. ``coef_scale``
+    is the per-class scale of int8 weights, or None.
+    """
+    coef_scale = arrays[spec['coef_scale']] if 'coef_scale' in spec else None
+    return (arrays[spec.get('terms', f'{name}_terms')], arrays[f'{name}_columns'], arrays[f'{name}_idf'],
+            arrays[f'{name}_coef'], coef_scale, arrays[f'{name}_intercept'], arrays[f'{name}_classes'])
+
+
+def known_params(estimator_class, params):
+    """Drop params this sklearn version's estimator doesn't accept"""
+    accepted = estimator_class().get_params()
+    return {name: value for name, value in params.items() if name in accepted}
+
+
+def build_vectorizer(settings, terms, columns, idf):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    params = known_params(TfidfVectorizer, settings)
+    params['ngram_range'] = tuple(params['ngram_range'])
+    params['dtype'] = np.dtype(settings['dtype']).type
+    if terms.dtype.kind == 'S':
+        terms = np.char.decode(terms, 'utf-8')
+    params['vocabulary'] = {term: column for term, column in zip(terms.tolist(), columns.tolist())
+                            if column >= 0}
+
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def build_classifier(spec, coef, intercept, classes, coef_scale=None):
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+    classifier_class = {
+        'LogisticRegression': LogisticRegression,
+        'SGDClassifier': SGDClassifier,
+    }.get(spec['type'])
+    if classifier_class is None:
+        raise ValueError(f"Unsupported classifier type {spec['type']}")
+
+    params = known_params(classifier_class, spec['params'])
+    # JSON turns class_weight's integer keys into strings; it only matters for fitting
+    params.pop('class_weight', None)
+    classifier = classifier_class(**params)
+    if coef_scale is not None:
+        # sklearn needs real-valued weights; this copy is private to the process
+        coef = coef.astype(np.float32) * np.asarray(coef_scale)[:, None]
+    classifier.classes_ = np.asarray(classes)
+    classifier.coef_ = coef
+    classifier.intercept_ = intercept
+    classifier.n_features_in_ = coef.shape[1]
+    return classifier
+
+
+def load_serving_artifact(path, mmap_mode='r'):
+    """Rebuild the model_data dict around the artifact's (memory-mapped) arrays"""
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import LabelEncoder
+
+    manifest = read_manifest(path)
+    arrays = load_arrays(path, manifest, mmap_mode)
+
+    model_data = {}
+    for name, pipeline_key, encoder_key in MODELS:
+        spec = manifest['models'][name]
+        terms, columns, idf, coef, coef_scale, intercept, classes = model_arrays(spec, arrays, name)
+        vectorizer = build_vectorizer(spec['vectorizer'], terms, columns, idf)
+        classifier = build_classifier(spec['classifier'], coef, intercept, classes, coef_scale)
+        model_data[pipeline_key] = Pipeline([('tfidf', vectorizer), ('clf', classifier)])
+
+        encoder = LabelEncoder()
+        encoder.classes_ = np.asarray(arrays[spec['classes']]).astype(object)
+        model_data[encoder_key] = encoder
+
+    return model_data
+
+
+def load_model_data(path, mmap_mode='r'):
+    """Load a model_data dict from a serving artifact directory or a joblib file"""
+    if is_serving_artifact(path):
+        return load_serving_artifact(path, mmap_mode)
+
+    import joblib
+    return joblib.load(path)
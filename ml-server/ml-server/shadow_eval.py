@@ -0,0 +1,220 @@
+"""Shadow evaluation of a candidate model against live traffic, off the request path.
+
+``ShadowEvaluator.submit`` copies the preprocessed texts of a live model call
+and the live predictions onto a bounded queue and returns at once; when the
+queue is full the call is dropped and counted, never waited on. A separate
+worker process loads the candidate (a joblib ``model_data`` file or serving
+artifact), scores the queued texts in batches and accumulates how often it
+agrees with the live model and how its confidences differ.
+
+The worker is a process rather than a thread so scoring never competes with
+request threads for the GIL. Queue, counters and status live in shared
+memory, so pre-forked server workers all feed the one worker process and
+any of them can report on it for ``/admin/shadow``. Live confidences are the
+rounded values from the response, so confidence deltas have a resolution of
+0.01.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import time
+
+# Slots of the shared counter array
+COUNTERS = ('texts', 'batches', 'category_agree', 'severity_agree', 'both_agree',
+            'category_delta', 'category_abs_delta', 'severity_delta', 'severity_abs_delta',
+            'score_seconds', 'errors', 'submitted', 'dropped')
+SLOT = {name: i for i, name in enumerate(COUNTERS)}
+
+# Bytes reserved for the worker's JSON status
+STATUS_SIZE = 1024
+
+
+def set_status(status, **state):
+    status.value = json.dumps(state).encode()[:STATUS_SIZE - 1]
+
+
+def open_candidate(path, engine):
+    """Load the candidate the way smart_server loads the live model"""
+    from inference import CompiledModel, model_file_version
+    if engine == 'numpy':
+        from numpy_engine import NumpyModel
+        return NumpyModel(path)
+    from serving_artifact import load_model_data
+    return CompiledModel(load_model_data(path), version=model_file_version(path))
+
+
+def collect(items, batch_size, max_wait):
+    """Block for one queued call, then take more until batch_size texts or max_wait; None means stop"""
+    first = items.get()
+    if first is None:
+        return None
+    batch = [first]
+    texts = len(first[0])
+    deadline = time.monotonic() + max_wait
+    while texts < batch_size:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            item = items.get(timeout=timeout)
+        except queue.Empty:
+            break
+        if item is None:
+            items.put(None)
+            break
+        batch.append(item)
+        texts += len(item[0])
+    return batch
+
+
+def shadow_worker(path, engine, items, status, counters, batch_size, max_wait):
+    """Worker process body: load the candidate, then score queued calls until told to stop"""
+    try:
+        model = open_candidate(path, engine)
+    except Exception as e:
+        set_status(status, state="failed", error=str(e))
+        return
+    set_status(status, state="running", version=model.version)
+
+    while True:
+        batch = collect(items, batch_size, max_wait)
+        if batch is None:
+            set_status(status, state="stopped", version=model.version)
+            break
+
+        texts, live = [], []
+        for item_texts, item_live in batch:
+            texts.extend(item_texts)
+            live.extend(item_live)
+
+        start = time.perf_counter()
+        try:
+            prediction = model.predict(texts)
+        except Exception:
+            with counters.get_lock():
+                counters[SLOT['errors']] += len(texts)
+            continue
+        elapsed = time.perf_counter() - start
+
+        totals = dict.fromkeys(COUNTERS, 0.0)
+        for row, (category, severity, category_confidence, severity_confidence) in enumerate(live):
+            category_agrees = prediction['category'][row] == category
+            severity_agrees = prediction['severity'][row] == severity
+            category_delta = float(prediction['category_confidence'][row]) - category_confidence
+            severity_delta = float(prediction['severity_confidence'][row]) - severity_confidence
+            totals['category_agree'] += category_agrees
+            totals['severity_agree'] += severity_agrees
+            totals['both_agree'] += category_agrees and severity_agrees
+            totals['category_delta'] += category_delta
+            totals['category_abs_delta'] += abs(category_delta)
+            totals['severity_delta'] += severity_delta
+            totals['severity_abs_delta'] += abs(severity_delta)
+        totals.update(texts=len(texts), batches=1, score_seconds=elapsed)
+
+        with counters.get_lock():
+            for name, value in totals.items():
+                counters[SLOT[name]] += value
+
+
+class ShadowEvaluator:
+    """Compare a candidate model with the live one on a bounded, lossy copy of live traffic"""
+
+    def __init__(self, path, engine='sklearn', queue_size=1000, batch_size=64, max_wait=0.05):
+        self.path = path
+        self.engine = engine
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.started_at = time.time()
+        self.owner_pid = os.getpid()
+
+        # spawn: the worker must not inherit the server's threads, sockets or locks
+        context = multiprocessing.get_context('spawn')
+        self.items = context.Queue(queue_size)
+        self.status = context.Array('c', STATUS_SIZE)
+        set_status(self.status, state="starting")
+        self.counters = context.Array('d', len(COUNTERS))
+        self.process = context.Process(
+            target=shadow_worker, name="shadow-eval", daemon=True,
+            args=(path, engine, self.items, self.status, self.counters, batch_size, max_wait))
+        self.process.start()
+
+    @classmethod
+    def from_env(cls, path, engine):
+        return cls(path, engine,
+                   queue_size=int(os.environ.get('ML_SHADOW_QUEUE_SIZE', '1000')),
+                   batch_size=int(os.environ.get('ML_SHADOW_BATCH_SIZE', '64')),
+                   max_wait=float(os.environ.get('ML_SHADOW_MAX_WAIT_MS', '50')) / 1000)
+
+    def submit(self, processed_texts, results):
+        """Queue one live call's texts and predictions; drops it if the queue is full"""
+        texts, live = [], []
+        for text, result in zip(processed_texts, results):
+            # Keyword fallback answers have no model prediction to compare with
+            if result is not None and 'original_category' in result:
+                texts.append(text)
+                live.append((result['original_category'], result['severity'],
+                             result['category_confidence'], result['severity_confidence']))
+        if not texts:
+            return
+        try:
+            self.items.put_nowait((texts, live))
+            dropped = 0
+        except queue.Full:
+            dropped = 1
+        # Shared, so the totals cover every pre-forked worker that submits
+        with self.counters.get_lock():
+            self.counters[SLOT['submitted']] += 1
+            self.counters[SLOT['dropped']] += dropped
+
+    def stop(self, timeout=5):
+        try:
+            self.items.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        # Don't let process exit wait on items nobody will read
+        self.items.cancel_join_thread()
+
+    def stats(self):
+        state = json.loads(self.status.value or b'{}')
+        # Only the process that started the worker can poll it
+        if os.getpid() == self.owner_pid and state.get("state") == "running" and not self.process.is_alive():
+            state.update(state="exited", exitcode=self.process.exitcode)
+
+        with self.counters.get_lock():
+            totals = dict(zip(COUNTERS, self.counters[:]))
+        texts = totals['texts']
+
+        def mean(name):
+            return round(totals[name] / texts, 4) if texts else None
+
+        try:
+            depth = self.items.qsize()
+        except NotImplementedError:  # macOS
+            depth = None
+        return {
+            **state,
+            "candidate": self.path,
+            "engine": self.engine,
+            "started_at": self.started_at,
+            "calls_submitted": int(totals['submitted']),
+            "calls_dropped": int(totals['dropped']),
+            "queue_depth": depth,
+            "queue_size": self.queue_size,
+            "texts_scored": int(texts),
+            "batches": int(totals['batches']),
+            "errors": int(totals['errors']),
+            "category_agreement": mean('category_agree'),
+            "severity_agreement": mean('severity_agree'),
+            "both_agreement": mean('both_agree'),
+            "category_confidence_delta": mean('category_delta'),
+            "category_confidence_abs_delta": mean('category_abs_delta'),
+            "severity_confidence_delta": mean('severity_delta'),
+            "severity_confidence_abs_delta": mean('severity_abs_delta'),
+            "mean_batch_ms": round(totals['score_seconds'] * 1000 / totals['batches'], 3)
+            if totals['batches'] else None,
+        }
@@ -0,0 +1,355 @@
+"""In-memory near-duplicate index for complaint descriptions.
+
+Each description is reduced to its set of content words (the same
+``preprocess_text`` output the classifier sees, minus stop words) and
+summarized by a MinHash signature. Signatures are cut into bands and every
+band is hashed into a bucket key (locality-sensitive hashing): two complaints
+whose word sets overlap by Jaccard similarity ``s`` share at least one bucket
+with probability ``1 - (1 - s**rows)**bands``, so a query only looks at the
+handful of complaints in its own buckets instead of scanning everything.
+Candidates are ranked by the Jaccard similarity their signatures estimate.
+
+Complaints with coordinates also get a geohash cell. A query with coordinates
+only returns complaints in its own cell or one of the 8 cells around it, which
+is how "the same broken streetlight" is told apart from a broken streetlight
+across town.
+
+Bucket tables are sorted numpy arrays searched with ``searchsorted``; inserts
+go to a small dict and are merged into the arrays in bulk every
+``merge_every`` inserts, so memory stays around 200 bytes per complaint for
+the default 48 hash functions.
+"""
+import threading
+import zlib
+
+import numpy as np
+
+from export_reader import has_location, iter_records
+
+# Words that say nothing about which incident a complaint is about
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be been before being below between both but
+by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my near no nor not now of off on once
+only or other our out over own please same she should so some such than that the their them then there
+these they this those through to too under until up very was we were what when where which while who
+why will with would you your
+""".split())
+
+GEOHASH_BITS_PER_CHAR = 5
+
+
+def tokenize(processed_text):
+    """Distinct content words of an already preprocessed (lowercased, alphanumeric) text"""
+    words = set()
+    for word in processed_text.split():
+        if len(word) < 2 or word in STOP_WORDS:
+            continue
+        # Fold simple plurals so "lights" and "light" are the same word
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+def geohash_cell(latitude, longitude, precision):
+    """Geohash of a point as an integer (``precision`` base-32 characters, interleaved lon/lat bits)"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    cell = 0
+    for bit in range(precision * GEOHASH_BITS_PER_CHAR):
+        value, bounds = (longitude, lon_range) if bit % 2 == 0 else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            cell = (cell << 1) | 1
+            bounds[0] = middle
+        else:
+            cell <<= 1
+            bounds[1] = middle
+    return cell
+
+
+def geohash_cell_size(precision):
+    """(latitude, longitude) degrees spanned by one cell"""
+    bits = precision * GEOHASH_BITS_PER_CHAR
+    lon_bits = (bits + 1) // 2
+    return 180.0 / (1 << (bits - lon_bits)), 360.0 / (1 << lon_bits)
+
+
+def neighbor_cells(latitude, longitude, precision):
+    """The point's cell and the 8 cells around it"""
+    lat_step, lon_step = geohash_cell_size(precision)
+    cells = set()
+    for dlat in (-lat_step, 0.0, lat_step):
+        for dlon in (-lon_step, 0.0, lon_step):
+            lat = min(max(latitude + dlat, -90.0), 90.0)
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_cell(lat, lon, precision))
+    return cells
+
+
+class BandTable:
+    """bucket key -> row ids for one LSH band: sorted arrays plus a dict of recent inserts"""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.rows = np.empty(0, dtype=np.uint32)
+        self.recent = {}
+
+    def bulk_load(self, keys, rows):
+        keys = np.concatenate([self.keys, keys])
+        rows = np.concatenate([self.rows, rows.astype(np.uint32)])
+        order = np.argsort(keys, kind='stable')
+        self.keys, self.rows = keys[order], rows[order]
+
+    def insert(self, key, row):
+        self.recent.setdefault(key, []).append(row)
+
+    def merge(self):
+        if not self.recent:
+            return
+        keys = np.fromiter((key for key, rows in self.recent.items() for _ in rows), dtype=np.uint64)
+        rows = np.fromiter((row for rows in self.recent.values() for row in rows), dtype=np.uint32)
+        self.recent = {}
+        self.bulk_load(keys, rows)
+
+    def lookup(self, key):
+        start = np.searchsorted(self.keys, key, side='left')
+        end = np.searchsorted(self.keys, key, side='right')
+        found = self.rows[start:end]
+        recent = self.recent.get(int(key))
+        if recent:
+            found = np.concatenate([found, np.asarray(recent, dtype=np.uint32)])
+        return found
+
+
+class SimilarityIndex:
+    """MinHash LSH index of complaint descriptions with optional geohash filtering"""
+
+    def __init__(self, num_perm=48, bands=12, geohash_precision=6, max_candidates=5000,
+                 merge_every=10000, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.geohash_precision = geohash_precision
+        self.max_candidates = max_candidates
+        self.merge_every = merge_every
+
+        # Multiply-shift hashing: h(x) = ((a * x + b) mod 2**64) >> 32 with odd a
+        rng = np.random.default_rng(seed)
+        self.hash_a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.hash_b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.band_mix = rng.integers(0, 2 ** 63, self.rows_per_band, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+        self.ids = []
+        # Complaint id -> its current row; rows of replaced complaints stay behind, marked not live
+        self.rows = {}
+        self.live = np.zeros(1024, dtype=bool)
+        self.signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self.cells = np.empty(1024, dtype=np.int64)
+        self.tables = [BandTable() for _ in range(bands)]
+        self.pending = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def signature(self, words):
+        """MinHash signature of a word set, or None if it has no words"""
+        if not words:
+            return None
+        tokens = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+        with np.errstate(over='ignore'):
+            hashed = (tokens[:, None] * self.hash_a + self.hash_b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signatures):
+        """One uint64 bucket key per (row, band) for a 2-d array of signatures"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        with np.errstate(over='ignore'):
+            keys = (bands * self.band_mix).sum(axis=2, dtype=np.uint64)
+            # Mix in the band number so equal rows in different bands never collide
+            keys ^= np.arange(self.bands, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        return keys
+
+    def cell(self, latitude, longitude):
+        if not has_location(latitude, longitude):
+            return -1
+        return geohash_cell(float(latitude), float(longitude), self.geohash_precision)
+
+    def reserve(self, size):
+        if size <= len(self.signatures):
+            return
+        capacity = max(size, 2 * len(self.signatures))
+        signatures = np.empty((capacity, self.num_perm), dtype=np.uint32)
+        signatures[:len(self.ids)] = self.signatures[:len(self.ids)]
+        cells = np.empty(capacity, dtype=np.int64)
+        cells[:len(self.ids)] = self.cells[:len(self.ids)]
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self.ids)] = self.live[:len(self.ids)]
+        self.signatures, self.cells, self.live = signatures, cells, live
+
+    def forget(self, complaint_id):
+        """Retire the complaint's current row, if it has one; call with the lock held"""
+        row = self.rows.pop(complaint_id, None)
+        if row is not None:
+            self.live[row] = False
+
+    def add(self, complaint_id, processed_text, latitude=None, longitude=None):
+        """Index one complaint, replacing any earlier entry with the same id.
+
+        Returns False, and drops the earlier entry, if the description has no content words.
+        """
+        complaint_id = str(complaint_id)
+        signature = self.signature(tokenize(processed_text))
+        with self.lock:
+            self.forget(complaint_id)
+            if signature is None:
+                return False
+
+            keys = self.band_keys(signature[None, :])[0]
+            row = len(self.ids)
+            self.reserve(row + 1)
+            self.signatures[row] = signature
+            self.cells[row] = self.cell(latitude, longitude)
+            self.live[row] = True
+            self.rows[complaint_id] = row
+            self.ids.append(complaint_id)
+            for table, key in zip(self.tables, keys):
+                table.insert(int(key), row)
+
+            self.pending += 1
+            if self.pending >= self.merge_every:
+                for table in self.tables:
+                    table.merge()
+                self.pending = 0
+        return True
+
+    def add_many(self, records, chunksize=50000):
+        """Bulk-index (complaint_id, processed_text, latitude, longitude) tuples; returns how many were indexed.
+
+        Signatures are stored chunk by chunk, but the bucket tables are sorted
+        only once at the end. As with ``add``, a repeated id replaces the
+        earlier entry.
+        """
+        with self.lock:
+            start = len(self.ids)
+            band_keys = []
+            ids, signatures, cells = [], [], []
+            for position, (complaint_id, processed_text, latitude, longitude) in enumerate(records, 1):
+                complaint_id = str(complaint_id)
+                signature = self.signature(tokenize(processed_text))
+                if signature is not None:
+                    ids.append(complaint_id)
+                    signatures.append(signature)
+                    cells.append(self.cell(latitude, longitude))
+                else:
+                    self.forget(complaint_id)
+                if ids and (len(ids) == chunksize or position % chunksize == 0):
+                    band_keys.append(self.append_rows(ids, signatures, cells))
+                    ids, signatures, cells = [], [], []
+            if ids:
+                band_keys.append(self.append_rows(ids, signatures, cells))
+            if not band_keys:
+                return 0
+
+            keys = np.concatenate(band_keys)
+            rows = np.arange(start, len(self.ids))
+            for band, table in enumerate(self.tables):
+                table.merge()
+                table.bulk_load(keys[:, band], rows)
+            self.pending = 0
+            return int(np.count_nonzero(self.live[start:len(self.ids)]))
+
+    def append_rows(self, ids, signatures, cells):
+        """Store a chunk of signatures and return its bucket keys"""
+        start = len(self.ids)
+        signatures = np.vstack(signatures)
+        self.reserve(start + len(ids))
+        self.signatures[start:start + len(ids)] = signatures
+        self.cells[start:start + len(ids)] = cells
+        for row, complaint_id in enumerate(ids, start):
+            self.forget(complaint_id)
+            self.live[row] = True
+            self.rows[complaint_id] = row
+        self.ids.extend(ids)
+        return self.band_keys(signatures)
+
+    def query(self, processed_text, k=5, latitude=None, longitude=None, min_similarity=0.3, exclude_id=None):
+        """Top-k indexed complaints most similar to the text, best first.
+
+        Returns dicts with ``id`` and estimated Jaccard ``similarity``. With
+        coordinates, only complaints in the same or a neighboring geohash cell
+        are considered.
+        """
+        signature = self.signature(tokenize(processed_text))
+        if signature is None:
+            return []
+        keys = self.band_keys(signature[None, :])[0]
+
+        with self.lock:
+            candidates, shared_bands = np.unique(
+                np.concatenate([table.lookup(key) for table, key in zip(self.tables, keys)]), return_counts=True)
+            current = self.live[candidates]
+            candidates, shared_bands = candidates[current], shared_bands[current]
+            if has_location(latitude, longitude):
+                cells = neighbor_cells(float(latitude), float(longitude), self.geohash_precision)
+                nearby = np.isin(self.cells[candidates], list(cells))
+                candidates, shared_bands = candidates[nearby], shared_bands[nearby]
+            if len(candidates) > self.max_candidates:
+                # Complaints sharing more buckets with the query are the likelier duplicates
+                candidates = candidates[np.argsort(-shared_bands, kind='stable')[:self.max_candidates]]
+            similarity = (self.signatures[candidates] == signature).mean(axis=1)
+            ids = self.ids
+
+        if exclude_id is not None:
+            exclude_id = str(exclude_id)
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.argsort(-similarity, kind='stable')
+
+        matches = []
+        for position in order:
+            complaint_id = ids[candidates[position]]
+            if exclude_id is not None and complaint_id == exclude_id:
+                continue
+            matches.append({"id": complaint_id, "similarity": round(float(similarity[position]), 3)})
+            if len(matches) == k:
+                break
+        return matches
+
+    def stats(self):
+        return {
+            "indexed": len(self),
+            "located": int(np.count_nonzero((self.cells[:len(self.ids)] >= 0) & self.live[:len(self.ids)])),
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "geohash_precision": self.geohash_precision,
+        }
+
+
+def iter_complaints(path):
+    """Yield (id, description, latitude, longitude) from a CSV or JSON Lines complaint export.
+
+    Accepts ``mongoexport`` output: ``_id`` may be a plain string or ``{"$oid": ...}``.
+    """
+    for record in iter_records(path):
+        complaint_id = record.get('_id', record.get('id'))
+        if isinstance(complaint_id, dict):
+            complaint_id = complaint_id.get('$oid')
+        description = record.get('description') or ''
+        latitude, longitude = record.get('latitude'), record.get('longitude')
+        yield (str(complaint_id), description,
+               float(latitude) if latitude not in (None, '') else None,
+               float(longitude) if longitude not in (None, '') else None)
+
+
+def build_index(path, preprocess, **index_params):
+    """Bulk-build an index from a complaint export; ``preprocess`` is the server's text preprocessing"""
+    index = SimilarityIndex(**index_params)
+    records = ((complaint_id, preprocess(description), latitude, longitude)
+               for complaint_id, description, latitude, longitude in iter_complaints(path))
+    index.add_many(records)
+    return index
@@ -1,63 +1,394 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import asyncio
+import gc
 import json
-import joblib
-import numpy as np
 import re
 import traceback
 import logging
 import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from cascade import FAST_STAGE, CascadeModel
+from hotspot_index import HotspotIndex, build_index as build_hotspot_index, parse_bbox, prediction_labels
+from inference import CompiledModel, model_file_version
+from json_encoding import ENCODER as JSON_ENCODER, dumps as encode_json, error_body
+from prediction_cache import PredictionCache
+from request_profiler import PROFILE_MODES, RequestProfiler
+from routing_table import DEFAULT_ROUTING_PATH, UNROUTED, CompiledRoutes, RoutingRules
+from keyword_engine import DEFAULT_RULES_PATH, KeywordEngine
+from metrics import BATCH_SIZE_BUCKETS, MetricsRegistry, RateLimitedLog
+from micro_batching import AsyncHTTPFrontend, MicroBatcher, parse_content_length
+from numpy_engine import NumpyModel
+from serving_artifact import is_serving_artifact, load_model_data
+from shadow_eval import ShadowEvaluator
+from similarity_index import SimilarityIndex, build_index
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Global variables
-model_data = None
-model_loaded = False
+MODEL_PATH = os.environ.get('ML_MODEL_PATH', 'text_model.joblib')
+
+# 'sklearn' runs the unpickled pipelines; 'numpy' serves a serving artifact
+# without importing scikit-learn at all
+ENGINES = ('sklearn', 'numpy')
+ENGINE = os.environ.get('ML_ENGINE', 'sklearn')
+
+# Optional cheap first-stage model (train_tfidf.py --fast-model). Texts it scores
+# at or above the threshold for both category and severity skip the full pipelines.
+CASCADE_MODEL_PATH = os.environ.get('ML_CASCADE_MODEL')
+CASCADE_THRESHOLD = float(os.environ.get('ML_CASCADE_THRESHOLD', '0.7'))
+
+# The serving model. Swapped with a single assignment on reload; every request
+# reads it once up front, so in-flight requests finish on the model they started with.
+active_model = None
+
+# Serializes reloads and records how the last one went for /health
+reload_lock = threading.Lock()
+last_reload = {"status": "never", "at": None, "error": None}
+
+# Set in pre-forked workers so a reload request can be fanned out by the parent
+prefork_parent_pid = None
+
+# Optional shared secret for /admin endpoints (sent as X-Admin-Token)
+ADMIN_TOKEN = os.environ.get('ML_ADMIN_TOKEN')
+
+# Results keyed on (model_version, preprocessed text); sized by ML_CACHE_SIZE / ML_CACHE_TTL
+prediction_cache = PredictionCache.from_env()
+
+# Weighted keyword tables for the fallback path, compiled into one automaton at
+# startup and again on every model reload
+KEYWORD_RULES_PATH = os.environ.get('ML_KEYWORD_RULES', DEFAULT_RULES_PATH)
+keyword_engine = None
+
+# Model label -> hazard type, department and escalation level, checked against the
+# Complaint schema's enums (ML_COMPLAINT_SCHEMA) and compiled into every loaded model.
+# Reloaded with the model.
+ROUTING_RULES_PATH = os.environ.get('ML_ROUTING_RULES', DEFAULT_ROUTING_PATH)
+COMPLAINT_SCHEMA_PATH = os.environ.get('ML_COMPLAINT_SCHEMA')
+routing_rules = None
+
+# Near-duplicate index behind /similar: bulk-built at startup from a complaint
+# export (CSV or JSON Lines, e.g. mongoexport of the complaints collection) if
+# ML_SIMILARITY_INDEX is set, then grown with POST /similar/add. Per process.
+SIMILARITY_INDEX_PATH = os.environ.get('ML_SIMILARITY_INDEX')
+similarity_index = SimilarityIndex()
+
+# Grid of classified complaint locations behind /hotspots: bulk-built at startup
+# from a complaint export with ml_prediction labels if ML_HOTSPOT_INDEX is set,
+# then grown with POST /hotspots/add. Cell size in degrees: ML_HOTSPOT_CELL_DEG. Per process.
+HOTSPOT_INDEX_PATH = os.environ.get('ML_HOTSPOT_INDEX')
+HOTSPOT_CELL_SIZE = float(os.environ.get('ML_HOTSPOT_CELL_DEG', '0.01'))
+hotspot_index = HotspotIndex(cell_size=HOTSPOT_CELL_SIZE)
 
-def load_model():
+# Candidate model scored in the background on a lossy copy of live traffic
+# (ML_SHADOW_MODEL, or POST /admin/shadow); compared with the live predictions
+# on GET /admin/shadow. Queue and batch sizes: ML_SHADOW_QUEUE_SIZE / ML_SHADOW_BATCH_SIZE.
+SHADOW_MODEL_PATH = os.environ.get('ML_SHADOW_MODEL')
+shadow_evaluator = None
+
+# Upper bound on descriptions accepted by a single /predict_batch call
+MAX_BATCH_SIZE = int(os.environ.get('ML_MAX_BATCH_SIZE', '1000'))
+
+# Larger request bodies are refused with a 413 before being read
+MAX_BODY_BYTES = int(os.environ.get('ML_MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+
+# Serving modes: one request at a time, a thread per request, forked worker
+# processes, or an asyncio event loop that micro-batches /predict calls
+SERVER_MODES = ('single', 'threaded', 'prefork', 'async')
+
+# Async mode: flush queued /predict calls at this many requests or after this long
+MICRO_BATCH_SIZE = int(os.environ.get('ML_MICRO_BATCH_SIZE', '32'))
+MICRO_BATCH_WAIT_MS = float(os.environ.get('ML_MICRO_BATCH_WAIT_MS', '5'))
+
+# The running MicroBatcher in async mode, for /stats
+micro_batcher = None
+
+# Per-request log lines allowed per second (ML_REQUEST_LOG_RATE; 0 = none, inf = all).
+# Startup, reload and error messages always go to the logger directly.
+request_log = RateLimitedLog(logger, float(os.environ.get('ML_REQUEST_LOG_RATE', '10')))
+
+# Idle seconds a kept-alive connection may wait for its next request. Keep-alive
+# is only offered in threaded and async modes: in single and prefork mode an idle
+# client would hold the whole process (or worker) until the timeout.
+KEEP_ALIVE_TIMEOUT = float(os.environ.get('ML_KEEPALIVE_TIMEOUT', '15'))
+
+# How long browsers may cache a CORS preflight before repeating the OPTIONS request
+CORS_MAX_AGE = int(os.environ.get('ML_CORS_MAX_AGE', '86400'))
+
+# Served in Prometheus text format on GET /metrics (per process in prefork mode)
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    'ml_stage_seconds', "Time spent in each request processing stage (vectorize/classify per model call)",
+    ('stage',))
+REQUEST_SECONDS = metrics.histogram(
+    'ml_request_seconds', "Request handling time by endpoint and status code", ('endpoint', 'status'))
+MODEL_BATCH_ROWS = metrics.histogram(
+    'ml_model_batch_rows', "Texts scored per model call", buckets=BATCH_SIZE_BUCKETS)
+PREDICTIONS = metrics.counter(
+    'ml_predictions_total', "Predictions served by method (ml_fast_model, ml_model, keyword_fallback) and source",
+    ('method', 'source'))
+metrics.callback('ml_cache_hits_total', "Prediction cache hits", 'counter',
+                 lambda: prediction_cache.stats()['hits'])
+metrics.callback('ml_cache_misses_total', "Prediction cache misses", 'counter',
+                 lambda: prediction_cache.stats()['misses'])
+metrics.callback('ml_model_loaded', "1 if a model is serving, 0 in fallback mode", 'gauge',
+                 lambda: int(active_model is not None))
+
+# Request paths reported as their own endpoint label; anything else is 'other'
+METRIC_ENDPOINTS = ('/predict', '/predict_batch', '/similar', '/similar/add', '/hotspots', '/hotspots/summary',
+                    '/hotspots/add', '/health', '/stats', '/metrics', '/admin/reload', '/admin/profile',
+                    '/admin/shadow')
+
+# Opt-in: profiles ML_PROFILE_RATE of POST requests (and async-mode micro-batches),
+# served on GET /admin/profile. Per process, like the metrics.
+request_profiler = RequestProfiler.from_env()
+
+def endpoint_label(path):
+    path = path.split('?', 1)[0]
+    return path if path in METRIC_ENDPOINTS else 'other'
+
+def observe_stage(stage, start):
+    """Record the time since `start` for a stage and return the current time"""
+    now = time.perf_counter()
+    STAGE_SECONDS.observe(now - start, stage)
+    return now
+
+def open_model(model_path):
+    """Open a model file or serving artifact with the configured engine"""
+    if ENGINE == 'numpy':
+        if not is_serving_artifact(model_path):
+            raise ValueError(f"The numpy engine needs a serving artifact directory, got {model_path}")
+        return NumpyModel(model_path)
+    
+    # Raises ValueError if any required component is missing
+    return CompiledModel(load_model_data(model_path), version=model_file_version(model_path))
+
+def build_model(model_path):
+    """Load and validate a model file or serving artifact without touching the serving model"""
+    model = open_model(model_path)
+    if CASCADE_MODEL_PATH:
+        # The hashed first stage has no serving artifact form, so it always runs on sklearn
+        fast = CompiledModel(load_model_data(CASCADE_MODEL_PATH), version=model_file_version(CASCADE_MODEL_PATH))
+        model = CascadeModel(fast, model, CASCADE_THRESHOLD)
+    
+    # Routes travel with the model, so a reload swaps both at once. A routing
+    # config error must not take the model down: predictions then carry no department.
+    rules = routing_rules
+    if rules is None:
+        logger.warning(f"⚠️  No valid routing rules from {ROUTING_RULES_PATH}, serving predictions without departments")
+        model.routes = CompiledRoutes.unrouted(model.category_names)
+    else:
+        model.routes = rules.compile(model.category_names)
+        unrouted = rules.unrouted(model.category_classes)
+        if unrouted:
+            logger.warning(f"⚠️  No route for labels {unrouted}, using '{rules.default_hazard}'")
+    
+    # Smoke prediction, so a model that loads but cannot predict is never swapped in
+    test_text = "pothole on road"
+    prediction = model.predict([test_text])
+    logger.info(f"🧪 Model test - '{test_text}' -> {prediction['category'][0]} ({prediction['severity'][0]})")
+    
+    return model
+
+def load_model(model_path=None):
     """Load the comprehensive model with both category and severity classifiers"""
-    global model_data, model_loaded
+    global active_model
     
-    model_path = 'text_model.joblib'
+    model_path = model_path or MODEL_PATH
     
     if not os.path.exists(model_path):
         logger.error(f"❌ Model file not found: {model_path}")
         return False
     
     try:
-        logger.info("🔄 Loading comprehensive model...")
-        model_data = joblib.load(model_path)
-        
-        # Check if all required components are present
-        required_components = ['category_pipeline', 'severity_pipeline', 'label_encoder', 'severity_encoder']
-        missing_components = [comp for comp in required_components if comp not in model_data]
-        
-        if missing_components:
-            logger.error(f"❌ Missing components: {missing_components}")
-            return False
-        
-        model_loaded = True
-        logger.info("✅ Comprehensive model loaded successfully!")
-        logger.info(f"   - Category classes: {list(model_data['label_encoder'].classes_)}")
-        logger.info(f"   - Severity levels: {list(model_data['severity_encoder'].classes_)}")
-        
-        # Test the model
-        test_text = "pothole on road"
-        category_pred = model_data['category_pipeline'].predict([test_text])[0]
-        severity_pred = model_data['severity_pipeline'].predict([test_text])[0]
-        
-        category_name = model_data['label_encoder'].inverse_transform([category_pred])[0]
-        severity_name = model_data['severity_encoder'].inverse_transform([severity_pred])[0]
-        
-        logger.info(f"🧪 Model test - '{test_text}' -> {category_name} ({severity_name})")
-        
-        return True
+        logger.info(f"🔄 Loading comprehensive model from {model_path}...")
+        model = build_model(model_path)
         
     except Exception as e:
         logger.error(f"❌ Error loading model: {e}")
         logger.error(traceback.format_exc())
         return False
+    
+    previous = active_model
+    active_model = model
+    if previous is None or previous.version != model.version or \
+            previous.routes.fingerprint != model.routes.fingerprint:
+        prediction_cache.clear()
+    
+    logger.info("✅ Comprehensive model loaded successfully!")
+    logger.info(f"   - Category classes: {model.category_classes}")
+    logger.info(f"   - Severity levels: {model.severity_classes}")
+    logger.info(f"   - Engine: {model.engine} (shared tokenization: {model.shares_tokenization})")
+    logger.info(f"   - Model version: {model.version}")
+    
+    return True
+
+def load_keyword_engine(rules_path=None):
+    """Compile the keyword rules file; the previous rules stay active if it fails"""
+    global keyword_engine
+    
+    rules_path = rules_path or KEYWORD_RULES_PATH
+    try:
+        engine = KeywordEngine.from_file(rules_path)
+    except Exception as e:
+        logger.error(f"❌ Error loading keyword rules from {rules_path}: {e}")
+        return False
+    
+    keyword_engine = engine
+    logger.info(f"🔤 Keyword rules loaded: {engine.n_rules} rules, {engine.automaton.n_states} automaton states")
+    return True
+
+def load_routing_rules(rules_path=None):
+    """Load and validate the routing rules; the previous rules stay active if they fail"""
+    global routing_rules
+    
+    rules_path = rules_path or ROUTING_RULES_PATH
+    try:
+        rules = RoutingRules.from_file(rules_path, COMPLAINT_SCHEMA_PATH)
+    except Exception as e:
+        logger.error(f"❌ Error loading routing rules from {rules_path}: {e}")
+        return False
+    
+    routing_rules = rules
+    logger.info(f"🧭 Routing rules loaded: {len(rules.label_routes)} labels, {len(rules.hazard_routes)} hazard types "
+                f"(departments checked against {rules.schema})")
+    return True
+
+def load_similarity_index(export_path=None):
+    """Bulk-build the near-duplicate index from a complaint export; keeps the current index if it fails"""
+    global similarity_index
+    
+    export_path = export_path or SIMILARITY_INDEX_PATH
+    if not export_path:
+        return False
+    
+    try:
+        start = time.perf_counter()
+        index = build_index(export_path, preprocess_text)
+    except Exception as e:
+        logger.error(f"❌ Error building similarity index from {export_path}: {e}")
+        return False
+    
+    similarity_index = index
+    logger.info(f"🔎 Similarity index built: {len(index)} complaints in {time.perf_counter() - start:.1f}s")
+    return True
+
+def load_hotspot_index(export_path=None):
+    """Bulk-build the hotspot grid from a complaint export; keeps the current grid if it fails"""
+    global hotspot_index
+    
+    export_path = export_path or HOTSPOT_INDEX_PATH
+    if not export_path:
+        return False
+    
+    try:
+        start = time.perf_counter()
+        index = build_hotspot_index(export_path, cell_size=HOTSPOT_CELL_SIZE)
+    except Exception as e:
+        logger.error(f"❌ Error building hotspot index from {export_path}: {e}")
+        return False
+    
+    hotspot_index = index
+    logger.info(f"🗺️  Hotspot index built: {len(index)} complaints in {index.stats()['cells']} cells "
+                f"in {time.perf_counter() - start:.1f}s")
+    return True
+
+def start_shadow(model_path, engine=None):
+    """Start shadow-scoring a candidate model, replacing any current one; None just stops it"""
+    global shadow_evaluator
+    
+    previous = shadow_evaluator
+    shadow_evaluator = None
+    if previous is not None:
+        previous.stop()
+        logger.info(f"👥 Stopped shadow evaluation of {previous.path}")
+    if not model_path:
+        return None
+    
+    shadow_evaluator = ShadowEvaluator.from_env(model_path, engine or ENGINE)
+    logger.info(f"👥 Shadow-evaluating {model_path} against live traffic (GET /admin/shadow)")
+    return shadow_evaluator
+
+def reload_model():
+    """Load the model file again and swap it in if it validates; the old model keeps serving otherwise"""
+    if not reload_lock.acquire(blocking=False):
+        logger.info("🔁 Reload already in progress, skipping")
+        return False
+    
+    try:
+        previous_version = active_model.version if active_model else None
+        load_keyword_engine()
+        load_routing_rules()
+        ok = load_model()
+        last_reload.update(
+            status="ok" if ok else "failed",
+            at=time.time(),
+            error=None if ok else "model failed to load or validate, see server log"
+        )
+        if ok:
+            logger.info(f"🔁 Model reloaded: {previous_version} -> {active_model.version}")
+        return ok
+    finally:
+        reload_lock.release()
+
+def reload_model_async():
+    """Run reload_model on a background thread so requests keep being served"""
+    if prefork_parent_pid is not None:
+        # Ask the parent to signal every worker, not just the one handling this request
+        os.kill(prefork_parent_pid, signal.SIGHUP)
+        return None
+    
+    thread = threading.Thread(target=reload_model, name="model-reload", daemon=True)
+    thread.start()
+    return thread
+
+def settled_mtime(model_path, last_seen, interval):
+    """The model file's new mtime once it has stopped changing; None if unchanged, still being written or missing"""
+    try:
+        mtime = os.stat(model_path).st_mtime
+        if mtime == last_seen:
+            return None
+        # Wait one more interval so we don't load a half-written file
+        time.sleep(interval)
+        if os.stat(model_path).st_mtime != mtime:
+            return None
+    except OSError:
+        # Gone for now: mid rename swap (serving_export.py) or an rm + cp deploy
+        return None
+    return mtime
+
+def watch_model_file(model_path, interval, on_change):
+    """Poll the model file's mtime and call on_change once a new file has settled"""
+    def watch():
+        try:
+            last_seen = os.stat(model_path).st_mtime
+        except OSError:
+            last_seen = None
+        while True:
+            time.sleep(interval)
+            mtime = settled_mtime(model_path, last_seen, interval)
+            if mtime is None:
+                continue
+            last_seen = mtime
+            logger.info(f"👀 {model_path} changed on disk")
+            try:
+                on_change()
+            except Exception as e:
+                # Keep watching: the next change gets another chance
+                logger.error(f"❌ Reload after {model_path} changed failed: {e}")
+    
+    thread = threading.Thread(target=watch, name="model-watcher", daemon=True)
+    thread.start()
+    return thread
 
 def preprocess_text(text):
     """Preprocess the complaint description text"""
@@ -70,232 +401,940 @@ def preprocess_text(text):
     
     return text
 
+def validate_description(description):
+    """Return an error message for an unusable description, or None if it is valid"""
+    if not isinstance(description, str):
+        return "Description must be a string"
+    
+    if not description:
+        return "Description is required"
+    
+    if len(description.strip()) < 5:
+        return "Description too short (min 5 characters)"
+    
+    return None
+
+def decode_json_body(body, expect_object=True):
+    """Parse a JSON request body; ValueError with a message for the client if it is unusable"""
+    try:
+        data = json.loads(body.decode('utf-8'))
+    except ValueError:  # JSONDecodeError and UnicodeDecodeError
+        raise ValueError("Request body is not valid JSON") from None
+    if expect_object and not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return data
+
+def batch_ml_prediction(model, processed_texts, original_texts):
+    """Predict a batch with one TF-IDF transform per pipeline, falling back per item on failure"""
+    if not processed_texts:
+        return []
+    
+    # Serve what we can from the cache and only vectorize the misses
+    keys = [PredictionCache.make_key(model.version, text) for text in processed_texts]
+    results = [prediction_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    for result in results:
+        if result is not None:
+            PREDICTIONS.inc(result['method'], 'cache')
+    if not missing:
+        shadow_copy(processed_texts, results)
+        return results
+    
+    timings = {}
+    try:
+        prediction = model.predict([processed_texts[i] for i in missing], timings)
+    except Exception as e:
+        logger.error(f"Batch ML prediction failed: {e}")
+        logger.error(traceback.format_exc())
+        for i in missing:
+            results[i] = fallback_prediction(original_texts[i])
+        return results
+    
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage)
+    MODEL_BATCH_ROWS.observe(len(missing))
+    
+    # Only a cascade reports which stage answered each row
+    stages = prediction.get('stage')
+    fast_rows = 0 if stages is None else int(np.count_nonzero(stages == FAST_STAGE))
+    if fast_rows:
+        PREDICTIONS.inc('ml_fast_model', 'model', amount=fast_rows)
+    if fast_rows < len(missing):
+        PREDICTIONS.inc('ml_model', 'model', amount=len(missing) - fast_rows)
+    routes = model.routes.lookup(prediction['category_index'])
+    for row, i in enumerate(missing):
+        method = "ml_fast_model" if stages is not None and stages[row] == FAST_STAGE else "ml_model"
+        results[i] = build_ml_result(
+            prediction['category'][row],
+            prediction['severity'][row],
+            float(prediction['category_confidence'][row]),
+            float(prediction['severity_confidence'][row]),
+            routes['hazard_type'][row],
+            routes['department'][row],
+            routes['escalation_level'][row],
+            method
+        )
+        prediction_cache.put(keys[i], results[i])
+    shadow_copy(processed_texts, results)
+    return results
+
+def shadow_copy(processed_texts, results):
+    """Hand live predictions to the shadow evaluator, if one is running; never blocks"""
+    evaluator = shadow_evaluator
+    if evaluator is not None:
+        evaluator.submit(processed_texts, results)
+
+def build_ml_result(category_name, severity_name, category_confidence, severity_confidence,
+                    hazard_type, department, escalation_level, method="ml_model"):
+    """Shape a routed model prediction into the response format the frontend expects"""
+    overall_confidence = (category_confidence + severity_confidence) / 2
+    
+    return {
+        "hazard_type": hazard_type,
+        "department": department,
+        "escalation_level": escalation_level,
+        "severity": severity_name,
+        "confidence": round(overall_confidence, 2),
+        "category_confidence": round(category_confidence, 2),
+        "severity_confidence": round(severity_confidence, 2),
+        "original_category": category_name,
+        "success": True,
+        "method": method
+    }
+
+def fallback_prediction(description):
+    """Fallback prediction if ML model fails: score the description against the keyword rules"""
+    request_log.info("⚠️ Using fallback keyword prediction")
+    PREDICTIONS.inc('keyword_fallback', 'keywords')
+    
+    engine = keyword_engine
+    if engine is None:
+        match = {"hazard_type": "Other", "severity": "medium", "hazard_confidence": 0.0, "keywords": []}
+    else:
+        match = engine.classify(description)
+    
+    rules = routing_rules
+    route = rules.hazard_route(match['hazard_type']) if rules else UNROUTED
+    return {
+        "hazard_type": match['hazard_type'],
+        "department": route['department'],
+        "escalation_level": route['escalation_level'],
+        "severity": match['severity'],
+        "confidence": round(match['hazard_confidence'], 2),
+        "keywords": match['keywords'],
+        "success": True,
+        "method": "keyword_fallback"
+    }
+
 class MLComplaintHandler(BaseHTTPRequestHandler):
     
+    # Every response carries a Content-Length, so HTTP/1.1 clients can reuse the
+    # connection; run_server drops back to HTTP/1.0 in single and prefork mode
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body go out as two writes; with Nagle on, the body of a reused
+    # connection waits for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    
     def do_OPTIONS(self):
-        """Handle CORS preflight requests"""
-        self.send_response(200)
+        """Handle CORS preflight requests; browsers cache the answer for CORS_MAX_AGE seconds"""
+        self.body_read = False
+        self.send_response(204)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Admin-Token')
+        self.send_header('Access-Control-Max-Age', str(CORS_MAX_AGE))
+        self.send_header('Cache-Control', f'public, max-age={CORS_MAX_AGE}')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
         """Handle GET requests"""
+        self.request_started = time.perf_counter()
+        self.body_read = False
         try:
+            model = active_model
             if self.path == '/health':
                 response = {
-                    "status": "healthy" if model_loaded else "degraded",
-                    "model_loaded": model_loaded,
+                    "status": "healthy" if model else "degraded",
+                    "model_loaded": model is not None,
                     "message": "ML Complaint Classification API",
-                    "using_ml_model": model_loaded,
-                    "category_classes": list(model_data['label_encoder'].classes_) if model_loaded else None,
-                    "severity_levels": list(model_data['severity_encoder'].classes_) if model_loaded else None
+                    "using_ml_model": model is not None,
+                    "category_classes": model.category_classes if model else None,
+                    "severity_levels": model.severity_classes if model else None,
+                    "model_version": model.version if model else None,
+                    "model_loaded_at": model.loaded_at if model else None,
+                    "engine": model.engine if model else None,
+                    "cascade_threshold": model.threshold if isinstance(model, CascadeModel) else None,
+                    "last_reload": last_reload,
+                    "keyword_rules": keyword_engine.n_rules if keyword_engine else None,
+                    "routing_rules": routing_rules.fingerprint if routing_rules else None,
+                    "cache": prediction_cache.stats()
                 }
                 self.send_success_response(response)
+            elif self.path == '/stats':
+                self.send_success_response({
+                    "model_version": model.version if model else None,
+                    "cache": prediction_cache.stats(),
+                    "micro_batching": micro_batcher.stats() if micro_batcher else None,
+                    "similarity_index": similarity_index.stats(),
+                    "hotspot_index": hotspot_index.stats(),
+                    "json_encoder": JSON_ENCODER,
+                    "keep_alive": MLComplaintHandler.protocol_version == 'HTTP/1.1',
+                    "pid": os.getpid()
+                })
+            elif urlsplit(self.path).path == '/hotspots':
+                self.handle_hotspots()
+            elif urlsplit(self.path).path == '/hotspots/summary':
+                self.handle_hotspot_summary()
+            elif self.path == '/metrics':
+                self.send_text_response(metrics.render(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif urlsplit(self.path).path == '/admin/profile':
+                self.handle_profile_export()
+            elif self.path == '/admin/shadow':
+                self.handle_shadow_stats()
             else:
-                self.send_response(404)
-                self.end_headers()
+                self.send_not_found()
                 
         except Exception as e:
             logger.error(f"GET request error: {e}")
             self.send_error_response(500, f"Server error: {str(e)}")
     
     def do_POST(self):
+        """Handle POST requests, under the profiler for a sampled fraction of them"""
+        request_profiler.run_request(self.path, self.handle_post)
+    
+    def handle_post(self):
         """Handle POST requests - Uses actual trained ML model"""
+        self.request_started = time.perf_counter()
+        self.body_read = False
         try:
+            model = active_model
             if self.path == '/predict':
-                content_length = int(self.headers.get('Content-Length', 0))
-                if content_length == 0:
-                    self.send_error_response(400, "Empty request body")
+                data = self.read_json_body()
+                if data is None:
                     return
                 
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
                 description = data.get('description', '')
-                
-                logger.info(f"Processing description: {description[:100]}...")
-                
-                # Validate input
-                if not description:
-                    self.send_error_response(400, "Description is required")
+                error = validate_description(description)
+                if error:
+                    self.send_error_response(400, error)
                     return
                 
-                if len(description.strip()) < 5:
-                    self.send_error_response(400, "Description too short (min 5 characters)")
-                    return
+                request_log.info(f"Processing description: {description[:100]}...")
                 
                 # Preprocess text
+                stage_start = time.perf_counter()
                 processed_text = preprocess_text(description)
+                observe_stage('preprocess', stage_start)
                 
                 # Make prediction using ACTUAL ML model
-                if model_loaded:
-                    result = self.ml_prediction(processed_text, description)
+                if model is not None:
+                    result = self.ml_prediction(model, processed_text, description)
                 else:
-                    result = self.fallback_prediction(description)
+                    result = fallback_prediction(description)
                 
-                logger.info(f"✅ Prediction result: {result['hazard_type']} ({result['severity']})")
+                request_log.info(f"✅ Prediction result: {result['hazard_type']} ({result['severity']})")
                 self.send_success_response(result)
                 
+            elif self.path == '/predict_batch':
+                self.handle_predict_batch(model)
+                
+            elif self.path == '/similar':
+                self.handle_similar()
+                
+            elif self.path == '/similar/add':
+                self.handle_similar_add()
+                
+            elif self.path == '/hotspots/add':
+                self.handle_hotspot_add()
+                
+            elif self.path == '/admin/reload':
+                self.handle_reload()
+                
+            elif self.path == '/admin/profile':
+                self.handle_profile_config()
+                
+            elif self.path == '/admin/shadow':
+                self.handle_shadow_config()
+                
             else:
-                self.send_response(404)
-                self.end_headers()
+                self.send_not_found()
                 
         except Exception as e:
             logger.error(f"POST request error: {e}")
             logger.error(traceback.format_exc())
             self.send_error_response(500, f"Internal server error: {str(e)}")
     
-    def ml_prediction(self, processed_text, original_text):
-        """Make prediction using the trained ML model"""
+    def is_admin_authorized(self):
+        """Admin endpoints are open unless ML_ADMIN_TOKEN is set"""
+        return ADMIN_TOKEN is None or self.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    
+    def handle_reload(self):
+        """Start a background model reload; the current model keeps serving meanwhile"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        if reload_lock.locked():
+            self.send_error_response(409, "Reload already in progress")
+            return
+        
+        model = active_model
+        reload_model_async()
+        self.send_success_response({
+            "message": "Reload started",
+            "current_version": model.version if model else None,
+            "success": True
+        }, code=202)
+    
+    def handle_profile_export(self):
+        """Aggregated profile: ?format=text|pstats|collapsed&window=last|current"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        query = parse_qs(urlsplit(self.path).query)
+        output_format = query.get('format', ['text'])[0]
+        if output_format == 'stats':
+            self.send_success_response(request_profiler.stats())
+            return
         try:
-            logger.info("🤖 Using trained ML model for prediction...")
-            
-            # Get category prediction
-            category_pred = model_data['category_pipeline'].predict([processed_text])[0]
-            category_name = model_data['label_encoder'].inverse_transform([category_pred])[0]
-            
-            # Get severity prediction
-            severity_pred = model_data['severity_pipeline'].predict([processed_text])[0]
-            severity_name = model_data['severity_encoder'].inverse_transform([severity_pred])[0]
-            
-            # Get confidence scores
-            category_proba = model_data['category_pipeline'].predict_proba([processed_text])[0]
-            severity_proba = model_data['severity_pipeline'].predict_proba([processed_text])[0]
-            
-            category_confidence = float(np.max(category_proba))
-            severity_confidence = float(np.max(severity_proba))
-            overall_confidence = (category_confidence + severity_confidence) / 2
-            
-            # Convert category names to match your frontend
-            hazard_type = self.map_category_to_frontend(category_name)
-            
-            return {
-                "hazard_type": hazard_type,
-                "severity": severity_name,
-                "confidence": round(overall_confidence, 2),
-                "category_confidence": round(category_confidence, 2),
-                "severity_confidence": round(severity_confidence, 2),
-                "original_category": category_name,
-                "success": True,
-                "method": "ml_model"
-            }
-            
-        except Exception as e:
-            logger.error(f"ML prediction failed: {e}")
-            logger.error(traceback.format_exc())
-            return self.fallback_prediction(original_text)
-    
-    def map_category_to_frontend(self, category_name):
-        """Map your model's category names to frontend hazard types"""
-        category_mapping = {
-            'road_damage': 'Potholes',
-            'safety_hazard': 'Electrical Hazards', 
-            'sanitation': 'Garbage Collection',
-            'water_issue': 'Water Supply',
-            'sewage': 'Sewage & Drainage',
-            'street_lights': 'Street Lights',
-            'noise': 'Noise Pollution',
-            'construction': 'Illegal Construction',
-            'public_safety': 'Public Safety',
-            'other': 'Other'
-            # Add any other categories that exist in your dataset
-        }
-        
-        return category_mapping.get(category_name, 'Other')
-    
-    def fallback_prediction(self, description):
-        """Fallback prediction if ML model fails"""
-        logger.info("⚠️ Using fallback keyword prediction")
-        description_lower = description.lower()
-        
-        hazard_keywords = {
-            "pothole": "Potholes",
-            "road damage": "Road Damage",
-            "road broken": "Road Damage",
-            "electrical": "Electrical Hazards",
-            "electric": "Electrical Hazards",
-            "wire": "Electrical Hazards",
-            "water": "Water Supply",
-            "sewage": "Sewage & Drainage",
-            "drain": "Sewage & Drainage",
-            "garbage": "Garbage Collection",
-            "trash": "Garbage Collection"
-        }
-        
-        severity_keywords = {
-            "critical": "critical",
-            "emergency": "critical", 
-            "urgent": "high",
-            "danger": "high",
-            "dangerous": "high"
-        }
-        
-        detected_hazard = "Other"
-        detected_severity = "medium"
-        
-        for keyword, hazard in hazard_keywords.items():
-            if keyword in description_lower:
-                detected_hazard = hazard
-                break
-        
-        for keyword, severity in severity_keywords.items():
-            if keyword in description_lower:
-                detected_severity = severity
-                break
-        
-        return {
-            "hazard_type": detected_hazard,
-            "severity": detected_severity,
-            "confidence": 0.65,
-            "success": True,
-            "method": "keyword_fallback"
-        }
-    
-    def send_success_response(self, data):
-        """Send successful response"""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+            content_type, body = request_profiler.export(query.get('window', ['last'])[0], output_format)
+        except ValueError as e:
+            self.send_error_response(400, str(e))
+            return
+        self.send_body(200, body, content_type)
+    
+    def handle_profile_config(self):
+        """Turn profiling on or off at runtime: {"rate": 0.05, "mode": "sample"}"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        data = self.read_json_body()
+        if data is None:
+            return
+        
+        mode = data.get('mode')
+        if mode is not None and mode not in PROFILE_MODES:
+            self.send_error_response(400, f"mode must be one of {', '.join(PROFILE_MODES)}")
+            return
+        try:
+            request_profiler.configure(rate=data.get('rate'), mode=mode)
+        except (TypeError, ValueError):
+            self.send_error_response(400, "rate must be a number between 0 and 1")
+            return
+        self.send_success_response({**request_profiler.stats(), "success": True})
+    
+    def handle_shadow_stats(self):
+        """Agreement and confidence deltas of the shadow candidate so far"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        evaluator = shadow_evaluator
+        self.send_success_response({
+            "enabled": evaluator is not None,
+            "live_model_version": active_model.version if active_model else None,
+            **(evaluator.stats() if evaluator is not None else {})
+        })
+    
+    def handle_shadow_config(self):
+        """Start, replace or stop the shadow candidate: {"model": path, "engine": "numpy"} or {"model": null}"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        if prefork_parent_pid is not None:
+            self.send_error_response(409, "Set the shadow model with --shadow-model in prefork mode")
+            return
+        
+        data = self.read_json_body()
+        if data is None:
+            return
+        
+        model_path = data.get('model')
+        engine = data.get('engine')
+        if model_path is not None and not os.path.exists(model_path):
+            self.send_error_response(400, f"Candidate model not found: {model_path}")
+            return
+        if engine is not None and engine not in ENGINES:
+            self.send_error_response(400, f"engine must be one of {', '.join(ENGINES)}")
+            return
+        
+        start_shadow(model_path, engine)
+        self.send_success_response({"enabled": model_path is not None, "candidate": model_path, "success": True})
+    
+    def read_body(self):
+        """Read the request body named by Content-Length (b'' if there is none).
+        
+        Sends a 400 or 413 and returns None if the length is malformed or over
+        MAX_BODY_BYTES; the unread body then closes the connection.
+        """
+        try:
+            content_length = parse_content_length(self.headers.get('Content-Length'))
+        except ValueError:
+            self.send_error_response(400, "Invalid Content-Length")
+            return None
+        if content_length > MAX_BODY_BYTES:
+            self.send_error_response(413, f"Request body too large (max {MAX_BODY_BYTES} bytes)")
+            return None
+        
+        stage_start = time.perf_counter()
+        post_data = self.rfile.read(content_length) if content_length > 0 else b''
+        observe_stage('body_read', stage_start)
+        self.body_read = True
+        return post_data
+    
+    def read_json_body(self, expect_object=True):
+        """Parse the JSON request body (an object unless expect_object is False), or send a 400 and return None"""
+        post_data = self.read_body()
+        if post_data is None:
+            return None
+        if not post_data:
+            self.send_error_response(400, "Empty request body")
+            return None
+        
+        stage_start = time.perf_counter()
+        try:
+            data = decode_json_body(post_data, expect_object)
+        except ValueError as e:
+            self.send_error_response(400, str(e))
+            return None
+        observe_stage('json_parse', stage_start)
+        return data
+    
+    def handle_similar(self):
+        """Top-k indexed complaints that are likely duplicates of a description"""
+        data = self.read_json_body()
+        if data is None:
+            return
+        
+        description = data.get('description', '')
+        error = validate_description(description)
+        if error:
+            self.send_error_response(400, error)
+            return
+        
+        try:
+            k = int(data.get('k', 5))
+            min_similarity = float(data.get('min_similarity', 0.3))
+        except (TypeError, ValueError):
+            self.send_error_response(400, "k and min_similarity must be numbers")
+            return
+        
+        stage_start = time.perf_counter()
+        matches = similarity_index.query(
+            preprocess_text(description), k=max(1, min(k, 100)),
+            latitude=data.get('latitude'), longitude=data.get('longitude'),
+            min_similarity=min_similarity, exclude_id=data.get('exclude_id'))
+        observe_stage('similar_query', stage_start)
+        
+        self.send_success_response({
+            "matches": matches,
+            "indexed": len(similarity_index),
+            "success": True
+        })
+    
+    def handle_similar_add(self):
+        """Index new complaints: {"id", "description", "latitude", "longitude"} or {"complaints": [...]}"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        data = self.read_json_body(expect_object=False)
+        if data is None:
+            return
+        
+        complaints = data.get('complaints', [data]) if isinstance(data, dict) else data
+        if not isinstance(complaints, list) or len(complaints) > MAX_BATCH_SIZE:
+            self.send_error_response(400, f"Expected up to {MAX_BATCH_SIZE} complaints")
+            return
+        
+        added = 0
+        for complaint in complaints:
+            if not isinstance(complaint, dict) or complaint.get('id') is None:
+                continue
+            if validate_description(complaint.get('description')):
+                continue
+            added += similarity_index.add(
+                str(complaint['id']), preprocess_text(complaint['description']),
+                complaint.get('latitude'), complaint.get('longitude'))
+        
+        self.send_success_response({
+            "added": added,
+            "indexed": len(similarity_index),
+            "success": True
+        })
+    
+    def hotspot_query(self):
+        """Query string of a /hotspots request with its bbox parsed; sends a 400 and returns None if invalid"""
+        query = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        try:
+            query['bbox'] = parse_bbox(query['bbox']) if 'bbox' in query else None
+        except ValueError as e:
+            self.send_error_response(400, str(e))
+            return None
+        return query
+    
+    def handle_hotspots(self):
+        """Top hotspots: ?bbox=south,west,north,east&n=10&hazard_type=...&min_severity=high&scale=1"""
+        query = self.hotspot_query()
+        if query is None:
+            return
+        
+        try:
+            n = int(query.get('n', 10))
+            scale = int(query.get('scale', 1))
+        except ValueError:
+            self.send_error_response(400, "n and scale must be integers")
+            return
+        
+        stage_start = time.perf_counter()
+        try:
+            hotspots = hotspot_index.hotspots(
+                n=max(1, min(n, 1000)), bbox=query['bbox'], hazard_type=query.get('hazard_type'),
+                min_severity=query.get('min_severity'), scale=max(1, min(scale, 1000)))
+        except ValueError as e:
+            self.send_error_response(400, str(e))
+            return
+        observe_stage('hotspot_query', stage_start)
+        
+        self.send_success_response({
+            "hotspots": hotspots,
+            "cell_size": hotspot_index.cell_size * max(1, scale),
+            "indexed": len(hotspot_index),
+            "success": True
+        })
+    
+    def handle_hotspot_summary(self):
+        """Exact complaint counts by hazard type and severity inside ?bbox=south,west,north,east"""
+        query = self.hotspot_query()
+        if query is None:
+            return
+        if query['bbox'] is None:
+            self.send_error_response(400, "bbox is required")
+            return
+        
+        stage_start = time.perf_counter()
+        summary = hotspot_index.aggregate(query['bbox'])
+        observe_stage('hotspot_aggregate', stage_start)
+        
+        self.send_success_response({**summary, "indexed": len(hotspot_index), "success": True})
+    
+    def handle_hotspot_add(self):
+        """Index classified complaints: {"latitude", "longitude", "ml_prediction": {"hazard_type", "severity"}}
+        (or the labels at top level), or {"complaints": [...]}"""
+        if not self.is_admin_authorized():
+            self.send_error_response(403, "Invalid admin token")
+            return
+        
+        data = self.read_json_body(expect_object=False)
+        if data is None:
+            return
+        
+        complaints = data.get('complaints', [data]) if isinstance(data, dict) else data
+        if not isinstance(complaints, list) or len(complaints) > MAX_BATCH_SIZE:
+            self.send_error_response(400, f"Expected up to {MAX_BATCH_SIZE} complaints")
+            return
+        
+        added = 0
+        for complaint in complaints:
+            if not isinstance(complaint, dict):
+                continue
+            hazard_type, severity = prediction_labels(complaint)
+            added += hotspot_index.add(complaint.get('latitude'), complaint.get('longitude'), hazard_type, severity)
+        
+        self.send_success_response({
+            "added": added,
+            "indexed": len(hotspot_index),
+            "success": True
+        })
+    
+    def handle_predict_batch(self, model):
+        """Classify a JSON array of descriptions in one vectorized pass"""
+        data = self.read_json_body(expect_object=False)
+        if data is None:
+            return
+        
+        # Accept either a bare array or {"descriptions": [...]}
+        descriptions = data.get('descriptions') if isinstance(data, dict) else data
+        if not isinstance(descriptions, list):
+            self.send_error_response(400, "Expected a JSON array of descriptions")
+            return
+        
+        if len(descriptions) > MAX_BATCH_SIZE:
+            self.send_error_response(413, f"Batch too large (max {MAX_BATCH_SIZE} descriptions)")
+            return
+        
+        request_log.info(f"Processing batch of {len(descriptions)} descriptions")
+        
+        results = [None] * len(descriptions)
+        valid_indices = []
+        for i, description in enumerate(descriptions):
+            error = validate_description(description)
+            if error:
+                results[i] = {"error": error, "success": False}
+            else:
+                valid_indices.append(i)
+        
+        originals = [descriptions[i] for i in valid_indices]
+        stage_start = time.perf_counter()
+        processed = [preprocess_text(text) for text in originals]
+        observe_stage('preprocess', stage_start)
+        
+        if model is not None:
+            predictions = batch_ml_prediction(model, processed, originals)
+        else:
+            predictions = [fallback_prediction(text) for text in originals]
+        
+        for i, prediction in zip(valid_indices, predictions):
+            results[i] = prediction
+        
+        succeeded = sum(1 for result in results if result.get('success'))
+        request_log.info(f"✅ Batch done: {succeeded}/{len(results)} succeeded")
+        self.send_success_response({
+            "results": results,
+            "count": len(results),
+            "succeeded": succeeded,
+            "success": True
+        })
+    
+    def ml_prediction(self, model, processed_text, original_text):
+        """Make prediction using the trained ML model"""
+        request_log.info("🤖 Using trained ML model for prediction...")
+        
+        # Same cache-aware path as batches: one vectorize + predict_proba pass, labels are the argmax
+        return batch_ml_prediction(model, [processed_text], [original_text])[0]
+    
+    def send_body(self, code, body, content_type='application/json'):
+        """Write a complete response with its Content-Length so the connection can be reused"""
+        # A request answered without reading its body (403, 404) would leave the
+        # body on the socket in front of the client's next request
+        if self.command == 'POST' and not getattr(self, 'body_read', True) and \
+                self.headers.get('Content-Length', '0').strip() not in ('', '0'):
+            self.close_connection = True
+        
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
+        if self.close_connection and self.request_version == 'HTTP/1.1':
+            self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+        self.observe_request(code)
+    
+    def send_success_response(self, data, code=200):
+        """Send successful response"""
+        stage_start = time.perf_counter()
+        body = encode_json(data)
+        observe_stage('serialize', stage_start)
+        self.send_body(code, body)
+    
+    def send_text_response(self, text, content_type):
+        """Send a plain-text response, e.g. the /metrics exposition"""
+        self.send_body(200, text.encode(), content_type)
     
     def send_error_response(self, code, message):
         """Send error response"""
-        self.send_response(code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
+        self.send_body(code, error_body(message))
+    
+    def send_not_found(self):
+        self.send_error_response(404, "Not found")
+    
+    def observe_request(self, code):
+        started = getattr(self, 'request_started', None)
+        if started is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint_label(self.path), str(code))
+    
+    def log_message(self, format, *args):
+        """Access log lines go through the request log rate limit instead of straight to stderr"""
+        request_log.info(f"{self.address_string()} - {format % args}")
+
+def run_prefork(httpd, workers, watch_interval=None):
+    """Serve from `workers` forked children that share the parent's listening socket and model.
+    
+    A SIGHUP to the parent (or a file change, when watching) is forwarded to
+    every worker, and each worker reloads the model in the background.
+    """
+    # Move everything allocated so far (the unpickled model included) out of the
+    # GC's tracked generations so collections in the children don't write to
+    # those pages and break copy-on-write sharing.
+    gc.freeze()
+    
+    children = set()
+    shutting_down = False
+    
+    def spawn(respawn=False):
+        parent_pid = os.getpid()
+        # Ignore SIGHUP across the fork so a reload signal can't reach the child
+        # before it has installed its own handler
+        previous_hup = signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        pid = os.fork()
+        if pid == 0:
+            global prefork_parent_pid
+            prefork_parent_pid = parent_pid
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(
+                target=reload_model, name="model-reload", daemon=True).start())
+            # A respawned worker starts from the parent's startup model; catch up
+            # if the other workers have moved on to a newer file since then
+            if respawn and os.path.exists(MODEL_PATH) and (
+                    active_model is None or model_file_version(MODEL_PATH) != active_model.version):
+                threading.Thread(target=reload_model, name="model-reload", daemon=True).start()
+            try:
+                httpd.serve_forever()
+            finally:
+                os._exit(0)
+        signal.signal(signal.SIGHUP, previous_hup)
+        children.add(pid)
+    
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def forward_reload(signum=None, frame=None):
+        logger.info(f"🔁 Asking {len(children)} workers to reload the model")
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    for _ in range(workers):
+        spawn()
+    logger.info(f"👷 Started {workers} pre-forked workers: {sorted(children)}")
+    
+    # Handlers installed after forking so the workers keep their own SIGHUP behaviour
+    signal.signal(signal.SIGHUP, forward_reload)
+    if watch_interval:
+        watch_model_file(MODEL_PATH, watch_interval, forward_reload)
+    
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not shutting_down:
+            logger.warning(f"⚠️ Worker {pid} exited with status {status}, respawning")
+            spawn(respawn=True)
+
+def predict_queued(items):
+    """MicroBatcher callback: score queued (model, processed_text, description) items together"""
+    return request_profiler.run(predict_items, items)
+
+def predict_items(items):
+    """Score the items grouped by the model they were queued with"""
+    results = [None] * len(items)
+    # Items queued across a reload may reference different models
+    by_model = {}
+    for i, (model, _, _) in enumerate(items):
+        by_model.setdefault(id(model), (model, []))[1].append(i)
+    
+    for model, indices in by_model.values():
+        predictions = batch_ml_prediction(
+            model, [items[i][1] for i in indices], [items[i][2] for i in indices])
+        for i, prediction in zip(indices, predictions):
+            results[i] = prediction
+    
+    request_log.info(f"📦 Micro-batch of {len(items)} predictions")
+    return results
+
+async def predict_route(body):
+    """/predict in async mode: same checks and response as the handler, inference via the batcher"""
+    try:
+        if not body:
+            return 400, {"error": "Empty request body", "success": False}
+        
+        stage_start = time.perf_counter()
+        try:
+            data = decode_json_body(body)
+        except ValueError as e:
+            return 400, {"error": str(e), "success": False}
+        observe_stage('json_parse', stage_start)
+        
+        description = data.get('description', '')
+        error = validate_description(description)
+        if error:
+            return 400, {"error": error, "success": False}
+        
+        stage_start = time.perf_counter()
+        processed_text = preprocess_text(description)
+        observe_stage('preprocess', stage_start)
         
-        response = {
-            "error": message,
-            "success": False
-        }
-        self.wfile.write(json.dumps(response).encode())
+        model = active_model
+        if model is not None:
+            result = await micro_batcher.submit((model, processed_text, description))
+        else:
+            result = fallback_prediction(description)
+        return 200, result
+        
+    except Exception as e:
+        logger.error(f"POST request error: {e}")
+        return 500, {"error": f"Internal server error: {str(e)}", "success": False}
+
+def run_async(port, batch_size, max_wait_ms, watch_interval=None):
+    """Serve on an asyncio event loop, batching concurrent /predict calls"""
+    global micro_batcher
+    
+    # Model calls and delegated non-/predict requests run here, off the event loop
+    executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="ml-worker")
+    micro_batcher = MicroBatcher(predict_queued, max_batch_size=batch_size,
+                                 max_wait=max_wait_ms / 1000, executor=executor)
+    frontend = AsyncHTTPFrontend({('POST', '/predict'): predict_route}, MLComplaintHandler, executor,
+                                 stage_histogram=STAGE_SECONDS, request_histogram=REQUEST_SECONDS,
+                                 idle_timeout=KEEP_ALIVE_TIMEOUT, max_body_size=MAX_BODY_BYTES)
+    
+    async def serve():
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, reload_model_async)
+        if watch_interval:
+            watch_model_file(MODEL_PATH, watch_interval, reload_model_async)
+        
+        batcher_task = asyncio.create_task(micro_batcher.run())
+        server = await asyncio.start_server(frontend.handle_connection, port=port, reuse_address=True)
+        logger.info(f"📦 Micro-batching /predict: up to {batch_size} requests or {max_wait_ms:g} ms")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+    
+    try:
+        asyncio.run(serve())
+    finally:
+        executor.shutdown(wait=False)
 
-def run_server(port=5000):
+def run_server(port=5000, mode='single', workers=1, watch_interval=None,
+               batch_size=MICRO_BATCH_SIZE, max_wait_ms=MICRO_BATCH_WAIT_MS):
     """Start the HTTP server"""
     logger.info("🚀 Starting ML Complaint Classification Server...")
     
-    # Load the comprehensive model
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode {mode!r}, expected one of {SERVER_MODES}")
+    
+    load_keyword_engine()
+    load_routing_rules()
+    load_similarity_index()
+    load_hotspot_index()
+    
+    # Load the comprehensive model once; pre-forked workers inherit it
     if not load_model():
         logger.warning("⚠️  Model not loaded properly. Server will use fallback mode.")
     
+    # One shadow worker process; pre-forked workers share its queue and counters
+    start_shadow(SHADOW_MODEL_PATH)
+    
     server_address = ('', port)
-    httpd = HTTPServer(server_address, MLComplaintHandler)
+    if mode == 'async':
+        httpd = None
+    elif mode == 'threaded':
+        httpd = ThreadingHTTPServer(server_address, MLComplaintHandler)
+        httpd.daemon_threads = True
+    else:
+        httpd = HTTPServer(server_address, MLComplaintHandler)
+        MLComplaintHandler.protocol_version = 'HTTP/1.0'
     
-    logger.info(f"🌐 Server running on http://localhost:{port}")
-    logger.info("❤️  Health check: http://localhost:5000/health")
-    logger.info("📝 Prediction endpoint: POST http://localhost:5000/predict")
+    logger.info(f"🌐 Server running on http://localhost:{port} ({mode} mode)")
+    logger.info(f"❤️  Health check: http://localhost:{port}/health")
+    logger.info(f"📝 Prediction endpoint: POST http://localhost:{port}/predict")
+    logger.info(f"📦 Batch endpoint: POST http://localhost:{port}/predict_batch")
+    logger.info(f"🔎 Duplicates: POST http://localhost:{port}/similar (index with POST /similar/add)")
+    logger.info(f"🗺️  Hotspots: http://localhost:{port}/hotspots?bbox=south,west,north,east "
+                f"(index with POST /hotspots/add)")
+    logger.info(f"🔁 Reload: POST http://localhost:{port}/admin/reload or SIGHUP to pid {os.getpid()}")
+    logger.info(f"📈 Metrics: http://localhost:{port}/metrics")
+    if request_profiler.rate:
+        logger.info(f"🔬 Profiling {request_profiler.rate:.1%} of requests ({request_profiler.mode}), "
+                    f"GET http://localhost:{port}/admin/profile")
+    if MLComplaintHandler.protocol_version == 'HTTP/1.1':
+        logger.info(f"🔗 Keep-alive on, idle connections closed after {KEEP_ALIVE_TIMEOUT:g}s; JSON via {JSON_ENCODER}")
+    else:
+        logger.info(f"🔗 One request per connection in {mode} mode; JSON via {JSON_ENCODER}")
     
     try:
-        httpd.serve_forever()
+        if mode == 'async':
+            run_async(port, batch_size, max_wait_ms, watch_interval)
+        elif mode == 'prefork':
+            run_prefork(httpd, workers, watch_interval)
+        else:
+            signal.signal(signal.SIGHUP, lambda signum, frame: reload_model_async())
+            if watch_interval:
+                watch_model_file(MODEL_PATH, watch_interval, reload_model_async)
+            httpd.serve_forever()
     except KeyboardInterrupt:
         logger.info("🛑 Server stopped by user")
     except Exception as e:
         logger.error(f"🛑 Server crashed: {e}")
     finally:
-        httpd.server_close()
+        if httpd is not None:
+            httpd.server_close()
+        if shadow_evaluator is not None and prefork_parent_pid is None:
+            shadow_evaluator.stop()
+
+def parse_args():
+    """Command line options, each defaulting to its ML_* environment variable"""
+    parser = argparse.ArgumentParser(description="ML Complaint Classification Server")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('ML_PORT', '5000')))
+    parser.add_argument('--mode', choices=SERVER_MODES, default=os.environ.get('ML_SERVER_MODE', 'single'),
+                        help="single: one request at a time; threaded: a thread per request; "
+                             "prefork: worker processes sharing the loaded model; "
+                             "async: asyncio event loop that micro-batches /predict")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('ML_WORKERS', os.cpu_count() or 1)),
+                        help="number of worker processes in prefork mode")
+    parser.add_argument('--model', default=MODEL_PATH,
+                        help="joblib model file or serving artifact directory to serve (ML_MODEL_PATH)")
+    parser.add_argument('--keyword-rules', default=KEYWORD_RULES_PATH,
+                        help="JSON keyword rules for the fallback path (ML_KEYWORD_RULES)")
+    parser.add_argument('--routing-rules', default=ROUTING_RULES_PATH,
+                        help="JSON label -> hazard type/department/escalation rules (ML_ROUTING_RULES)")
+    parser.add_argument('--similarity-index', default=SIMILARITY_INDEX_PATH, metavar='EXPORT',
+                        help="complaint export (CSV or JSONL) to bulk-build the /similar index from (ML_SIMILARITY_INDEX)")
+    parser.add_argument('--hotspot-index', default=HOTSPOT_INDEX_PATH, metavar='EXPORT',
+                        help="classified complaint export (CSV or JSONL) to bulk-build the /hotspots grid from "
+                             "(ML_HOTSPOT_INDEX)")
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE,
+                        help="inference engine (ML_ENGINE); numpy requires a serving artifact")
+    parser.add_argument('--cascade-model', default=CASCADE_MODEL_PATH,
+                        help="joblib first-stage model from train_tfidf.py --fast-model (ML_CASCADE_MODEL)")
+    parser.add_argument('--cascade-threshold', type=float, default=CASCADE_THRESHOLD,
+                        help="confidence the first stage needs on both targets to answer alone "
+                             "(ML_CASCADE_THRESHOLD; tune with ML/data/cascade_sweep.py)")
+    parser.add_argument('--shadow-model', default=SHADOW_MODEL_PATH, metavar='PATH',
+                        help="candidate joblib model or serving artifact to shadow-evaluate on live traffic "
+                             "(ML_SHADOW_MODEL)")
+    parser.add_argument('--watch-model', type=float, metavar='SECONDS',
+                        default=float(os.environ.get('ML_WATCH_MODEL', '0')) or None,
+                        help="poll the model file's mtime and hot-reload when it changes")
+    parser.add_argument('--batch-size', type=int, default=MICRO_BATCH_SIZE,
+                        help="async mode: flush a micro-batch at this many /predict requests (ML_MICRO_BATCH_SIZE)")
+    parser.add_argument('--max-wait-ms', type=float, default=MICRO_BATCH_WAIT_MS,
+                        help="async mode: longest a request waits for its batch to fill (ML_MICRO_BATCH_WAIT_MS)")
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    run_server()
\ No newline at end of file
+    args = parse_args()
+    MODEL_PATH = args.model
+    ENGINE = args.engine
+    KEYWORD_RULES_PATH = args.keyword_rules
+    ROUTING_RULES_PATH = args.routing_rules
+    CASCADE_MODEL_PATH = args.cascade_model
+    CASCADE_THRESHOLD = args.cascade_threshold
+    SIMILARITY_INDEX_PATH = args.similarity_index
+    HOTSPOT_INDEX_PATH = args.hotspot_index
+    SHADOW_MODEL_PATH = args.shadow_model
+    run_server(port=args.port, mode=args.mode, workers=args.workers, watch_interval=args.watch_model,
+               batch_size=args.batch_size, max_wait_ms=args.max_wait_ms)
\ No newline at end of file
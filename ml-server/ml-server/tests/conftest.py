@@ -0,0 +1,122 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import joblib
+import pytest
+
+# The server modules are imported as top-level modules, as smart_server.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'smart_server.py')
+
+TRAINING_TEXTS = [
+    ("large pothole on the main road", "road_damage", "high"),
+    ("deep pothole damaging cars", "road_damage", "high"),
+    ("crack in the road surface", "road_damage", "low"),
+    ("no water supply since morning", "water_issue", "high"),
+    ("water pipe leaking on street", "water_issue", "medium"),
+    ("low water pressure in taps", "water_issue", "low"),
+    ("garbage not collected for days", "sanitation", "medium"),
+    ("overflowing trash bins in park", "sanitation", "medium"),
+    ("litter dumped near the market", "sanitation", "low"),
+]
+
+
+def train_model_data():
+    """A model_data dict shaped like train_tfidf.py's output, trained on a handful of texts"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import LabelEncoder
+
+    texts, labels, severities = zip(*TRAINING_TEXTS)
+    label_encoder = LabelEncoder().fit(labels)
+    severity_encoder = LabelEncoder().fit(severities)
+
+    def pipeline(targets):
+        return Pipeline([('tfidf', TfidfVectorizer(ngram_range=(1, 2))),
+                         ('clf', LogisticRegression(max_iter=1000))]).fit(texts, targets)
+
+    return {
+        'category_pipeline': pipeline(label_encoder.transform(labels)),
+        'severity_pipeline': pipeline(severity_encoder.transform(severities)),
+        'label_encoder': label_encoder,
+        'severity_encoder': severity_encoder,
+    }
+
+
+@pytest.fixture(scope='session')
+def model_data():
+    return train_model_data()
+
+
+@pytest.fixture
+def model_path(tmp_path, model_data):
+    path = tmp_path / 'text_model.joblib'
+    joblib.dump(model_data, path)
+    return str(path)
+
+
+class RunningServer:
+    """smart_server.py running in a subprocess on a free local port"""
+
+    def __init__(self, port, process):
+        self.port = port
+        self.process = process
+
+    def request(self, method, path, body=None, headers=None):
+        """Return (status, parsed JSON body) for one request on a fresh connection"""
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            if body is not None and not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+            return response.status, json.loads(payload) if payload else None
+        finally:
+            connection.close()
+
+
+@pytest.fixture
+def start_server(model_path, tmp_path):
+    """Start smart_server.py with the test model and extra flags; stopped at teardown"""
+    servers = []
+
+    def start(*args, env=None):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        log = open(tmp_path / f'server-{port}.log', 'w')
+        process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, '--port', str(port), '--model', model_path, *args],
+            cwd=os.path.dirname(SERVER_SCRIPT), stdout=log, stderr=subprocess.STDOUT,
+            env={**os.environ, **(env or {})})
+        server = RunningServer(port, process)
+        servers.append((server, log))
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                if server.request('GET', '/health')[0] == 200:
+                    return server
+            except OSError:
+                time.sleep(0.1)
+        pytest.fail(f"server did not start: {(tmp_path / f'server-{port}.log').read_text()}")
+
+    yield start
+    for server, log in servers:
+        server.process.send_signal(signal.SIGTERM)
+        try:
+            server.process.wait(10)
+        except subprocess.TimeoutExpired:
+            server.process.kill()
+        log.close()
@@ -0,0 +1,67 @@
+import gzip
+import json
+
+import pytest
+
+import hotspot_index
+import similarity_index
+from export_reader import has_location, iter_records, read_frames
+
+RECORDS = [
+    {"_id": {"$oid": "a1"}, "description": "Street light broken near the market",
+     "latitude": 12.97, "longitude": 77.59, "ml_prediction": {"hazard_type": "Street Lights", "severity": "high"}},
+    {"_id": {"$oid": "b2"}, "description": "Garbage not collected", "latitude": None, "longitude": None},
+]
+
+
+def write_jsonl_gz(path):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for record in RECORDS:
+            f.write(json.dumps(record) + "\n\n")
+
+
+def test_csv_and_gzipped_jsonl_exports_read_alike(tmp_path):
+    csv_path = tmp_path / "complaints.csv"
+    csv_path.write_text("_id,description,latitude,longitude,ml_prediction.hazard_type,ml_prediction.severity\n"
+                        "a1,Street light broken near the market,12.97,77.59,Street Lights,high\n"
+                        "b2,Garbage not collected,,,,\n")
+    jsonl_path = tmp_path / "complaints.jsonl.gz"
+    write_jsonl_gz(jsonl_path)
+
+    assert [record['description'] for record in iter_records(str(csv_path))] == \
+        [record['description'] for record in iter_records(str(jsonl_path))]
+    for path in (csv_path, jsonl_path):
+        assert list(hotspot_index.iter_classified(str(path))) == [(12.97, 77.59, "Street Lights", "high")]
+        complaints = list(similarity_index.iter_complaints(str(path)))
+        assert [complaint[0] for complaint in complaints] == ["a1", "b2"]
+        assert complaints[1][2:] == (None, None)
+
+
+def test_has_location():
+    assert has_location("12.97", 77.59)
+    assert not has_location(None, 77.59)
+    assert not has_location("", 77.59)
+    assert not has_location(95.0, 77.59)
+    assert not has_location(float("nan"), 77.59)
+
+
+def test_a_malformed_prediction_cell_does_not_abort_the_build(tmp_path):
+    path = tmp_path / "complaints.csv"
+    path.write_text('_id,latitude,longitude,ml_prediction,hazard_type,severity\n'
+                    'a1,12.97,77.59,"{""hazard_type"": ""Potho",Potholes,high\n'
+                    'b2,12.98,77.60,"{""hazard_type"": ""Street Lights"", ""severity"": ""low""}",,\n'
+                    'c3,12.99,77.61,"{broken",,\n')
+    assert list(hotspot_index.iter_classified(str(path))) == [
+        (12.97, 77.59, "Potholes", "high"), (12.98, 77.60, "Street Lights", "low")]
+
+
+def test_read_frames_chunks_csv_and_gzipped_jsonl(tmp_path):
+    pytest.importorskip("pandas")
+    csv_path = tmp_path / "complaints.csv"
+    csv_path.write_text("text,label\n" + "".join(f"complaint {i},road_damage\n" for i in range(5)))
+    jsonl_path = tmp_path / "complaints.jsonl.gz"
+    write_jsonl_gz(jsonl_path)
+
+    assert [len(frame) for frame in read_frames(str(csv_path), chunksize=2)] == [2, 2, 1]
+    frames = list(read_frames(str(jsonl_path), chunksize=10))
+    assert frames[0]['description'].tolist() == [record['description'] for record in RECORDS]
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+import smart_server
+from smart_server import settled_mtime, watch_model_file
+
+
+def test_settled_mtime_reports_a_new_file(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'v1')
+    mtime = os.stat(path).st_mtime
+
+    assert settled_mtime(str(path), None, 0) == mtime
+    assert settled_mtime(str(path), mtime, 0) is None
+
+
+def test_settled_mtime_survives_the_file_vanishing_between_stats(tmp_path, monkeypatch):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'v1')
+    real_stat = os.stat
+    calls = []
+
+    def stat_then_vanish(target, *args, **kwargs):
+        calls.append(target)
+        if len(calls) > 1:
+            raise FileNotFoundError(target)
+        return real_stat(target, *args, **kwargs)
+
+    monkeypatch.setattr(smart_server.os, 'stat', stat_then_vanish)
+    assert settled_mtime(str(path), None, 0) is None
+    assert len(calls) == 2
+
+
+def test_settled_mtime_of_a_missing_file(tmp_path):
+    assert settled_mtime(str(tmp_path / 'missing.joblib'), None, 0) is None
+
+
+def test_watcher_keeps_running_after_a_failed_reload_and_a_missing_file(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'v1')
+    calls = []
+    second_call = threading.Event()
+
+    def on_change():
+        calls.append(time.time())
+        if len(calls) == 1:
+            raise RuntimeError("model failed to load")
+        second_call.set()
+
+    watcher = watch_model_file(str(path), 0.02, on_change)
+    # Let it take the current mtime as its baseline
+    time.sleep(0.1)
+
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    deadline = time.time() + 5
+    while not calls and time.time() < deadline:
+        time.sleep(0.01)
+
+    # rm + cp deploy: the file is missing for a while, then comes back newer
+    path.unlink()
+    time.sleep(0.1)
+    path.write_bytes(b'v2')
+    os.utime(path, (time.time() + 20, time.time() + 20))
+
+    assert second_call.wait(5)
+    assert watcher.is_alive()
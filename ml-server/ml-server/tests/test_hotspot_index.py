@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from hotspot_index import HotspotIndex, parse_bbox
+
+# Two blocks of complaints about 5 km apart, one of them mostly high severity
+MARKET = (12.9716, 77.5946)
+STATION = (12.9780, 77.5700)
+
+
+def build(merge_every=10000):
+    index = HotspotIndex(cell_size=0.01, merge_every=merge_every)
+    for _ in range(3):
+        index.add(*MARKET, "Potholes", "low")
+    for _ in range(2):
+        index.add(*STATION, "Electrical Hazards", "high")
+    index.add(*STATION, "Potholes", "medium")
+    return index
+
+
+def centers(hotspots):
+    return [(spot['latitude'], spot['longitude']) for spot in hotspots]
+
+
+@pytest.mark.parametrize("merge_every", [1, 4, 10000])
+def test_hotspots_rank_cells_by_severity_weighted_count(merge_every):
+    hotspots = build(merge_every).hotspots(n=10)
+
+    assert [spot['score'] for spot in hotspots] == [8.0, 3.0]
+    assert hotspots[0]['by_hazard'] == {"Electrical Hazards": 2, "Potholes": 1}
+    assert hotspots[0]['south'] <= STATION[0] <= hotspots[0]['north']
+    assert hotspots[1]['total'] == 3
+
+
+def test_filters_drop_other_labels_from_scores_and_breakdowns():
+    index = build()
+    potholes = index.hotspots(hazard_type="Potholes")
+    assert [spot['by_hazard'] for spot in potholes] == [{"Potholes": 3}, {"Potholes": 1}]
+
+    severe = index.hotspots(min_severity="medium")
+    assert len(severe) == 1
+    assert severe[0]['by_severity'] == {"low": 0, "medium": 1, "high": 2, "critical": 0}
+
+
+def test_unknown_min_severity_is_rejected():
+    with pytest.raises(ValueError, match="min_severity must be one of low, medium, high, critical"):
+        build().hotspots(min_severity="extreme")
+
+
+def test_critical_complaints_outrank_and_survive_severity_filters():
+    index = build()
+    index.add(*MARKET, "Electrical Hazards", "critical")
+    index.add(*MARKET, "Electrical Hazards", "critical")
+
+    hotspots = index.hotspots()
+    assert [spot['score'] for spot in hotspots] == [11.0, 8.0]
+    assert hotspots[0]['by_severity']['critical'] == 2
+
+    critical = index.hotspots(min_severity="critical")
+    assert [spot['by_hazard'] for spot in critical] == [{"Electrical Hazards": 2}]
+    assert [spot['score'] for spot in index.hotspots(min_severity="high")] == [8.0, 6.0]
+
+
+def test_scale_merges_neighboring_cells():
+    hotspots = build().hotspots(scale=10)
+    assert len(hotspots) == 1
+    assert hotspots[0]['total'] == 6
+
+
+@pytest.mark.parametrize("merge_every", [1, 10000])
+def test_aggregate_counts_exactly_inside_the_box(merge_every):
+    index = build(merge_every)
+    around_market = (MARKET[0] - 0.001, MARKET[1] - 0.001, MARKET[0] + 0.001, MARKET[1] + 0.001)
+
+    summary = index.aggregate(around_market)
+    assert summary['total'] == 3
+    assert summary['by_hazard_severity'] == {"Potholes": {"low": 3}}
+    assert index.aggregate((-90, -180, 90, 180))['total'] == 6
+
+
+def test_bulk_and_single_inserts_agree():
+    single = build()
+    bulk = HotspotIndex(cell_size=0.01)
+    latitudes, longitudes = zip(*[MARKET] * 3, *[STATION] * 3)
+    bulk.add_many(latitudes, longitudes, ["Potholes"] * 3 + ["Electrical Hazards"] * 2 + ["Potholes"],
+                  ["low"] * 3 + ["high", "high", "medium"])
+    assert bulk.hotspots() == single.hotspots()
+
+
+def test_boxes_crossing_the_antimeridian():
+    index = HotspotIndex(cell_size=1.0)
+    index.add_many([10.5, 10.5, 10.5], [179.5, -179.5, 0.0], ["Potholes"] * 3, ["low"] * 3)
+    assert index.aggregate(parse_bbox("0,179,20,-179"))['total'] == 2
+
+
+def test_points_without_location_are_skipped():
+    index = HotspotIndex()
+    assert index.add(None, 77.5, "Potholes") is False
+    assert index.add_many([np.nan, 91.0, 12.9], [77.5, 77.5, 77.5], ["Potholes"] * 3, ["low"] * 3) == 1
+    assert len(index) == 1
+
+
+def test_invalid_bbox():
+    with pytest.raises(ValueError):
+        parse_bbox("12,77,11,78")
+
+
+def test_server_answers_400_for_an_unknown_min_severity(start_server):
+    server = start_server()
+    status, body = server.request('GET', '/hotspots?min_severity=extreme')
+    assert status == 400
+    assert "min_severity" in body['error']
+    status, body = server.request('GET', '/hotspots?min_severity=high')
+    assert status == 200, body
+
+
+def test_empty_index():
+    index = HotspotIndex()
+    assert index.hotspots(min_severity="high") == []
+    assert index.aggregate((-90, -180, 90, 180))['total'] == 0
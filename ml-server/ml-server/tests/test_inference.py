@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from conftest import TRAINING_TEXTS
+from inference import CompiledModel
+
+TEXTS = ["large pothole near the school", "water pipe burst on main street", "garbage everywhere", ""]
+
+
+def refit_severity(model_data, pipeline, texts=None):
+    """model_data with its severity pipeline replaced by ``pipeline`` fitted on the training texts"""
+    all_texts, _, severities = zip(*TRAINING_TEXTS)
+    targets = model_data['severity_encoder'].transform(severities)
+    if texts is not None:
+        targets = [target for text, target in zip(all_texts, targets) if text in texts]
+    pipeline.fit(texts or all_texts, targets)
+    return dict(model_data, severity_pipeline=pipeline)
+
+
+def assert_matches_pipelines(model, model_data):
+    prediction = model.predict(TEXTS)
+    for field, pipeline, encoder in (('category', 'category_pipeline', 'label_encoder'),
+                                     ('severity', 'severity_pipeline', 'severity_encoder')):
+        expected = model_data[encoder].inverse_transform(model_data[pipeline].predict(TEXTS))
+        assert prediction[field].tolist() == expected.tolist()
+        np.testing.assert_allclose(prediction[f'{field}_confidence'],
+                                   model_data[pipeline].predict_proba(TEXTS).max(axis=1))
+
+
+def test_shared_tokenization_matches_the_pipelines(model_data):
+    model = CompiledModel(model_data)
+    assert model.shared_tokenizer is not None
+    assert_matches_pipelines(model, model_data)
+
+
+def test_different_vocabularies_are_cut_from_one_count_matrix(model_data):
+    texts = tuple(text for text, _, _ in TRAINING_TEXTS[::2])
+    model_data = refit_severity(model_data, Pipeline([('tfidf', TfidfVectorizer(ngram_range=(1, 2))),
+                                                      ('clf', LogisticRegression(max_iter=1000))]), texts)
+    model = CompiledModel(model_data)
+
+    assert model.shared_tokenizer is not None
+    category_features, severity_features = model.features(TEXTS)
+    assert (category_features != model_data['category_pipeline'][:-1].transform(TEXTS)).nnz == 0
+    np.testing.assert_allclose(severity_features.toarray(),
+                               model_data['severity_pipeline'][:-1].transform(TEXTS).toarray())
+    assert_matches_pipelines(model, model_data)
+
+
+def test_differently_tokenized_pipelines_vectorize_separately(model_data):
+    model_data = refit_severity(model_data, Pipeline([('tfidf', TfidfVectorizer(stop_words='english')),
+                                                      ('clf', LogisticRegression(max_iter=1000))]))
+    model = CompiledModel(model_data)
+
+    assert not model.shares_tokenization
+    assert_matches_pipelines(model, model_data)
+
+
+def test_identical_hashing_vectorizers_run_once(model_data):
+    def hashing_pipeline():
+        return Pipeline([('hash', HashingVectorizer(n_features=2 ** 10, alternate_sign=False)),
+                         ('clf', SGDClassifier(loss='log_loss', random_state=0))])
+
+    texts, labels, _ = zip(*TRAINING_TEXTS)
+    category = hashing_pipeline().fit(texts, model_data['label_encoder'].transform(labels))
+    model_data = refit_severity(dict(model_data, category_pipeline=category), hashing_pipeline())
+    model = CompiledModel(model_data)
+
+    assert model.shared_hashing
+    category_features, severity_features = model.features(TEXTS)
+    assert category_features is severity_features
+    assert_matches_pipelines(model, model_data)
+
+
+def test_timings_report_both_stages(model_data):
+    timings = {}
+    CompiledModel(model_data).predict(TEXTS, timings)
+    assert set(timings) == {'vectorize', 'classify'}
+
+
+def test_missing_components_are_rejected(model_data):
+    with pytest.raises(ValueError, match="severity_encoder"):
+        CompiledModel({name: value for name, value in model_data.items() if name != 'severity_encoder'})
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+import pytest
+
+import json_encoding
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def dumps(request):
+    if request.param == 'stdlib':
+        encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=json_encoding._default)
+        return lambda data: encoder.encode(data).encode('utf-8')
+    if json_encoding.orjson is None:
+        pytest.skip("orjson is not installed")
+    return json_encoding.dumps
+
+
+def test_numpy_values_encode_as_plain_json(dumps):
+    payload = {"category": np.str_("road_damage"), "confidence": np.float64(0.5), "index": np.int64(3),
+               "probabilities": np.array([0.25, 0.75]), "note": "café"}
+    assert json.loads(dumps(payload)) == {"category": "road_damage", "confidence": 0.5, "index": 3,
+                                          "probabilities": [0.25, 0.75], "note": "café"}
+    assert dumps({"a": 1, "b": [True, None]}) == b'{"a":1,"b":[true,null]}'
+
+
+def test_unserializable_values_raise(dumps):
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_error_body_is_encoded_per_message():
+    assert json.loads(json_encoding.error_body("Missing 'description'")) == {
+        "error": "Missing 'description'", "success": False}
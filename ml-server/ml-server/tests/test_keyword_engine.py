@@ -0,0 +1,65 @@
+import pytest
+
+from keyword_engine import AhoCorasick, KeywordEngine
+
+RULES = {
+    "default_hazard": "Other",
+    "default_severity": "medium",
+    "smoothing": 1.0,
+    "hazards": {
+        "Potholes": {"pothole": 3, "crater": 2},
+        "Water Supply": {"water": 1, "pipe burst": 3, "tap": {"weight": 1, "whole_word": True}},
+        "Garbage Collection": {"garbage": 3, "bin": {"weight": 1, "whole_word": True}},
+    },
+    "severities": {"high": {"urgent": 2, "pothole": 1}, "low": {"minor": 2}},
+}
+
+
+def test_automaton_reports_overlapping_matches():
+    automaton = AhoCorasick(["he", "she", "hers", "his"])
+    found = {(pattern_id, end) for pattern_id, end in automaton.find("ushers")}
+    assert found == {(1, 3), (0, 3), (2, 5)}
+
+
+def test_empty_patterns_are_rejected():
+    with pytest.raises(ValueError):
+        AhoCorasick(["pothole", ""])
+
+
+def test_matches_are_scored_across_all_tables():
+    result = KeywordEngine(RULES).classify("URGENT: Pothole filled with water after a pipe burst")
+    assert result['hazard_type'] == "Water Supply"
+    assert result['severity'] == "high"
+    assert result['keywords'] == ["pothole", "water", "pipe burst", "urgent"]
+    # Water Supply 4 against Potholes 3, smoothing 1
+    assert result['hazard_confidence'] == pytest.approx(4 / 8)
+
+
+def test_whole_word_patterns_ignore_longer_words():
+    engine = KeywordEngine(RULES)
+    assert engine.classify("the tap is dry")['hazard_type'] == "Water Supply"
+    assert engine.classify("a tapestry shop")['hazard_type'] == "Other"
+    assert engine.classify("bin, overflowing")['hazard_type'] == "Garbage Collection"
+    assert engine.classify("cabinet")['hazard_type'] == "Other"
+
+
+def test_repeated_patterns_count_once():
+    result = KeywordEngine(RULES).classify("pothole pothole pothole, minor crater")
+    assert result['hazard_confidence'] == pytest.approx(5 / 6)
+
+
+def test_no_match_falls_back_to_defaults():
+    result = KeywordEngine(RULES).classify("someone parked in my spot")
+    assert (result['hazard_type'], result['severity']) == ("Other", "medium")
+    assert result['hazard_confidence'] == 0.0 and result['keywords'] == []
+
+
+def test_ties_go_to_the_first_defined_label():
+    rules = {"hazards": {"A": {"alpha": 1}, "B": {"beta": 1}}}
+    assert KeywordEngine(rules).classify("beta alpha")['hazard_type'] == "A"
+
+
+def test_bundled_rules_load():
+    engine = KeywordEngine.from_file()
+    assert engine.n_rules > 0
+    assert engine.classify("Huge pothole on the road")['hazard_type'] == "Potholes"
@@ -0,0 +1,81 @@
+import asyncio
+import socket
+
+import pytest
+
+from micro_batching import MicroBatcher, parse_content_length
+
+
+def run_batcher(batcher, items, delay=0.0):
+    """Submit items concurrently (``delay`` seconds apart) and return their results"""
+    async def main():
+        runner = asyncio.create_task(batcher.run())
+        await asyncio.sleep(0)
+        tasks = []
+        for item in items:
+            tasks.append(asyncio.create_task(batcher.submit(item)))
+            await asyncio.sleep(delay)
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            runner.cancel()
+    return asyncio.run(main())
+
+
+def test_concurrent_items_are_scored_together():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.05)
+    assert run_batcher(batcher, range(10)) == [item * 2 for item in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert batcher.stats()['flushed_on_size'] == 2
+
+
+def test_batches_flush_on_the_deadline():
+    batcher = MicroBatcher(lambda items: list(items), max_batch_size=100, max_wait=0.001)
+    assert run_batcher(batcher, range(3), delay=0.02) == [0, 1, 2]
+    assert batcher.stats()['batches'] == 3
+
+
+def test_a_failed_batch_fails_each_of_its_requests():
+    def process(items):
+        raise RuntimeError("model exploded")
+
+    results = run_batcher(MicroBatcher(process, max_batch_size=2), range(2))
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.parametrize("value, expected", [(None, 0), ("", 0), ("12", 12), (" 7 ", 7)])
+def test_parse_content_length(value, expected):
+    assert parse_content_length(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", "-1", "1.5"])
+def test_malformed_content_length(value):
+    with pytest.raises(ValueError):
+        parse_content_length(value)
+
+
+def raw_status(port, request):
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as connection:
+        connection.sendall(request)
+        status_line = connection.makefile('rb').readline()
+    return int(status_line.split()[1])
+
+
+@pytest.mark.parametrize("mode", ['threaded', 'async'])
+def test_bad_and_oversized_bodies_are_refused(start_server, mode):
+    server = start_server('--mode', mode, env={'ML_MAX_BODY_BYTES': '1024'})
+
+    for path in ('/predict', '/predict_batch'):
+        assert raw_status(server.port, f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: abc\r\n\r\n"
+                          .encode()) == 400
+        assert raw_status(server.port, f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: 999999\r\n\r\n"
+                          .encode()) == 413
+
+    status, _ = server.request('POST', '/predict', {'description': "Deep pothole damaging cars"})
+    assert status == 200
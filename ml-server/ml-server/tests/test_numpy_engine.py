@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import TRAINING_TEXTS
+from inference import CompiledModel
+from numpy_engine import NumpyModel
+from serving_artifact import load_model_data
+from smart_server import preprocess_text
+
+# Serving artifacts are written by the training side's exporter
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', '..', 'ML', 'data'))
+from serving_export import WEIGHT_PRECISIONS, export_serving_artifact  # noqa: E402
+
+RAW_TEXTS = [text for text, _, _ in TRAINING_TEXTS] + [
+    "Large POTHOLE near the school!!", "water pipe burst on main street", "", "the and of", "ÉLECTRIC wire café"]
+# Raw text exercises the analyzer's own lowercasing and punctuation handling
+TEXTS = [preprocess_text(text) for text in RAW_TEXTS] + RAW_TEXTS
+# Same tolerance as benchmarks/numpy_parity.py; compact artifacts compute in float32
+TOLERANCE = 1e-6
+
+
+def assert_same_predictions(expected, actual):
+    for name in ('category', 'severity'):
+        assert actual[name].tolist() == expected[name].tolist()
+        assert actual[f'{name}_index'].tolist() == expected[f'{name}_index'].tolist()
+        np.testing.assert_allclose(actual[f'{name}_confidence'], expected[f'{name}_confidence'], rtol=0, atol=TOLERANCE)
+
+
+def test_numpy_engine_matches_the_sklearn_pipelines(model_data, tmp_path):
+    artifact = str(tmp_path / 'text_model.serving')
+    export_serving_artifact(model_data, artifact)
+
+    engine = NumpyModel(artifact)
+    assert_same_predictions(CompiledModel(model_data).predict(TEXTS), engine.predict(TEXTS))
+    assert_same_predictions(CompiledModel(load_model_data(artifact)).predict(TEXTS), engine.predict(TEXTS))
+
+
+@pytest.mark.parametrize('precision', [precision for precision in WEIGHT_PRECISIONS if precision != 'float64'])
+def test_numpy_engine_matches_the_pipelines_rebuilt_from_a_compact_artifact(model_data, tmp_path, precision):
+    artifact = str(tmp_path / f'text_model.{precision}.serving')
+    export_serving_artifact(model_data, artifact, precision=precision)
+
+    assert_same_predictions(CompiledModel(load_model_data(artifact)).predict(TEXTS), NumpyModel(artifact).predict(TEXTS))
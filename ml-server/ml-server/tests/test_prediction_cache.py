@@ -0,0 +1,77 @@
+import importlib
+import sys
+
+import pytest
+
+from prediction_cache import PredictionCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2)
+    cache.put(('v1', 'a'), {'n': 1})
+    cache.put(('v1', 'b'), {'n': 2})
+    assert cache.get(('v1', 'a')) == {'n': 1}
+
+    cache.put(('v1', 'c'), {'n': 3})
+    assert cache.get(('v1', 'b')) is None
+    assert cache.get(('v1', 'a')) == {'n': 1}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    cache = PredictionCache(maxsize=10, ttl=5)
+    cache.put(('v1', 'a'), {'n': 1})
+
+    now[0] += 4
+    assert cache.get(('v1', 'a')) == {'n': 1}
+    now[0] += 2
+    assert cache.get(('v1', 'a')) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_callers_get_copies():
+    cache = PredictionCache()
+    result = {'n': 1}
+    cache.put(('v1', 'a'), result)
+    result['n'] = 2
+    cache.get(('v1', 'a'))['n'] = 3
+    assert cache.get(('v1', 'a')) == {'n': 1}
+
+
+def test_keys_include_the_model_version():
+    cache = PredictionCache()
+    cache.put(PredictionCache.make_key('v1', 'pothole'), {'n': 1})
+    assert cache.get(PredictionCache.make_key('v2', 'pothole')) is None
+
+
+def test_zero_size_disables_the_cache():
+    cache = PredictionCache(maxsize=0)
+    cache.put(('v1', 'a'), {'n': 1})
+    assert cache.get(('v1', 'a')) is None
+    assert cache.stats()['enabled'] is False
+
+
+@pytest.fixture
+def flask_app(model_path, monkeypatch):
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    monkeypatch.setenv('ML_MODEL_PATH', model_path)
+    sys.modules.pop('app', None)
+    app = importlib.import_module('app')
+    yield app
+    sys.modules.pop('app', None)
+
+
+def test_flask_app_caches_model_predictions(flask_app):
+    client = flask_app.app.test_client()
+
+    first = client.post('/predict', json={'description': 'Deep pothole, damaging cars!'})
+    second = client.post('/predict', json={'description': 'deep pothole damaging cars'})
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.get_json()['category'] == 'road_damage'
+    assert second.get_json()['original_text'] == 'deep pothole damaging cars'
+    stats = flask_app.prediction_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
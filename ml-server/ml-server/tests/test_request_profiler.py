@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from request_profiler import RequestProfiler
+
+
+def busy(n=2000):
+    return sum(i * i for i in range(n))
+
+
+@pytest.mark.parametrize("mode", ['cprofile', 'sample'])
+def test_sampled_requests_are_aggregated(mode):
+    profiler = RequestProfiler(rate=1.0, mode=mode, interval=0.001)
+    for _ in range(3):
+        assert profiler.run(busy, 20000) == busy(20000)
+
+    assert profiler.stats()['current']['requests'] == 3
+    content_type, body = profiler.export('current', 'collapsed' if mode == 'sample' else 'text')
+    assert content_type.startswith('text/plain')
+    if mode == 'cprofile':
+        assert b'busy' in body
+
+
+def test_rate_zero_profiles_nothing():
+    profiler = RequestProfiler(rate=0.0)
+    profiler.run(busy)
+    assert profiler.stats()['current']['requests'] == 0
+
+
+def test_admin_routes_are_neither_profiled_nor_counted():
+    profiler = RequestProfiler(rate=1.0)
+    profiler.run_request('/admin/profile', busy)
+    assert profiler.stats()['current']['requests'] == 0
+    profiler.run_request('/predict', busy)
+    assert profiler.stats()['current']['requests'] == 1
+
+
+def test_finished_windows_are_written_outside_the_lock(tmp_path, monkeypatch):
+    profiler = RequestProfiler(rate=1.0, window=0.0, dump_dir=str(tmp_path))
+    lock_held = []
+    write = profiler.dump
+
+    def dump(window):
+        lock_held.append(profiler.lock.locked())
+        write(window)
+
+    monkeypatch.setattr(profiler, 'dump', dump)
+    profiler.run(busy)
+    profiler.stats()
+
+    assert lock_held == [False]
+    assert len(list(tmp_path.glob('profile-*.pstats'))) == 1
+    assert profiler.stats()['last']['requests'] == 1
+
+
+def test_a_slow_dump_does_not_block_requests(tmp_path, monkeypatch):
+    profiler = RequestProfiler(rate=1.0, window=0.0, dump_dir=str(tmp_path))
+    writing, release = threading.Event(), threading.Event()
+
+    def slow_dump(window):
+        writing.set()
+        release.wait(5)
+
+    monkeypatch.setattr(profiler, 'dump', slow_dump)
+    profiler.run(busy)
+    dumper = threading.Thread(target=profiler.stats)
+    dumper.start()
+    assert writing.wait(5)
+
+    # The lock is free while the window is being written
+    assert profiler.lock.acquire(timeout=1)
+    profiler.lock.release()
+    release.set()
+    dumper.join(5)
+
+
+def test_unknown_modes_and_formats_are_rejected():
+    with pytest.raises(ValueError):
+        RequestProfiler(mode='perf')
+    with pytest.raises(ValueError):
+        RequestProfiler().export('last', 'svg')
@@ -0,0 +1,55 @@
+import pytest
+
+from smart_server import decode_json_body, validate_description
+
+
+@pytest.mark.parametrize("description, error", [
+    (None, "Description must be a string"),
+    (42, "Description must be a string"),
+    (["pothole"], "Description must be a string"),
+    ("", "Description is required"),
+    ("  hi  ", "Description too short (min 5 characters)"),
+    ("Deep pothole", None),
+])
+def test_validate_description(description, error):
+    assert validate_description(description) == error
+
+
+def test_decode_json_body():
+    assert decode_json_body(b'{"description": "x"}') == {"description": "x"}
+    assert decode_json_body(b'["a", "b"]', expect_object=False) == ["a", "b"]
+    for body, message in ((b'["a"]', "Expected a JSON object"), (b'{"a": ', "not valid JSON"),
+                          (b'\xff\xfe', "not valid JSON")):
+        with pytest.raises(ValueError, match=message):
+            decode_json_body(body)
+
+
+@pytest.mark.parametrize("mode", ['threaded', 'async'])
+def test_predict_answers_400_for_unusable_bodies(start_server, mode):
+    server = start_server('--mode', mode)
+    cases = [
+        (b'["Deep pothole damaging cars"]', "Expected a JSON object"),
+        (b'"Deep pothole damaging cars"', "Expected a JSON object"),
+        (b'{"description": 12345}', "Description must be a string"),
+        (b'{"description": null}', "Description must be a string"),
+        (b'{"text": "Deep pothole damaging cars"}', "Description is required"),
+        (b'{"description": "hole"}', "Description too short (min 5 characters)"),
+        (b'{"description": ', "Request body is not valid JSON"),
+        (b'', "Empty request body"),
+    ]
+    for body, message in cases:
+        status, response = server.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+        assert (status, response['error']) == (400, message), body
+
+    status, response = server.request('POST', '/predict', {'description': "Deep pothole damaging cars"})
+    assert status == 200 and response['original_category'] == 'road_damage'
+
+
+def test_other_routes_check_their_json_too(start_server):
+    server = start_server()
+    assert server.request('POST', '/similar', b'[1, 2]')[1]['error'] == "Expected a JSON object"
+    assert server.request('POST', '/predict_batch', b'{"descriptions": ')[0] == 400
+
+    status, response = server.request('POST', '/predict_batch', ["Deep pothole damaging cars", 7])
+    assert status == 200
+    assert response['results'][1]['error'] == "Description must be a string"
@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pytest
+
+import smart_server
+from routing_table import (DEFAULT_ROUTING_PATH, DEPARTMENTS, ESCALATION_LEVELS, CompiledRoutes, RoutingRules,
+                           load_schema_enums, schema_enum)
+
+RULES = {
+    "default_hazard": "Other",
+    "hazard_types": {
+        "Potholes": {"department": "Public Works Department (PWD)", "escalation_level": "staff"},
+        "Electrical Hazards": {"department": "Electricity Department", "escalation_level": "admin"},
+        "Other": {"department": "Public Works Department (PWD)"},
+    },
+    "labels": {
+        "road_damage": "Potholes",
+        "safety_hazard": "Electrical Hazards",
+        "park_maintenance": {"hazard_type": "Other", "department": "Parks & Environment Department"},
+    },
+}
+
+
+def test_labels_inherit_and_override_hazard_routes():
+    rules = RoutingRules(RULES)
+    assert rules.route("road_damage") == {"hazard_type": "Potholes", "department": "Public Works Department (PWD)",
+                                          "escalation_level": "staff"}
+    assert rules.route("park_maintenance")["department"] == "Parks & Environment Department"
+    assert rules.route("never_seen") == rules.hazard_route("Other")
+    assert rules.unrouted(["road_damage", "never_seen"]) == ["never_seen"]
+
+
+def test_compiled_routes_resolve_a_batch_of_column_indices():
+    routes = RoutingRules(RULES).compile(np.array(["safety_hazard", "road_damage", "never_seen"]))
+    resolved = routes.lookup(np.array([1, 0, 2, 0]))
+
+    assert resolved["hazard_type"].tolist() == ["Potholes", "Electrical Hazards", "Other", "Electrical Hazards"]
+    assert resolved["escalation_level"].tolist() == ["staff", "admin", "staff", "admin"]
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda rules: rules["hazard_types"]["Potholes"].update(department="General Complaints Department"),
+     "department 'General Complaints Department'"),
+    (lambda rules: rules["hazard_types"]["Potholes"].update(escalation_level="mayor"), "escalation_level 'mayor'"),
+    (lambda rules: rules["labels"].update(noise_issue="Noise Pollution"), "unknown hazard_type 'Noise Pollution'"),
+    (lambda rules: rules.update(default_hazard="Unknown"), "default_hazard 'Unknown'"),
+])
+def test_invalid_rules_are_rejected(change, message):
+    rules = json.loads(json.dumps(RULES))
+    change(rules)
+    with pytest.raises(ValueError, match=message):
+        RoutingRules(rules)
+
+
+def test_schema_enums_are_read_from_the_mongoose_schema(tmp_path):
+    schema = tmp_path / "complaint.model.js"
+    schema.write_text("""
+        department: { type: String, required: true, enum: ['Roads', "Parks"] },
+        escalationLevel: { type: String, enum: ['staff', 'admin'], default: 'staff' },
+    """)
+    assert schema_enum(schema.read_text(), "department") == ("Roads", "Parks")
+    assert load_schema_enums(str(schema)) == (("Roads", "Parks"), ("staff", "admin"), str(schema))
+    assert load_schema_enums(str(tmp_path / "missing.js"))[:2] == (DEPARTMENTS, ESCALATION_LEVELS)
+
+
+def test_bundled_rules_match_the_repository_schema():
+    rules = RoutingRules.from_file(DEFAULT_ROUTING_PATH)
+    assert rules.schema != 'built-in'
+
+
+def test_model_loads_and_predicts_without_routing_rules(model_path, monkeypatch):
+    monkeypatch.setattr(smart_server, 'routing_rules', None)
+    monkeypatch.setattr(smart_server, 'active_model', None)
+    monkeypatch.setattr(smart_server, 'ENGINE', 'sklearn')
+    monkeypatch.setattr(smart_server, 'CASCADE_MODEL_PATH', None)
+
+    smart_server.prediction_cache.clear()
+    assert smart_server.load_model(model_path)
+    model = smart_server.active_model
+    assert model.routes.fingerprint == CompiledRoutes.unrouted([]).fingerprint
+
+    result = smart_server.batch_ml_prediction(model, ["large pothole on the road"], ["Large pothole on the road"])[0]
+    assert result["method"] == "ml_model"
+    assert result["department"] is None and result["escalation_level"] is None
+
+    fallback = smart_server.fallback_prediction("Garbage not collected")
+    assert fallback["department"] is None
+
+
+def test_loaded_rules_route_predictions(model_path, monkeypatch):
+    monkeypatch.setattr(smart_server, 'routing_rules', RoutingRules(RULES))
+    monkeypatch.setattr(smart_server, 'active_model', None)
+    monkeypatch.setattr(smart_server, 'ENGINE', 'sklearn')
+    monkeypatch.setattr(smart_server, 'CASCADE_MODEL_PATH', None)
+    smart_server.prediction_cache.clear()
+
+    assert smart_server.load_model(model_path)
+    result = smart_server.batch_ml_prediction(
+        smart_server.active_model, ["deep pothole damaging cars"], ["Deep pothole damaging cars"])[0]
+    assert result["hazard_type"] == "Potholes"
+    assert result["department"] == "Public Works Department (PWD)"
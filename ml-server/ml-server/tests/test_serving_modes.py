@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+DESCRIPTIONS = ["Deep pothole damaging cars", "Water pipe leaking on street", "Garbage not collected for days"]
+
+
+@pytest.mark.parametrize("mode", ['single', 'threaded', 'prefork', 'async'])
+def test_every_mode_answers_concurrent_predictions(start_server, mode):
+    server = start_server('--mode', mode, '--workers', '2')
+
+    def predict(i):
+        return server.request('POST', '/predict', {'description': DESCRIPTIONS[i % len(DESCRIPTIONS)]})
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(predict, range(48)))
+
+    assert all(status == 200 for status, _ in responses)
+    categories = {body['original_category'] for _, body in responses}
+    assert categories == {'road_damage', 'water_issue', 'sanitation'}
+
+
+def test_prefork_workers_share_the_listening_socket(start_server):
+    server = start_server('--mode', 'prefork', '--workers', '3')
+    pids = {server.request('GET', '/stats')[1]['pid'] for _ in range(60)}
+    assert len(pids) > 1
+    assert server.process.pid not in pids
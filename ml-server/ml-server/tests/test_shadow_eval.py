@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+import smart_server
+from shadow_eval import ShadowEvaluator
+
+
+def live_results(model, texts):
+    prediction = model.predict(texts)
+    return [{
+        'original_category': str(prediction['category'][row]),
+        'severity': str(prediction['severity'][row]),
+        'category_confidence': round(float(prediction['category_confidence'][row]), 2),
+        'severity_confidence': round(float(prediction['severity_confidence'][row]), 2),
+    } for row in range(len(texts))]
+
+
+def wait_for(evaluator, condition, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = evaluator.stats()
+        if condition(stats):
+            return stats
+        time.sleep(0.05)
+    pytest.fail(f"shadow worker never got there: {evaluator.stats()}")
+
+
+def test_identical_candidate_agrees_with_live_predictions(model_path):
+    model = smart_server.open_model(model_path)
+    texts = ["deep pothole damaging cars", "garbage not collected for days", "no water supply"]
+    evaluator = ShadowEvaluator(model_path, max_wait=0.01)
+    try:
+        evaluator.submit(texts, live_results(model, texts))
+        # Keyword fallback answers carry no model prediction and are skipped
+        evaluator.submit(["streetlight out"], [{'hazard_type': 'Street Lights', 'severity': 'medium'}])
+
+        stats = wait_for(evaluator, lambda stats: stats['texts_scored'] == 3)
+        assert stats['category_agreement'] == 1.0
+        assert stats['both_agreement'] == 1.0
+        assert abs(stats['category_confidence_abs_delta']) < 0.01
+        assert stats['calls_submitted'] == 1
+    finally:
+        evaluator.stop()
+
+
+def test_submit_counts_are_shared_with_forked_workers(model_path, tmp_path):
+    model = smart_server.open_model(model_path)
+    texts = ["deep pothole damaging cars"]
+    results = live_results(model, texts)
+    # The worker never starts scoring, so the one-slot queue stays full
+    evaluator = ShadowEvaluator(str(tmp_path / 'missing.joblib'), queue_size=1)
+    try:
+        wait_for(evaluator, lambda stats: stats['state'] == 'failed')
+        evaluator.submit(texts, results)
+
+        pid = os.fork()
+        if pid == 0:
+            evaluator.submit(texts, results)
+            evaluator.submit(texts, results)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        stats = evaluator.stats()
+        assert (stats['calls_submitted'], stats['calls_dropped']) == (3, 2)
+    finally:
+        evaluator.stop(timeout=0.1)
@@ -0,0 +1,77 @@
+from similarity_index import SimilarityIndex, geohash_cell, neighbor_cells, tokenize
+
+STREETLIGHT = "street light broken near the main market road for three days"
+POTHOLE = "deep pothole outside the school gate damaging cars every morning"
+
+
+def ids(matches):
+    return [match['id'] for match in matches]
+
+
+def test_tokenize_drops_stop_words_and_folds_plurals():
+    assert tokenize("the street lights are broken") == {"street", "light", "broken"}
+
+
+def test_query_finds_a_near_duplicate():
+    index = SimilarityIndex()
+    index.add("1", STREETLIGHT)
+    index.add("2", POTHOLE)
+
+    matches = index.query("street light broken near main market road for days")
+    assert ids(matches)[0] == "1"
+    assert "2" not in ids(matches)
+
+
+def test_exclude_id_matches_ids_of_any_json_type():
+    index = SimilarityIndex()
+    index.add(1, STREETLIGHT)
+
+    assert ids(index.query(STREETLIGHT)) == ["1"]
+    assert index.query(STREETLIGHT, exclude_id=1) == []
+    assert index.query(STREETLIGHT, exclude_id="1") == []
+
+
+def test_adding_an_id_again_replaces_its_entry():
+    index = SimilarityIndex()
+    index.add("1", STREETLIGHT)
+    index.add("1", STREETLIGHT)
+    assert len(index) == 1
+    assert ids(index.query(STREETLIGHT)) == ["1"]
+
+    index.add("1", POTHOLE)
+    assert index.query(STREETLIGHT) == []
+    assert ids(index.query(POTHOLE)) == ["1"]
+
+
+def test_re_adding_without_content_words_drops_the_entry():
+    index = SimilarityIndex()
+    index.add("1", STREETLIGHT)
+    assert index.add("1", "the and of") is False
+    assert len(index) == 0
+    assert index.query(STREETLIGHT) == []
+
+
+def test_add_many_replaces_repeated_ids():
+    index = SimilarityIndex()
+    index.add("1", STREETLIGHT)
+    added = index.add_many([("1", POTHOLE, None, None), ("2", STREETLIGHT, None, None), ("2", STREETLIGHT, None, None)])
+
+    assert added == 2
+    assert len(index) == 2
+    assert ids(index.query(STREETLIGHT)) == ["2"]
+    assert ids(index.query(POTHOLE)) == ["1"]
+
+
+def test_location_limits_matches_to_neighboring_cells():
+    index = SimilarityIndex()
+    index.add("here", STREETLIGHT, 12.9716, 77.5946)
+    index.add("across town", STREETLIGHT, 13.1986, 77.7066)
+
+    assert ids(index.query(STREETLIGHT, latitude=12.9717, longitude=77.5947)) == ["here"]
+    assert sorted(ids(index.query(STREETLIGHT))) == ["across town", "here"]
+
+
+def test_neighbor_cells_include_the_point_cell():
+    cells = neighbor_cells(12.9716, 77.5946, 6)
+    assert geohash_cell(12.9716, 77.5946, 6) in cells
+    assert len(cells) == 9